@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""JSON 编码基准测试 - 比较各接口响应在不同编码器下的编码耗时
+
+简要说明：
+- 先通过测试客户端调用各接口一次，截获传给 `json_response` 的响应数据
+- 再分别用 flask.jsonify（原实现）和各可用编码器重复编码，统计每次编码的中位耗时
+- 只测量编码部分，不包括模拟计算
+
+主要用法：
+- 运行：`python -m backend.benchmark.bench_encoding [--repeat 50]`
+"""
+
+import argparse
+import statistics
+import sys
+import os
+import time
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from flask import jsonify
+
+from backend.server import flask_server
+from backend.utils.encoding import available_encoders, create_encoder
+
+# 接口名称 -> (路径, 请求体)
+ENDPOINTS = {
+    'character_one': ('/api/wish', {'mode': 'character', 'action': 'one'}),
+    'character_ten': ('/api/wish', {'mode': 'character', 'action': 'ten'}),
+    'weapon_one': ('/api/wish', {'mode': 'weapon', 'action': 'one'}),
+    'weapon_ten': ('/api/wish', {'mode': 'weapon', 'action': 'ten'}),
+    'character_auto_100k': ('/api/wish', {'mode': 'character', 'action': 'auto', 'count': 100000}),
+    'weapon_auto_100k': ('/api/wish', {'mode': 'weapon', 'action': 'auto', 'count': 100000}),
+    'goal_probability': ('/api/goal_probability', {'resources': 300, 'trials': 2000}),
+}
+
+
+def capture_payloads() -> dict:
+    """调用各接口一次，返回 {接口名称: 响应数据}"""
+    captured = {}
+    original = flask_server.json_response
+
+    def capture(data, status=None):
+        captured['last'] = data
+        return original(data, status)
+
+    flask_server.json_response = capture
+    try:
+        client = flask_server.app.test_client()
+        payloads = {}
+        for name, (path, body) in ENDPOINTS.items():
+            response = client.post(path, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+            payloads[name] = captured['last']
+        return payloads
+    finally:
+        flask_server.json_response = original
+
+
+def time_encode(encode, payload, repeat: int) -> float:
+    """返回单次编码的中位耗时（微秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(payload)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 编码基准测试")
+    parser.add_argument('--repeat', type=int, default=50, help="每个接口每种编码器的重复次数")
+    args = parser.parse_args()
+
+    payloads = capture_payloads()
+    encoders = {'flask.jsonify': None}
+    encoders.update({name: create_encoder(name) for name in available_encoders()})
+
+    header = f"{'endpoint':<22}{'bytes':>10}" + "".join(f"{name + ' (us)':>20}" for name in encoders)
+    print(header + f"{'speedup':>10}")
+    with flask_server.app.app_context():
+        for name, payload in payloads.items():
+            timings = {}
+            for encoder_name, encoder in encoders.items():
+                encode = (lambda data: jsonify(data).get_data()) if encoder is None else encoder.dumps
+                timings[encoder_name] = time_encode(encode, payload, args.repeat)
+            size = len(create_encoder('stdlib').dumps(payload))
+            fastest = min(timings.values())
+            row = f"{name:<22}{size:>10}" + "".join(f"{t:>20.1f}" for t in timings.values())
+            print(row + f"{timings['flask.jsonify'] / fastest:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
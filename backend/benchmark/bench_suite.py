@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""基准测试套件 - 模拟器、概率引擎和 HTTP 接口的热点路径
+
+简要说明：
+- 模拟器：三个模拟器（角色-1、角色-2、武器）的 `draw_once`、`pull_ten` 和 `simulate_pulls`（10^3 – 10^7 抽）
+- 概率引擎：代表性目标的 `estimate_goal_probability`，以及所需抽数搜索 `_find_first_pulls_meeting_probability`
+- 接口：通过 Flask 测试客户端测量端到端延迟（包括参数解析、计算和编码，不包括网络）
+- 所有随机数使用固定种子；计算类基准每次测量前清空结果缓存，测量的是实际计算
+- 每个基准重复测量多次，记录全部样本及中位数、MAD（中位数绝对偏差）；短耗时的基准自动增加每个样本的调用次数
+- 内存：每个 `simulate_pulls` 基准的抽数在独立子进程中运行一次，记录模拟期间进程峰值 RSS 的增长（仅 Unix），
+  用于发现内存随抽数增长的回退；按数据结构的明细见 `memory_profile`
+- 结果写入 JSON（包括 Python / NumPy 版本、平台、CPU 数、git 提交等环境信息），便于比较不同时间的运行结果
+
+主要用法：
+- 运行全部基准：`python -m backend.benchmark.bench_suite`
+- 快速模式（抽数上限 10^5、较少模拟次数，适合提交前检查）：`--quick`
+- 只运行部分基准：`--filter character.simulate_pulls`（按名称前缀匹配，可重复指定）
+- 指定输出文件：`--output results.json`；列出基准：`--list`；跳过内存测量：`--no-memory`
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import numpy as np
+
+from backend.wish import CharacterWish, CharacterWish2, GoalProbability, WeaponWish
+
+SCHEMA_VERSION = 1
+SEED = 20240101  # 所有基准使用的随机种子
+
+# 每个基准的测量参数
+MIN_SAMPLE_TIME = 0.05  # 短耗时基准每个样本至少持续的时间（秒），不足时增加调用次数
+MIN_SAMPLES = 3  # 每个基准至少的样本数（计算 MAD 需要）
+MEMORY_TIMEOUT = 600  # 单次内存测量子进程的超时（秒）
+
+# 运行模式：simulate_pulls 的抽数、概率估算的模拟次数、每个基准的样本数和时间预算（秒）
+PROFILES = {
+    'full': {
+        'pull_counts': (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7),
+        'goal_trials': 5000,
+        'search_trials': 5000,
+        'repeat': 7,
+        'time_budget': 60.0,
+    },
+    'quick': {
+        'pull_counts': (10 ** 3, 10 ** 4, 10 ** 5),
+        'goal_trials': 1000,
+        'search_trials': 1000,
+        'repeat': 5,
+        'time_budget': 10.0,
+    },
+}
+
+# 代表性目标：名称 -> (目标, 抽数)
+GOAL_TARGETS = {
+    'c1': (GoalProbability.Targets(five_star_up_character_1=1), 90),
+    'c1_w1': (GoalProbability.Targets(five_star_up_character_1=1, five_star_up_weapon_1=1), 180),
+    'c1_c2': (GoalProbability.Targets(five_star_up_character_1=1, five_star_up_character_2=1), 200),
+    'c3_w1': (GoalProbability.Targets(five_star_up_character_1=3, five_star_up_weapon_1=1), 400),
+}
+
+# 所需抽数搜索：名称 -> (目标, 目标概率, 是否包含在快速模式中)
+SEARCH_TARGETS = {
+    'c1_w1_p50': (GoalProbability.Targets(five_star_up_character_1=1, five_star_up_weapon_1=1), 0.5, True),
+    'c1_w1_p95': (GoalProbability.Targets(five_star_up_character_1=1, five_star_up_weapon_1=1), 0.95, False),
+}
+
+SIMULATORS = {
+    'character': CharacterWish.CharacterWishSimulator,
+    'character2': CharacterWish2.CharacterWishSimulator2,
+    'weapon': WeaponWish.WeaponWishSimulator,
+}
+
+
+@dataclass
+class Benchmark:
+    """单个基准
+
+    `build(profile)` 返回 `(fn, setup)`：`fn()` 为被测量的调用，`setup()`（可为 None）在每个样本前执行且不计时。
+    设置了 `setup` 的基准每个样本只调用一次 `fn`。
+    """
+    name: str
+    group: str
+    build: Callable[[dict], tuple]
+    units: float | Callable[[dict], float] = 1  # 每次调用处理的单位数（抽数、模拟次数），用于计算吞吐量
+    unit: str = 'call'
+    quick: bool = True  # 是否包含在快速模式中
+
+
+def _clear_goal_caches(module) -> None:
+    """清空概率引擎的结果缓存，使测量包括实际模拟"""
+    calculator = module.GoalProbabilityCalculator
+    calculator.estimate_goal_probability_cached.cache_clear()
+    calculator._simulate_one_trial_cached.cache_clear()
+    calculator._phase_cost_table_cached.cache_clear()
+
+
+def _simulate_pulls(name: str, simulator_class, count: int):
+    def run():
+        sim = simulator_class(seed=SEED)
+        if name == 'weapon':
+            return sim.simulate_pulls(count, None)
+        return sim.simulate_pulls(count)
+    return run
+
+
+def _simulator_benchmarks() -> list[Benchmark]:
+    benchmarks = []
+    for name, simulator_class in SIMULATORS.items():
+        benchmarks.append(Benchmark(
+            f'{name}.draw_once', 'simulator',
+            lambda profile, cls=simulator_class: (cls(seed=SEED).draw_once, None),
+            units=1, unit='pull',
+        ))
+        benchmarks.append(Benchmark(
+            f'{name}.pull_ten', 'simulator',
+            lambda profile, cls=simulator_class: (cls(seed=SEED).pull_ten, None),
+            units=10, unit='pull',
+        ))
+        for count in PROFILES['full']['pull_counts']:
+            benchmarks.append(Benchmark(
+                f'{name}.simulate_pulls.{count}', 'simulator',
+                lambda profile, name=name, cls=simulator_class, count=count: (_simulate_pulls(name, cls, count), None),
+                units=count, unit='pull',
+            ))
+    return benchmarks
+
+
+def _goal_benchmarks() -> list[Benchmark]:
+    modules = {
+        'draw_character_module': CharacterWish,
+        'draw_character2_module': CharacterWish2,
+        'draw_weapon_module': WeaponWish,
+    }
+    benchmarks = []
+    for name, (targets, pulls) in GOAL_TARGETS.items():
+        def build(profile, targets=targets, pulls=pulls):
+            calculator = GoalProbability.GoalProbabilityCalculator(trials=profile['goal_trials'])
+            fn = lambda: calculator.estimate_goal_probability(
+                pulls=pulls, targets=targets, trials=profile['goal_trials'], strategy='character_then_weapon',
+                seed=SEED, start=GoalProbability.StartState(), **modules,
+            )
+            return fn, lambda: _clear_goal_caches(GoalProbability)
+        benchmarks.append(Benchmark(
+            f'goal.estimate.{name}', 'goal', build, units=lambda profile: profile['goal_trials'], unit='trial',
+        ))
+    for name, (targets, probability, quick) in SEARCH_TARGETS.items():
+        def build(profile, targets=targets, probability=probability):
+            calculator = GoalProbability.GoalProbabilityCalculator(trials=profile['search_trials'])
+            fn = lambda: calculator._find_first_pulls_meeting_probability(
+                targets=targets, target_probability=probability, strategy='character_then_weapon',
+                seed=SEED, start=GoalProbability.StartState(), **modules,
+            )
+            return fn, lambda: _clear_goal_caches(GoalProbability)
+        benchmarks.append(Benchmark(f'goal.find_first_pulls.{name}', 'goal', build, quick=quick))
+    return benchmarks
+
+
+# 目标为 UP角色-1 + UP武器-1（与前端默认目标一致）
+_HTTP_GOAL = {'target_weapon_refinement_1': 1, 'seed': SEED}
+
+# 接口基准：名称 -> (方法, 路径, 请求体, 是否每次清空缓存, 是否包含在快速模式中)；模拟次数引用运行模式中的配置
+HTTP_REQUESTS = {
+    'http.wish.character_one': ('POST', '/api/wish', {'mode': 'character', 'action': 'one'}, False, True),
+    'http.wish.character_ten': ('POST', '/api/wish', {'mode': 'character', 'action': 'ten'}, False, True),
+    'http.wish.weapon_ten': ('POST', '/api/wish', {'mode': 'weapon', 'action': 'ten'}, False, True),
+    'http.wish.character_auto_100k': ('POST', '/api/wish', {'mode': 'character', 'action': 'auto', 'count': 100000}, False, True),
+    'http.goal_probability': ('POST', '/api/goal_probability', {**_HTTP_GOAL, 'resources': 180, 'trials': 'goal_trials'}, True, True),
+    'http.goal_probability.cached': ('POST', '/api/goal_probability', {**_HTTP_GOAL, 'resources': 180, 'trials': 'goal_trials'}, False, True),
+    'http.required_pulls_50': ('POST', '/api/required_pulls_for_50_percent', {**_HTTP_GOAL, 'trials': 'search_trials'}, True, False),
+}
+
+
+def _http_benchmarks() -> list[Benchmark]:
+    benchmarks = []
+    for name, (method, path, body, cold, quick) in HTTP_REQUESTS.items():
+        def build(profile, method=method, path=path, body=body, cold=cold):
+            from backend.server import flask_server  # 只在运行接口基准时导入 Flask
+            client = flask_server.app.test_client()
+            payload = {key: profile[value] if value in ('goal_trials', 'search_trials') else value
+                       for key, value in body.items()}
+
+            def fn():
+                response = client.open(path, method=method, json=payload)
+                response.get_data()
+                if response.status_code != 200:
+                    raise RuntimeError(f"{name}: HTTP {response.status_code}")
+
+            def clear():
+                flask_server.server.response_cache.clear()
+                _clear_goal_caches(flask_server.GoalProbability)
+
+            return fn, clear if cold else None
+        benchmarks.append(Benchmark(name, 'http', build, quick=quick))
+    return benchmarks
+
+
+def all_benchmarks() -> list[Benchmark]:
+    return _simulator_benchmarks() + _goal_benchmarks() + _http_benchmarks()
+
+
+def _selected(benchmark: Benchmark, profile_name: str, filters: list[str], names=None) -> bool:
+    if names is not None:
+        return benchmark.name in names
+    if filters and not any(benchmark.name.startswith(f) for f in filters):
+        return False
+    if profile_name == 'quick' and not benchmark.quick:
+        return False
+    if benchmark.group == 'simulator' and '.simulate_pulls.' in benchmark.name:
+        return int(benchmark.name.rsplit('.', 1)[1]) in PROFILES[profile_name]['pull_counts']
+    return True
+
+
+def measure(fn, setup=None, *, repeat: int, time_budget: float) -> dict:
+    """重复测量，返回每次调用的耗时样本（秒）
+
+    先调用一次预热（同时估算单次耗时）；没有 `setup` 的短耗时调用按 `MIN_SAMPLE_TIME` 增加每个样本的调用次数。
+    达到 `MIN_SAMPLES` 后，总耗时超过 `time_budget` 时提前结束。
+    """
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    fn()
+    single = time.perf_counter() - start
+    number = 1
+    if setup is None and single < MIN_SAMPLE_TIME:
+        number = max(1, int(MIN_SAMPLE_TIME / max(single, 1e-7)))
+
+    samples = []
+    began = time.perf_counter()
+    while len(samples) < repeat:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+        if len(samples) >= MIN_SAMPLES and time.perf_counter() - began > time_budget:
+            break
+    return {'number': number, 'samples': samples}
+
+
+def summarize(samples: list[float]) -> dict:
+    """中位数、MAD 等统计量"""
+    median = statistics.median(samples)
+    return {
+        'median': median,
+        'mad': statistics.median(abs(s - median) for s in samples),
+        'min': min(samples),
+        'max': max(samples),
+        'mean': statistics.fmean(samples),
+    }
+
+
+def measure_memory(name: str, count: int) -> dict | None:
+    """在独立子进程中运行一次 `simulate_pulls`，返回峰值 RSS 的增长（字节）；不支持时返回 None"""
+    try:
+        result = subprocess.run(
+            [sys.executable, '-m', 'backend.benchmark.memory_profile', name, str(count), '--rss', '--json'],
+            cwd=project_root, capture_output=True, text=True, timeout=MEMORY_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    measured = json.loads(result.stdout)
+    if measured['rss_growth'] is None:
+        return None
+    return {
+        'count': count,
+        'rss_growth': measured['rss_growth'],
+        'rss_peak': measured['rss_peak'],
+        'bytes_per_pull': measured['rss_growth'] / count,
+    }
+
+
+def _git(*args) -> str | None:
+    try:
+        result = subprocess.run(['git', *args], cwd=project_root, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _package_version(name: str) -> str | None:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+        return version(name)
+    except (ImportError, PackageNotFoundError):
+        return None
+
+
+def environment() -> dict:
+    """运行环境信息"""
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'packages': {name: _package_version(name) for name in ('flask', 'orjson', 'msgpack', 'brotli')},
+        'git_commit': _git('rev-parse', 'HEAD'),
+        'git_dirty': None if status is None else bool(status),
+        'ruleset_version': GoalProbability.ruleset_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def run(profile_name: str = 'full', filters: list[str] | None = None, repeat: int | None = None,
+        progress: Callable[[str, dict], None] | None = None, names=None, memory: bool = True) -> dict:
+    """运行选中的基准，返回结果字典（可直接写入 JSON）
+
+    `filters` 为名称前缀；指定 `names` 时只运行名称完全相同的基准（忽略 `filters`）。
+    `memory` 为 True 时，对选中的 `simulate_pulls` 基准另外测量峰值 RSS 的增长，写入结果的 `memory` 部分。
+    """
+    profile = dict(PROFILES[profile_name])
+    if repeat is not None:
+        profile['repeat'] = max(MIN_SAMPLES, repeat)
+    results = {}
+    for benchmark in all_benchmarks():
+        if not _selected(benchmark, profile_name, filters or [], names):
+            continue
+        fn, setup = benchmark.build(profile)
+        measured = measure(fn, setup, repeat=profile['repeat'], time_budget=profile['time_budget'])
+        units = benchmark.units(profile) if callable(benchmark.units) else benchmark.units
+        stats = summarize(measured['samples'])
+        results[benchmark.name] = {
+            'group': benchmark.group,
+            'unit': benchmark.unit,
+            'units_per_call': units,
+            'throughput': units / stats['median'] if stats['median'] > 0 else None,
+            **stats,
+            **measured,
+        }
+        if progress is not None:
+            progress(benchmark.name, results[benchmark.name])
+    memory_results = {}
+    if memory:
+        for name in results:
+            simulator, _, count = name.partition('.simulate_pulls.')
+            if not count:
+                continue
+            measured = measure_memory(simulator, int(count))
+            if measured is not None:
+                memory_results[name] = measured
+    return {
+        'schema': SCHEMA_VERSION,
+        'profile': profile_name,
+        'config': {**profile, 'pull_counts': list(profile['pull_counts']), 'seed': SEED},
+        'environment': environment(),
+        'benchmarks': results,
+        'memory': memory_results,
+    }
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.3f}s"
+
+
+def _print_result(name: str, result: dict) -> None:
+    throughput = result['throughput']
+    rate = f"{throughput:,.0f} {result['unit']}/s" if throughput is not None and result['unit'] != 'call' else ''
+    print(f"{name:<44}{_format_seconds(result['median']):>12}{'±' + _format_seconds(result['mad']):>12}"
+          f"{len(result['samples']):>4}x{result['number']:<6}{rate}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟器与概率引擎基准测试")
+    parser.add_argument('--quick', action='store_true', help="快速模式：抽数上限 10^5，较少的模拟次数和样本")
+    parser.add_argument('--filter', action='append', default=[], help="只运行名称以该前缀开头的基准（可重复指定）")
+    parser.add_argument('--repeat', type=int, default=None, help="每个基准的样本数")
+    parser.add_argument('--output', default=None, help="结果 JSON 文件（默认 bench-<时间>.json）")
+    parser.add_argument('--list', action='store_true', help="列出基准后退出")
+    parser.add_argument('--no-memory', action='store_true', help="不测量 simulate_pulls 的峰值 RSS")
+    args = parser.parse_args()
+
+    profile_name = 'quick' if args.quick else 'full'
+    if args.list:
+        for benchmark in all_benchmarks():
+            if _selected(benchmark, profile_name, args.filter):
+                print(benchmark.name)
+        return
+
+    print(f"{'benchmark':<44}{'median':>12}{'MAD':>12}  samples")
+    report = run(profile_name, args.filter, args.repeat, progress=_print_result, memory=not args.no_memory)
+    if report['memory']:
+        print(f"\n{'memory (peak RSS growth)':<44}{'RSS':>12}{'per pull':>12}")
+        for name, result in report['memory'].items():
+            print(f"{name:<44}{result['rss_growth'] / 2 ** 20:>9.1f}MiB{result['bytes_per_pull']:>10.1f}B")
+    output = args.output or f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {output}（{len(report['benchmarks'])} 个基准）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""基准比较 - 将一次基准运行与基线比较，发现性能回退
+
+简要说明：
+- 读取两个 `bench_suite` 输出的 JSON 文件，按基准名称逐个比较中位耗时
+- 考虑噪声：两次运行的 MAD 换算为标准差估计（× 1.4826）后合并，
+  只有变慢超过容差 **且** 超过噪声阈值（默认 3 倍合并标准差）时才判定为回退
+- 确认重测（`--confirm N`）：初步判定为回退的基准再测量 N 轮，与首轮样本合并后重新判定，排除偶发的机器抖动
+- 内存：两次运行都有 `memory` 结果时，比较 `simulate_pulls` 的峰值 RSS 增长；
+  增长超过容差 **且** 超过绝对余量（RSS 按页统计，小抽数下的波动约 1 MiB）时判定为内存回退
+- 存在回退（耗时或内存）时以非零状态退出，可作为部署前的检查；
+  基线中的基准（或内存测量）在本次运行中缺失时同样以非零状态退出（`--allow-missing` 时只给出警告）
+- 两次运行的环境（Python / NumPy 版本、平台、CPU 数）不同时给出警告：绝对耗时只在同一台机器上可比
+
+主要用法：
+- 部署前检查（按基线的运行模式运行基线中的基准并比较）：`python -m backend.benchmark.compare --run --confirm 2`
+- 与仓库中的基线比较：`python -m backend.benchmark.compare new.json`
+- 比较任意两次运行：`python -m backend.benchmark.compare old.json new.json --tolerance 0.15`
+- 更新基线：`python -m backend.benchmark.bench_suite --quick --filter character --filter weapon --filter goal
+  --output backend/benchmark/baseline.json`
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.10  # 允许的相对变慢比例
+DEFAULT_NOISE_THRESHOLD = 3.0  # 变化需超过合并噪声的倍数
+MAD_TO_SIGMA = 1.4826  # 正态分布下 MAD 与标准差的换算系数
+DEFAULT_MEMORY_TOLERANCE = 0.25  # 允许的峰值 RSS 增长的相对增加比例
+DEFAULT_MEMORY_SLACK = 4 * 1024 * 1024  # 峰值 RSS 增长的绝对余量（字节）
+
+# 比较时检查一致性的环境字段
+_ENVIRONMENT_KEYS = ('python', 'implementation', 'machine', 'cpu_count', 'numpy')
+# 影响工作量的运行配置，不同时耗时不可比
+_CONFIG_KEYS = ('goal_trials', 'search_trials', 'seed')
+
+REGRESSION = 'regression'
+IMPROVEMENT = 'improvement'
+UNCHANGED = 'unchanged'
+
+
+def load(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_benchmark(base: dict, new: dict, tolerance: float, noise_threshold: float) -> dict:
+    """比较单个基准，返回比值、噪声和判定结果"""
+    base_median, new_median = base['median'], new['median']
+    ratio = new_median / base_median if base_median > 0 else math.inf
+    # 合并两次运行的噪声（标准差估计），再换算为相对于基线中位数的比例
+    noise = math.hypot(base['mad'], new['mad']) * MAD_TO_SIGMA
+    relative_noise = noise / base_median if base_median > 0 else 0.0
+    threshold = max(tolerance, noise_threshold * relative_noise)
+    if ratio > 1 + threshold:
+        status = REGRESSION
+    elif ratio < 1 - threshold:
+        status = IMPROVEMENT
+    else:
+        status = UNCHANGED
+    return {
+        'base': base_median,
+        'new': new_median,
+        'ratio': ratio,
+        'noise': relative_noise,
+        'threshold': threshold,
+        'status': status,
+    }
+
+
+def compare_memory(base: dict, new: dict, tolerance: float, slack: int) -> dict:
+    """比较单个 `simulate_pulls` 的峰值 RSS 增长"""
+    base_growth, new_growth = base['rss_growth'], new['rss_growth']
+    limit = max(base_growth * (1 + tolerance), base_growth + slack)
+    if new_growth > limit:
+        status = REGRESSION
+    elif new_growth < min(base_growth * (1 - tolerance), base_growth - slack):
+        status = IMPROVEMENT
+    else:
+        status = UNCHANGED
+    return {'base': base_growth, 'new': new_growth, 'limit': limit, 'status': status}
+
+
+def compare(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE,
+            noise_threshold: float = DEFAULT_NOISE_THRESHOLD, memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE,
+            memory_slack: int = DEFAULT_MEMORY_SLACK) -> dict:
+    """比较两次运行：逐个基准的结果、峰值 RSS、只在一侧存在的基准和环境差异"""
+    base_benchmarks, new_benchmarks = baseline['benchmarks'], current['benchmarks']
+    results = {
+        name: compare_benchmark(base_benchmarks[name], new_benchmarks[name], tolerance, noise_threshold)
+        for name in base_benchmarks if name in new_benchmarks
+    }
+    base_memory, new_memory = baseline.get('memory', {}), current.get('memory', {})
+    memory = {
+        name: compare_memory(base_memory[name], new_memory[name], memory_tolerance, memory_slack)
+        for name in base_memory if name in new_memory
+    }
+    base_env, new_env = baseline.get('environment', {}), current.get('environment', {})
+    return {
+        'results': results,
+        'missing': sorted(set(base_benchmarks) - set(new_benchmarks)),
+        # 本次运行未测量内存（--no-memory）时不视为缺失
+        'memory_missing': sorted(set(base_memory) - set(new_memory)) if 'memory' in current else [],
+        'added': sorted(set(new_benchmarks) - set(base_benchmarks)),
+        'environment_differences': {
+            key: (base_env.get(key), new_env.get(key))
+            for key in _ENVIRONMENT_KEYS if base_env.get(key) != new_env.get(key)
+        },
+        'regressions': sorted(name for name, result in results.items() if result['status'] == REGRESSION),
+        'memory': memory,
+        'memory_regressions': sorted(name for name, result in memory.items() if result['status'] == REGRESSION),
+    }
+
+
+def merge_samples(first: dict, second: dict) -> dict:
+    """合并同一基准两次测量的样本，重新计算中位数和 MAD"""
+    samples = list(first['samples']) + list(second['samples'])
+    median = statistics.median(samples)
+    return {**first, 'samples': samples, 'median': median,
+            'mad': statistics.median(abs(s - median) for s in samples)}
+
+
+def confirm_regressions(baseline: dict, current: dict, report: dict, rounds: int,
+                        tolerance: float, noise_threshold: float, **memory_options) -> dict:
+    """重测初步判定为回退的基准，合并样本后重新比较（内存结果不重测：同一种子下峰值 RSS 基本确定）"""
+    from backend.benchmark import bench_suite
+
+    for _ in range(rounds):
+        if not report['regressions']:
+            break
+        print(f"[INFO] 重测 {len(report['regressions'])} 个疑似回退的基准...", flush=True)
+        rerun = bench_suite.run(baseline.get('profile', 'full'), names=set(report['regressions']), memory=False)
+        for name, result in rerun['benchmarks'].items():
+            current['benchmarks'][name] = merge_samples(current['benchmarks'][name], result)
+        report = compare(baseline, current, tolerance, noise_threshold, **memory_options)
+    return report
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.3f}s"
+
+
+def _format_bytes(size: float) -> str:
+    return f"{size / 2 ** 20:.1f}MiB"
+
+
+def print_report(report: dict) -> None:
+    markers = {REGRESSION: 'SLOWER', IMPROVEMENT: 'faster', UNCHANGED: ''}
+    print(f"{'benchmark':<44}{'base':>12}{'new':>12}{'change':>10}{'limit':>9}")
+    for name, result in sorted(report['results'].items()):
+        change = f"{(result['ratio'] - 1) * 100:+.1f}%"
+        print(f"{name:<44}{_format_seconds(result['base']):>12}{_format_seconds(result['new']):>12}"
+              f"{change:>10}{'±' + format(result['threshold'] * 100, '.0f') + '%':>9}  {markers[result['status']]}")
+    if report['memory']:
+        print(f"\n{'memory (peak RSS growth)':<44}{'base':>12}{'new':>12}{'limit':>12}")
+        for name, result in sorted(report['memory'].items()):
+            print(f"{name:<44}{_format_bytes(result['base']):>12}{_format_bytes(result['new']):>12}"
+                  f"{_format_bytes(result['limit']):>12}  {markers[result['status']].replace('SLOWER', 'LARGER')}")
+    for key, (base, new) in report['environment_differences'].items():
+        print(f"[WARNING] 环境不同：{key} {base} -> {new}（绝对耗时可能不可比）")
+    if report['missing']:
+        print(f"[WARNING] 本次运行缺少基线中的基准：{', '.join(report['missing'])}")
+    if report['memory_missing']:
+        print(f"[WARNING] 本次运行缺少基线中的内存测量：{', '.join(report['memory_missing'])}")
+    if report['added']:
+        print(f"[INFO] 基线中没有的基准（未比较）：{', '.join(report['added'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两次基准运行，发现性能回退")
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help="`新结果` 或 `基线 新结果`；只给一个文件时与仓库中的基线比较")
+    parser.add_argument('--run', action='store_true', help="运行基线中的基准作为新结果（使用基线的运行模式）")
+    parser.add_argument('--confirm', type=int, default=0, metavar='N', help="疑似回退的基准重测 N 轮后再判定")
+    parser.add_argument('--output', default=None, help="配合 --run：保存本次运行结果")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"允许的相对变慢比例（默认 {DEFAULT_TOLERANCE}）")
+    parser.add_argument('--noise-threshold', type=float, default=DEFAULT_NOISE_THRESHOLD,
+                        help=f"变化需超过合并噪声的倍数（默认 {DEFAULT_NOISE_THRESHOLD}）")
+    parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                        help=f"允许的峰值 RSS 增长的相对增加比例（默认 {DEFAULT_MEMORY_TOLERANCE}）")
+    parser.add_argument('--memory-slack', type=float, default=DEFAULT_MEMORY_SLACK / 2 ** 20, metavar='MIB',
+                        help=f"峰值 RSS 增长的绝对余量（MiB，默认 {DEFAULT_MEMORY_SLACK / 2 ** 20:g}）")
+    parser.add_argument('--allow-missing', action='store_true',
+                        help="基线中的基准在本次运行中缺失时只给出警告，不以非零状态退出")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出比较结果")
+    args = parser.parse_args()
+    memory_options = {'memory_tolerance': args.memory_tolerance, 'memory_slack': int(args.memory_slack * 2 ** 20)}
+
+    if args.run:
+        if len(args.files) > 1:
+            parser.error("--run 时最多指定一个基线文件")
+        baseline = load(args.files[0] if args.files else BASELINE_PATH)
+        from backend.benchmark import bench_suite
+        current = bench_suite.run(baseline.get('profile', 'full'), names=set(baseline['benchmarks']),
+                                  memory=bool(baseline.get('memory')))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(current, f, ensure_ascii=False, indent=2)
+    elif len(args.files) in (1, 2):
+        baseline_path, current_path = (BASELINE_PATH, args.files[0]) if len(args.files) == 1 else args.files
+        baseline, current = load(baseline_path), load(current_path)
+    else:
+        parser.error("需要指定一个或两个结果文件，或使用 --run")
+
+    base_config, new_config = baseline.get('config', {}), current.get('config', {})
+    mismatched = [key for key in _CONFIG_KEYS if base_config.get(key) != new_config.get(key)]
+    if mismatched:
+        print(f"[ERROR] 两次运行的配置不同，无法比较：" +
+              ", ".join(f"{key} {base_config.get(key)} / {new_config.get(key)}" for key in mismatched))
+        sys.exit(2)
+    report = compare(baseline, current, args.tolerance, args.noise_threshold, **memory_options)
+    if args.confirm > 0:
+        report = confirm_regressions(baseline, current, report, args.confirm, args.tolerance, args.noise_threshold,
+                                     **memory_options)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+    missing = [] if args.allow_missing else report['missing'] + report['memory_missing']
+    if report['regressions'] or report['memory_regressions'] or missing:
+        if not args.json:
+            if report['regressions']:
+                print(f"\n✗ {len(report['regressions'])} 个基准变慢：{', '.join(report['regressions'])}")
+            if report['memory_regressions']:
+                print(f"\n✗ {len(report['memory_regressions'])} 个模拟的峰值 RSS 增加："
+                      f"{', '.join(report['memory_regressions'])}")
+            if missing:
+                print(f"\n✗ {len(missing)} 个基线中的基准或内存测量未运行（重命名或删除基准后请更新基线，"
+                      f"或使用 --allow-missing）")
+        sys.exit(1)
+    if not args.json:
+        print(f"\n✓ 没有超过容差的回退（{len(report['results'])} 个基准，{len(report['memory'])} 个内存测量）")
+
+
+if __name__ == "__main__":
+    main()
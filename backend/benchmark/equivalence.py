@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""统计等价性检验 - 用大样本验证快速引擎与参考模拟器的抽卡分布一致
+
+简要说明：
+- 参考引擎：逐次调用模拟器的 `draw_once()`（即接口单抽 / 十连所用的实现）
+- 候选引擎：默认为同一模拟器的 `simulate_pulls(detail=True)`（自动模拟、概率估算所用的快速路径），
+  也可通过 `--candidate 模块:函数` 指定任意实现：`函数(kind, pulls, seed)` 返回与 `reference_sample` 相同结构的样本
+- 两个引擎使用不同的随机种子，比较的是分布而不是逐抽结果，因此候选实现可以自由改变随机数的消耗方式
+- 检验项目：5★ 间隔分布、UP 比例、UP 之间的间隔、捕获明光触发率、4★ 间隔与 UP 比例、4★ UP 角色分布、
+  武器类别分布、定轨武器的间隔和每次定轨所需的 5★ 数
+- 分布用卡方齐性检验（相邻分组合并至期望频数 ≥ 5）和两样本 KS 检验（离散数据下偏保守），比例用 2×2 卡方检验
+- 多重比较使用 Bonferroni 校正：p 值低于 `alpha / 检验数` 时判定为不一致；样本不足的检验单独列出，不计为不一致
+- 存在不一致时以非零状态退出
+
+主要用法：
+- 检验所有模拟器：`python -m backend.benchmark.equivalence`
+- 只检验武器池（含定轨）：`--simulator weapon --simulator weapon_fate`
+- 检验自定义实现：`--candidate mypackage.fast:sample --pulls 5000000`
+"""
+
+import argparse
+import importlib
+import json
+import math
+import os
+import sys
+import time
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+import numpy as np
+
+from backend.wish import CharacterWish, CharacterWish2, WeaponWish
+
+DEFAULT_PULLS = 2_000_000  # 每个引擎的抽数
+DEFAULT_SEED = 20240101
+DEFAULT_ALPHA = 0.001  # 整体显著性水平（Bonferroni 校正前）
+MIN_EXPECTED = 5.0  # 卡方检验每组的最小期望频数
+MIN_SAMPLE = 30  # 少于该样本量的检验视为样本不足
+FATE_WEAPON = WeaponWish.FIVE_STAR_UP_WEAPONS[0]  # weapon_fate 配置的定轨武器
+
+# 模拟器配置：名称 -> (模拟器类, 是否武器池, 定轨武器)
+SIMULATORS = {
+    'character': (CharacterWish.CharacterWishSimulator, False, None),
+    'character2': (CharacterWish2.CharacterWishSimulator2, False, None),
+    'weapon': (WeaponWish.WeaponWishSimulator, True, None),
+    'weapon_fate': (WeaponWish.WeaponWishSimulator, True, FATE_WEAPON),
+}
+
+CONSISTENT = 'consistent'
+DIVERGENT = 'divergent'
+INSUFFICIENT = 'insufficient'
+
+
+# ---------------------------------------------------------------------------
+# 样本
+# ---------------------------------------------------------------------------
+
+def _create_simulator(kind: str, seed: int):
+    simulator_class, is_weapon, fate_weapon = SIMULATORS[kind]
+    if is_weapon:
+        return simulator_class(seed=seed, selected_fate_weapon=fate_weapon)
+    return simulator_class(seed=seed)
+
+
+def reference_sample(kind: str, pulls: int, seed: int) -> dict:
+    """参考引擎：逐次 `draw_once()` 的样本
+
+    样本字段（位置从 1 开始）：
+    - five_star_positions / five_star_up：每个 5★ 的位置、是否 UP
+    - 角色池：capture_minguang（每个 5★ 是否触发捕获明光）、four_star_up_items（各 4★ UP 角色的数量）
+    - 武器池：weapon_names（每个 5★ 的武器名）、fate（每个 5★ 是否为定轨武器）
+    - four_star_positions / four_star_up_positions：4★ 和 4★ UP 的位置
+    """
+    _, is_weapon, _ = SIMULATORS[kind]
+    simulator = _create_simulator(kind, seed)
+    five_star_positions, five_star_up, extra = [], [], []
+    four_star_positions, four_star_up_positions = [], []
+    four_star_items = {}
+    draw_once = simulator.draw_once
+    for position in range(1, pulls + 1):
+        result = draw_once()
+        if result[0]:
+            five_star_positions.append(position)
+            five_star_up.append(result[5])
+            extra.append((result[8], result[7]) if is_weapon else result[7])
+        elif result[1]:
+            four_star_positions.append(position)
+            if result[6]:
+                four_star_up_positions.append(position)
+                if not is_weapon:
+                    four_star_items[result[8]] = four_star_items.get(result[8], 0) + 1
+
+    sample = {
+        'pulls': pulls,
+        'five_star_positions': np.asarray(five_star_positions, dtype=np.int64),
+        'five_star_up': np.asarray(five_star_up, dtype=bool),
+        'four_star_positions': np.asarray(four_star_positions, dtype=np.int64),
+        'four_star_up_positions': np.asarray(four_star_up_positions, dtype=np.int64),
+    }
+    if is_weapon:
+        sample['weapon_names'] = [name for name, _ in extra]
+        sample['fate'] = np.asarray([fate for _, fate in extra], dtype=bool)
+    else:
+        sample['capture_minguang'] = np.asarray(extra, dtype=bool)
+        sample['four_star_up_items'] = four_star_items
+    return sample
+
+
+def simulate_pulls_sample(kind: str, pulls: int, seed: int) -> dict:
+    """候选引擎：`simulate_pulls(detail=True, five_star_columns=True)` 的样本（字段同 `reference_sample`）"""
+    _, is_weapon, fate_weapon = SIMULATORS[kind]
+    simulator = _create_simulator(kind, seed)
+    if is_weapon:
+        result = simulator.simulate_pulls(pulls, strategy=fate_weapon, detail=True, five_star_columns=True)
+    else:
+        result = simulator.simulate_pulls(pulls, detail=True, five_star_columns=True)
+    sample = {
+        'pulls': pulls,
+        'five_star_positions': np.asarray(result['hit_positions'], dtype=np.int64),
+        'five_star_up': np.asarray(result['five_star_up'], dtype=bool),
+        'four_star_positions': np.asarray(result['four_star_positions'], dtype=np.int64),
+        'four_star_up_positions': np.asarray(result['four_star_up_positions'], dtype=np.int64),
+    }
+    if is_weapon:
+        sample['weapon_names'] = [result['five_star_weapon_names'][index] for index in result['five_star_weapons']]
+        sample['fate'] = np.asarray(result['five_star_fate'], dtype=bool)
+    else:
+        sample['capture_minguang'] = np.asarray(result['five_star_capture_minguang'], dtype=bool)
+        sample['four_star_up_items'] = {
+            f'4星UP角色-{i}': result[f'four_star_up_{i}_count'] for i in (1, 2, 3)
+        }
+    return sample
+
+
+def load_candidate(spec: str):
+    """`模块:函数` -> 候选引擎函数"""
+    module_name, _, function_name = spec.partition(':')
+    if not module_name or not function_name:
+        raise ValueError(f"候选引擎格式应为 模块:函数，实际为 {spec!r}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+# ---------------------------------------------------------------------------
+# 统计检验（不依赖 SciPy）
+# ---------------------------------------------------------------------------
+
+def _regularized_gamma_q(a: float, x: float) -> float:
+    """正则化上不完全伽马函数 Q(a, x)：x < a + 1 时用级数，否则用连分式"""
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # Lentz 算法计算连分式
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+def chi2_sf(statistic: float, df: int) -> float:
+    """卡方分布的上尾概率"""
+    return _regularized_gamma_q(df / 2, statistic / 2)
+
+
+def _kolmogorov_sf(lam: float) -> float:
+    """Kolmogorov 分布的上尾概率 Q_KS(λ)"""
+    if lam < 0.2:
+        return 1.0
+    total = 0.0
+    for j in range(1, 101):
+        term = 2 * (-1) ** (j - 1) * math.exp(-2 * j * j * lam * lam)
+        total += term
+        if abs(term) < 1e-12:
+            break
+    return min(1.0, max(0.0, total))
+
+
+def _result(name: str, status: str, p_value=None, statistic=None, **details) -> dict:
+    return {'name': name, 'status': status, 'p_value': p_value, 'statistic': statistic, **details}
+
+
+def chi2_homogeneity(name: str, reference_counts, candidate_counts, ordered: bool = True) -> dict:
+    """两样本卡方齐性检验
+
+    `ordered` 为 True 时（间隔等有序数据）将相邻分组合并至期望频数 ≥ 5；
+    否则（类别数据）期望频数不足的类别合并为一组。
+    """
+    reference_counts = np.asarray(reference_counts, dtype=float)
+    candidate_counts = np.asarray(candidate_counts, dtype=float)
+    n_reference, n_candidate = reference_counts.sum(), candidate_counts.sum()
+    if min(n_reference, n_candidate) < MIN_SAMPLE:
+        return _result(name, INSUFFICIENT, n_reference=int(n_reference), n_candidate=int(n_candidate))
+    total = n_reference + n_candidate
+    share = min(n_reference, n_candidate) / total  # 两行中较小的期望比例
+
+    groups = []
+    if ordered:
+        current = [0.0, 0.0]
+        for r, c in zip(reference_counts, candidate_counts):
+            current[0] += r
+            current[1] += c
+            if (current[0] + current[1]) * share >= MIN_EXPECTED:
+                groups.append(current)
+                current = [0.0, 0.0]
+        if current[0] + current[1] > 0:
+            if groups:
+                groups[-1][0] += current[0]
+                groups[-1][1] += current[1]
+            else:
+                groups.append(current)
+    else:
+        rest = [0.0, 0.0]
+        for r, c in zip(reference_counts, candidate_counts):
+            if (r + c) * share >= MIN_EXPECTED:
+                groups.append([r, c])
+            else:
+                rest[0] += r
+                rest[1] += c
+        if rest[0] + rest[1] > 0:
+            groups.append(rest)
+
+    if len(groups) < 2:
+        return _result(name, INSUFFICIENT, n_reference=int(n_reference), n_candidate=int(n_candidate))
+    statistic = 0.0
+    for r, c in groups:
+        column = r + c
+        for observed, row_total in ((r, n_reference), (c, n_candidate)):
+            expected = column * row_total / total
+            statistic += (observed - expected) ** 2 / expected
+    df = len(groups) - 1
+    return _result(name, CONSISTENT, chi2_sf(statistic, df), statistic, df=df,
+                   n_reference=int(n_reference), n_candidate=int(n_candidate))
+
+
+def proportion_test(name: str, reference_hits: int, reference_total: int,
+                    candidate_hits: int, candidate_total: int) -> dict:
+    """两个比例的 2×2 卡方检验（报告两侧比例）"""
+    result = chi2_homogeneity(name, [reference_hits, reference_total - reference_hits],
+                              [candidate_hits, candidate_total - candidate_hits], ordered=False)
+    result['reference'] = reference_hits / reference_total if reference_total else None
+    result['candidate'] = candidate_hits / candidate_total if candidate_total else None
+    return result
+
+
+def ks_two_sample(name: str, reference_values, candidate_values) -> dict:
+    """两样本 Kolmogorov-Smirnov 检验（渐近 p 值；离散数据下偏保守）"""
+    reference_values = np.sort(np.asarray(reference_values))
+    candidate_values = np.sort(np.asarray(candidate_values))
+    n_reference, n_candidate = len(reference_values), len(candidate_values)
+    if min(n_reference, n_candidate) < MIN_SAMPLE:
+        return _result(name, INSUFFICIENT, n_reference=n_reference, n_candidate=n_candidate)
+    support = np.union1d(reference_values, candidate_values)
+    cdf_reference = np.searchsorted(reference_values, support, side='right') / n_reference
+    cdf_candidate = np.searchsorted(candidate_values, support, side='right') / n_candidate
+    statistic = float(np.max(np.abs(cdf_reference - cdf_candidate)))
+    effective = math.sqrt(n_reference * n_candidate / (n_reference + n_candidate))
+    p_value = _kolmogorov_sf((effective + 0.12 + 0.11 / effective) * statistic)
+    return _result(name, CONSISTENT, p_value, statistic, n_reference=n_reference, n_candidate=n_candidate)
+
+
+def _distribution_tests(name: str, reference_values, candidate_values) -> list[dict]:
+    """整数分布：卡方齐性检验 + KS 检验，并报告两侧均值"""
+    reference_values = np.asarray(reference_values, dtype=np.int64)
+    candidate_values = np.asarray(candidate_values, dtype=np.int64)
+    size = int(max(reference_values.max(initial=0), candidate_values.max(initial=0))) + 1
+    chi2 = chi2_homogeneity(f'{name}.chi2', np.bincount(reference_values, minlength=size),
+                            np.bincount(candidate_values, minlength=size))
+    ks = ks_two_sample(f'{name}.ks', reference_values, candidate_values)
+    for result in (chi2, ks):
+        result['reference'] = float(reference_values.mean()) if len(reference_values) else None
+        result['candidate'] = float(candidate_values.mean()) if len(candidate_values) else None
+    return [chi2, ks]
+
+
+def _intervals(positions) -> np.ndarray:
+    """命中位置 -> 相邻命中之间的抽数（第一个间隔从第 0 抽算起）"""
+    return np.diff(np.asarray(positions, dtype=np.int64), prepend=0)
+
+
+def _fate_rounds(fate) -> np.ndarray:
+    """每次获得定轨武器所用的 5★ 数（不含最后一段未完成的）"""
+    rounds, count = [], 0
+    for is_fate in fate:
+        count += 1
+        if is_fate:
+            rounds.append(count)
+            count = 0
+    return np.asarray(rounds, dtype=np.int64)
+
+
+def run_tests(kind: str, reference: dict, candidate: dict) -> list[dict]:
+    """比较两个样本，返回所有检验结果"""
+    _, is_weapon, fate_weapon = SIMULATORS[kind]
+    tests = []
+    ref_positions, cand_positions = reference['five_star_positions'], candidate['five_star_positions']
+    ref_up, cand_up = reference['five_star_up'], candidate['five_star_up']
+
+    tests += _distribution_tests('five_star_interval', _intervals(ref_positions), _intervals(cand_positions))
+    tests.append(proportion_test('five_star_up_ratio', int(ref_up.sum()), len(ref_up),
+                                 int(cand_up.sum()), len(cand_up)))
+    tests += _distribution_tests('up_interval', _intervals(ref_positions[ref_up]),
+                                 _intervals(cand_positions[cand_up]))
+
+    if is_weapon:
+        categories = list(WeaponWish.FIVE_STAR_UP_WEAPONS) + ['5星常驻武器']
+        tests.append(chi2_homogeneity(
+            'weapon_category',
+            [reference['weapon_names'].count(name) for name in categories],
+            [candidate['weapon_names'].count(name) for name in categories], ordered=False))
+        if fate_weapon is not None:
+            ref_fate, cand_fate = reference['fate'], candidate['fate']
+            tests.append(proportion_test('fate_ratio', int(ref_fate.sum()), len(ref_fate),
+                                         int(cand_fate.sum()), len(cand_fate)))
+            tests += _distribution_tests('fate_five_stars', _fate_rounds(ref_fate), _fate_rounds(cand_fate))
+            tests += _distribution_tests('fate_interval', _intervals(ref_positions[ref_fate]),
+                                         _intervals(cand_positions[cand_fate]))
+    else:
+        ref_capture, cand_capture = reference['capture_minguang'], candidate['capture_minguang']
+        tests.append(proportion_test('capture_minguang_rate', int(ref_capture.sum()), len(ref_capture),
+                                     int(cand_capture.sum()), len(cand_capture)))
+        ref_items, cand_items = reference['four_star_up_items'], candidate['four_star_up_items']
+        names = sorted(set(ref_items) | set(cand_items))
+        tests.append(chi2_homogeneity('four_star_up_item',
+                                      [ref_items.get(name, 0) for name in names],
+                                      [cand_items.get(name, 0) for name in names], ordered=False))
+
+    tests += _distribution_tests('four_star_interval', _intervals(reference['four_star_positions']),
+                                 _intervals(candidate['four_star_positions']))
+    ref_four_up, cand_four_up = reference['four_star_up_positions'], candidate['four_star_up_positions']
+    tests.append(proportion_test('four_star_up_ratio', len(ref_four_up), len(reference['four_star_positions']),
+                                 len(cand_four_up), len(candidate['four_star_positions'])))
+    return tests
+
+
+# ---------------------------------------------------------------------------
+# 运行与报告
+# ---------------------------------------------------------------------------
+
+def run(kinds, pulls: int = DEFAULT_PULLS, seed: int = DEFAULT_SEED, alpha: float = DEFAULT_ALPHA,
+        candidate=simulate_pulls_sample, progress: bool = True) -> dict:
+    """生成两个引擎的样本并检验，返回报告（含 Bonferroni 校正后的判定）"""
+    results = {}
+    for kind in kinds:
+        if progress:
+            print(f"[INFO] {kind}：生成样本（{pulls:,} 抽 × 2）...", flush=True)
+        start = time.perf_counter()
+        reference = reference_sample(kind, pulls, seed)
+        reference_time = time.perf_counter() - start
+        start = time.perf_counter()
+        candidate_sample = candidate(kind, pulls, seed + 1)
+        candidate_time = time.perf_counter() - start
+        results[kind] = {
+            'reference_time': reference_time,
+            'candidate_time': candidate_time,
+            'tests': run_tests(kind, reference, candidate_sample),
+        }
+
+    test_count = sum(1 for result in results.values() for test in result['tests'] if test['status'] != INSUFFICIENT)
+    threshold = alpha / test_count if test_count else alpha
+    divergent = []
+    for kind, result in results.items():
+        for test in result['tests']:
+            if test['status'] != INSUFFICIENT and test['p_value'] < threshold:
+                test['status'] = DIVERGENT
+                divergent.append(f"{kind}.{test['name']}")
+    return {
+        'config': {'pulls': pulls, 'seed': seed, 'alpha': alpha, 'threshold': threshold, 'tests': test_count},
+        'simulators': results,
+        'divergent': divergent,
+    }
+
+
+def _format_number(value) -> str:
+    if value is None:
+        return '-'
+    return f"{value:.4f}" if abs(value) < 10 else f"{value:.2f}"
+
+
+def print_report(report: dict) -> None:
+    markers = {CONSISTENT: '', DIVERGENT: 'DIVERGENT', INSUFFICIENT: 'insufficient data'}
+    for kind, result in report['simulators'].items():
+        print(f"\n{kind}（参考 {result['reference_time']:.1f}s，候选 {result['candidate_time']:.1f}s）")
+        print(f"  {'test':<30}{'reference':>12}{'candidate':>12}{'p-value':>12}  ")
+        for test in result['tests']:
+            p_value = '-' if test['p_value'] is None else f"{test['p_value']:.3g}"
+            print(f"  {test['name']:<30}{_format_number(test.get('reference')):>12}"
+                  f"{_format_number(test.get('candidate')):>12}{p_value:>12}  {markers[test['status']]}")
+    config = report['config']
+    print(f"\n{config['tests']} 项检验，Bonferroni 校正后的阈值 p < {config['threshold']:.2g}（alpha {config['alpha']}）")
+    insufficient = sum(1 for result in report['simulators'].values()
+                       for test in result['tests'] if test['status'] == INSUFFICIENT)
+    if insufficient:
+        print(f"[WARNING] {insufficient} 项检验样本不足，未参与判定（可增大 --pulls）")
+
+
+def _to_json(value):
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检验快速引擎与参考模拟器的抽卡分布是否一致")
+    parser.add_argument('--simulator', action='append', choices=list(SIMULATORS), default=None,
+                        help="只检验指定的模拟器配置（可重复指定，默认全部）")
+    parser.add_argument('--pulls', type=int, default=DEFAULT_PULLS, help=f"每个引擎的抽数（默认 {DEFAULT_PULLS:,}）")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="参考引擎的随机种子（候选引擎使用 种子+1）")
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help=f"整体显著性水平（默认 {DEFAULT_ALPHA}）")
+    parser.add_argument('--candidate', default=None, metavar='MODULE:FUNCTION',
+                        help="候选引擎（默认为 simulate_pulls）：函数(kind, pulls, seed) 返回样本字典")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出检验结果")
+    args = parser.parse_args()
+    if args.pulls <= 0:
+        parser.error("--pulls 必须为正数")
+
+    try:
+        candidate = load_candidate(args.candidate) if args.candidate else simulate_pulls_sample
+    except (ImportError, AttributeError, ValueError) as e:
+        parser.error(f"无法加载候选引擎：{e}")
+    report = run(args.simulator or list(SIMULATORS), args.pulls, args.seed, args.alpha, candidate,
+                 progress=not args.json)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=_to_json))
+    else:
+        print_report(report)
+    if report['divergent']:
+        if not args.json:
+            print(f"\n✗ {len(report['divergent'])} 项检验不一致：{', '.join(report['divergent'])}")
+        sys.exit(1)
+    if not args.json:
+        print("\n✓ 所有检验一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""负载测试 - 以开环到达率驱动本机后端，测量吞吐量和延迟分位数
+
+简要说明：
+- 开环：请求按预定的到达时间发出（泊松或均匀到达），不等待前一个请求完成；
+  延迟从 **预定发送时间** 算起，客户端并发名额不足导致的排队也计入延迟，避免协同遗漏（coordinated omission）
+- 请求组合可配置：`one` / `ten` / `auto` 祈愿请求和 `goal`（目标概率估算）请求，按权重随机抽取
+- 目标概率请求默认每次使用不同的随机种子，绕过响应缓存，测量的是实际计算；`--cacheable-goals` 使用固定种子测量缓存命中路径
+- 可依次测试多个到达率（`--rate 20,50,100`），找出延迟开始恶化的拐点
+- 报告每个到达率下各类请求的完成数、错误（按状态码）、吞吐量、p50 / p95 / p99 / 最大延迟，以及祈愿抽数吞吐量
+- 只连接本机地址（localhost / 127.0.0.1 / ::1）；`--spawn` 在空闲端口启动一个独立的后端进程，测试结束后关闭
+- 只依赖标准库（http.client + 线程），不需要外部服务
+
+主要用法：
+- 对已运行的后端：`python -m backend.benchmark.load_test --url http://127.0.0.1:8888 --rate 50 --duration 30`
+- 启动独立后端并逐级加压：`python -m backend.benchmark.load_test --spawn --rate 10,20,40,80 --duration 20`
+- 自定义请求组合：`--mix one=60,ten=30,auto=5,goal=5 --pool weapon --auto-count 100000`
+- 保存结果：`--output load.json`（或 `--json` 输出到标准输出）
+"""
+
+import argparse
+import http.client
+import ipaddress
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+DEFAULT_URL = 'http://127.0.0.1:8888'
+DEFAULT_MIX = 'one=60,ten=30,auto=5,goal=5'
+REQUEST_KINDS = ('one', 'ten', 'auto', 'goal')
+POOLS = ('character', 'character2', 'weapon')
+DEFAULT_MAX_IN_FLIGHT = 256  # 客户端最大并发请求数
+REQUEST_TIMEOUT = 120.0  # 单个请求的超时时间（秒）
+SPAWN_READY_TIMEOUT = 60.0  # 等待 --spawn 启动的后端就绪的最长时间（秒）
+PERCENTILES = (50, 95, 99)
+
+
+# ---------------------------------------------------------------------------
+# 请求
+# ---------------------------------------------------------------------------
+
+def parse_mix(text: str) -> dict:
+    """`one=60,ten=30,goal=10` -> {'one': 60.0, 'ten': 30.0, 'goal': 10.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in REQUEST_KINDS:
+            raise ValueError(f"未知的请求类型 {name!r}（可选 {', '.join(REQUEST_KINDS)}）")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"{name} 的权重不是数字：{weight!r}") from None
+        if mix[name] < 0:
+            raise ValueError(f"{name} 的权重不能为负数")
+    if sum(mix.values()) <= 0:
+        raise ValueError("请求组合的权重之和必须大于 0")
+    return mix
+
+
+class RequestFactory:
+    """按请求组合生成 `(类型, 路径, 请求体, 抽数)`"""
+
+    def __init__(self, mix: dict, pool: str, auto_count: int, goal_resources: int,
+                 goal_trials: int | None, cacheable_goals: bool, rng: random.Random):
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.pool = pool
+        self.auto_count = auto_count
+        self.goal_resources = goal_resources
+        self.goal_trials = goal_trials
+        self.cacheable_goals = cacheable_goals
+        self.rng = rng
+
+    def next(self) -> tuple:
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        if kind == 'goal':
+            body = {
+                'resources': self.goal_resources,
+                'target_weapon_refinement_1': 1,
+                'seed': 0 if self.cacheable_goals else self.rng.randrange(2 ** 31),
+            }
+            if self.goal_trials:
+                body['trials'] = self.goal_trials
+            return kind, '/api/goal_probability', body, 0
+        body = {'mode': self.pool, 'action': kind}
+        pulls = {'one': 1, 'ten': 10}.get(kind, self.auto_count)
+        if kind == 'auto':
+            body['count'] = self.auto_count
+        return kind, '/api/wish', body, pulls
+
+
+def _post(host: str, port: int, path: str, body: dict) -> int:
+    """发送一个 JSON POST 请求并读完响应体，返回状态码"""
+    conn = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT)
+    try:
+        conn.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def check_local(url: str) -> tuple[str, int]:
+    """只允许本机地址：返回 (主机, 端口)"""
+    parts = urlsplit(url)
+    if parts.scheme != 'http' or not parts.hostname:
+        raise ValueError(f"只支持 http://主机:端口 形式的地址：{url!r}")
+    host, port = parts.hostname, parts.port or 80
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror as e:
+        raise ValueError(f"无法解析 {host}：{e}") from None
+    if not all(ipaddress.ip_address(address.split('%')[0]).is_loopback for address in addresses):
+        raise ValueError(f"负载测试只能针对本机地址，{host} 解析为 {', '.join(sorted(addresses))}")
+    return host, port
+
+
+# ---------------------------------------------------------------------------
+# 运行
+# ---------------------------------------------------------------------------
+
+def _arrival_times(rate: float, duration: float, arrival: str, rng: random.Random) -> list[float]:
+    """相对开始时间的预定到达时间"""
+    times = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+        if t >= duration:
+            return times
+        times.append(t)
+
+
+def run_rate(host: str, port: int, factory: RequestFactory, rate: float, duration: float,
+             warmup: float = 0.0, arrival: str = 'poisson', max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> dict:
+    """以给定到达率运行 `warmup + duration` 秒，返回原始测量记录（预热期间的请求不计入）"""
+    schedule = _arrival_times(rate, warmup + duration, arrival, factory.rng)
+    records = []  # (类型, 状态码或错误名, 延迟, 抽数, 是否计入)
+    lock = threading.Lock()
+    late = 0  # 调度线程本身落后超过 10ms 的次数（客户端过载的信号）
+
+    def send(request, scheduled, measured):
+        kind, path, body, pulls = request
+        try:
+            status = _post(host, port, path, body)
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        with lock:
+            records.append((kind, status, latency, pulls, measured))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='load') as executor:
+        for offset in schedule:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.01:
+                late += 1
+            executor.submit(send, factory.next(), scheduled, offset >= warmup)
+        submitted_at = time.perf_counter()
+    finished_at = time.perf_counter()
+    return {
+        'rate': rate,
+        'duration': duration,
+        'warmup': warmup,
+        'records': [record for record in records if record[4]],
+        'late_dispatches': late,
+        'drain_time': finished_at - submitted_at,
+    }
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float | None:
+    """最近秩法分位数"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(run: dict) -> dict:
+    """按请求类型（以及全部请求）汇总：完成数、错误、吞吐量和成功请求的延迟分位数"""
+    groups = {}
+    for kind, status, latency, pulls, _ in run['records']:
+        for name in (kind, 'all'):
+            group = groups.setdefault(name, {'latencies': [], 'statuses': {}, 'pulls': 0})
+            group['statuses'][str(status)] = group['statuses'].get(str(status), 0) + 1
+            if status == 200:
+                group['latencies'].append(latency)
+                group['pulls'] += pulls
+
+    window = run['duration']
+    summary = {}
+    for name, group in groups.items():
+        latencies = sorted(group['latencies'])
+        total = sum(group['statuses'].values())
+        summary[name] = {
+            'requests': total,
+            'ok': len(latencies),
+            'errors': {status: count for status, count in group['statuses'].items() if status != '200'},
+            'throughput': len(latencies) / window,
+            'pulls_per_second': group['pulls'] / window,
+            **{f'p{p}': _percentile(latencies, p) for p in PERCENTILES},
+            'max': latencies[-1] if latencies else None,
+        }
+    return {
+        'rate': run['rate'],
+        'late_dispatches': run['late_dispatches'],
+        'drain_time': run['drain_time'],
+        'kinds': summary,
+    }
+
+
+# ---------------------------------------------------------------------------
+# 独立后端
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _is_ready(port: int) -> bool:
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=0.5)
+        try:
+            conn.request('GET', '/api/health')
+            return conn.getresponse().status == 200
+        finally:
+            conn.close()
+    except (OSError, http.client.HTTPException):
+        return False
+
+
+def spawn_backend(extra_env: dict | None = None) -> tuple[subprocess.Popen, int]:
+    """在空闲端口启动生产模式的后端进程，等待就绪后返回 (进程, 端口)"""
+    port = _free_port()
+    server_dir = os.path.join(project_root, 'backend', 'server')
+    env = dict(os.environ, WISH_PORT=str(port), WISH_PRODUCTION='1', **(extra_env or {}))
+    process = subprocess.Popen([sys.executable, 'flask_server.py'], cwd=server_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SPAWN_READY_TIMEOUT
+    while not _is_ready(port):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"后端未能在 {SPAWN_READY_TIMEOUT:g} 秒内就绪（退出码 {process.poll()}）")
+        time.sleep(0.1)
+    return process, port
+
+
+def stop_backend(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# ---------------------------------------------------------------------------
+# 报告
+# ---------------------------------------------------------------------------
+
+def _format_latency(seconds) -> str:
+    if seconds is None:
+        return '-'
+    return f"{seconds * 1e3:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+def print_summary(summary: dict) -> None:
+    print(f"\n到达率 {summary['rate']:g} 请求/秒")
+    print(f"  {'kind':<6}{'requests':>9}{'ok':>8}{'req/s':>9}{'pulls/s':>11}"
+          f"{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  errors")
+    order = [kind for kind in REQUEST_KINDS if kind in summary['kinds']] + ['all']
+    for kind in order:
+        item = summary['kinds'][kind]
+        errors = ', '.join(f"{status}×{count}" for status, count in sorted(item['errors'].items()))
+        print(f"  {kind:<6}{item['requests']:>9}{item['ok']:>8}{item['throughput']:>9.1f}"
+              f"{item['pulls_per_second']:>11.0f}" +
+              ''.join(f"{_format_latency(item[key]):>10}" for key in ('p50', 'p95', 'p99', 'max')) +
+              f"  {errors}")
+    if summary['late_dispatches']:
+        print(f"  [WARNING] {summary['late_dispatches']} 个请求未能按时发出（客户端过载，实际到达率低于设定值）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以开环到达率对本机后端进行负载测试")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default=DEFAULT_URL, help=f"后端地址，只允许本机（默认 {DEFAULT_URL}）")
+    target.add_argument('--spawn', action='store_true', help="在空闲端口启动独立的后端进程，测试结束后关闭")
+    parser.add_argument('--rate', default='20', help="到达率（请求/秒），逗号分隔时依次测试多个到达率")
+    parser.add_argument('--duration', type=float, default=30.0, help="每个到达率的测量时间（秒，默认 30）")
+    parser.add_argument('--warmup', type=float, default=3.0, help="每个到达率开始时不计入结果的预热时间（秒，默认 3）")
+    parser.add_argument('--arrival', choices=('poisson', 'constant'), default='poisson', help="到达过程（默认泊松）")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"请求组合权重（默认 {DEFAULT_MIX}）")
+    parser.add_argument('--pool', choices=POOLS, default='character', help="祈愿请求的卡池（默认 character）")
+    parser.add_argument('--auto-count', type=int, default=10000, help="auto 请求的抽数（默认 10000）")
+    parser.add_argument('--goal-resources', type=int, default=180, help="goal 请求的资源抽数（默认 180）")
+    parser.add_argument('--goal-trials', type=int, default=None, help="goal 请求的模拟次数（默认使用服务端默认值）")
+    parser.add_argument('--cacheable-goals', action='store_true', help="goal 请求使用固定种子（测量响应缓存命中路径）")
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help=f"客户端最大并发请求数（默认 {DEFAULT_MAX_IN_FLIGHT}）")
+    parser.add_argument('--seed', type=int, default=None, help="请求组合和到达时间的随机种子")
+    parser.add_argument('--output', default=None, help="将结果保存为 JSON 文件")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    try:
+        rates = [float(rate) for rate in args.rate.split(',')]
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if any(rate <= 0 for rate in rates) or args.duration <= 0 or args.warmup < 0 or args.max_in_flight <= 0:
+        parser.error("到达率、测量时间和并发数必须为正数")
+
+    process = None
+    if args.spawn:
+        print("[INFO] 启动独立后端...", file=sys.stderr, flush=True)
+        process, port = spawn_backend()
+        host = '127.0.0.1'
+    else:
+        try:
+            host, port = check_local(args.url)
+        except ValueError as e:
+            parser.error(str(e))
+
+    rng = random.Random(args.seed)
+    factory = RequestFactory(mix, args.pool, args.auto_count, args.goal_resources,
+                             args.goal_trials, args.cacheable_goals, rng)
+    summaries = []
+    try:
+        for rate in rates:
+            print(f"[INFO] 到达率 {rate:g} 请求/秒，预热 {args.warmup:g} 秒 + 测量 {args.duration:g} 秒...",
+                  file=sys.stderr, flush=True)
+            run = run_rate(host, port, factory, rate, args.duration, args.warmup, args.arrival, args.max_in_flight)
+            summary = summarize(run)
+            summaries.append(summary)
+            if not args.json:
+                print_summary(summary)
+    finally:
+        if process is not None:
+            stop_backend(process)
+
+    result = {
+        'config': {
+            'target': 'spawn' if args.spawn else args.url, 'mix': mix, 'pool': args.pool,
+            'auto_count': args.auto_count, 'goal_resources': args.goal_resources, 'goal_trials': args.goal_trials,
+            'cacheable_goals': args.cacheable_goals, 'arrival': args.arrival, 'duration': args.duration,
+            'warmup': args.warmup, 'max_in_flight': args.max_in_flight,
+        },
+        'runs': summaries,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""内存剖析 - 在 tracemalloc 下运行自动模拟，按数据结构报告内存占用
+
+简要说明：
+- 在 tracemalloc 下运行一次 `simulate_pulls`（与接口自动模拟相同的参数），报告：
+  - 整体：tracemalloc 记录的峰值、模拟结束后仍被结果引用的内存、进程峰值 RSS 的增长
+  - 按数据结构：模拟器源码中每个分配位置（如 `five_star_costs.append`、`pity_history.append`）在模拟过程中的峰值和结束时的占用；
+    模拟过程中按固定间隔拍摄快照（借助进度回调），取各位置的最大值，因此也能看到模拟中途释放的临时结构
+  - 按结果字段：返回字典中每个字段的深度大小（NumPy 数组按 nbytes）
+- `--rss`：不启用 tracemalloc，只报告模拟期间进程峰值 RSS（相对模拟前的 RSS）的增长；基准测试套件在独立子进程中以该模式测量内存随抽数的增长
+- 峰值 RSS 读取 /proc/self/status 的 VmHWM，模拟前通过 /proc/self/clear_refs 重置为当前 RSS；
+  ru_maxrss 会继承 fork 时父进程的峰值（exec 后也不重置），只在没有 /proc 的平台上使用
+- tracemalloc 会使模拟显著变慢，只用于离线排查，不在线上进程中运行
+
+主要用法：
+- `python -m backend.benchmark.memory_profile character 1000000`
+- 武器池（定轨）并返回明细数组：`python -m backend.benchmark.memory_profile weapon 1000000 --strategy 5星UP武器-1 --detail`
+- 快照次数和显示的位置数：`--snapshots 20 --top 15`；JSON 输出：`--json`
+"""
+
+import argparse
+import json
+import linecache
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+try:
+    import resource  # 仅 Unix；Windows 上不报告 RSS
+except ImportError:
+    resource = None
+
+import numpy as np
+
+from backend.wish import CharacterWish, CharacterWish2, WeaponWish
+
+SIMULATORS = {
+    'character': CharacterWish.CharacterWishSimulator,
+    'character2': CharacterWish2.CharacterWishSimulator2,
+    'weapon': WeaponWish.WeaponWishSimulator,
+}
+
+DEFAULT_SNAPSHOTS = 10  # 模拟过程中拍摄的快照数
+DEFAULT_TOP = 10  # 报告中列出的分配位置数
+SEED = 20240101
+
+# 从分配位置的源码中提取数据结构名称：`name.append(...)`、`name = ...`、`name: type = ...`
+_STRUCTURE_PATTERN = re.compile(r'^(?:self\.)?([A-Za-z_][\w.]*?)(?:\.append\(|\.extend\(|\s*(?::[^=]+)?=(?!=))')
+
+
+def _proc_status(field: str) -> int | None:
+    """读取 /proc/self/status 中的内存字段（字节，仅 Linux）；不支持时返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024  # 单位为 kB
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def peak_rss() -> int | None:
+    """进程峰值 RSS（字节）：优先读取 VmHWM，否则为 ru_maxrss；不支持时返回 None"""
+    peak = _proc_status('VmHWM')
+    if peak is not None or resource is None:
+        return peak
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024  # macOS 为字节，Linux 为 KB
+
+
+def current_rss() -> int | None:
+    """进程当前 RSS（字节，读取 /proc，仅 Linux）；不支持时返回 None"""
+    return _proc_status('VmRSS')
+
+
+def _reset_peak_rss() -> bool:
+    """将 VmHWM 重置为当前 RSS（Linux 4.0+）；不支持时返回 False"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rss_baseline() -> int | None:
+    """计算 RSS 增长的起点（模拟前的当前 RSS）
+
+    先重置峰值，使导入阶段的临时峰值和 fork 时继承的父进程峰值都不会掩盖模拟的增长；
+    无法读取当前 RSS 时退回峰值 RSS。
+    """
+    _reset_peak_rss()
+    rss = current_rss()
+    return rss if rss is not None else peak_rss()
+
+
+def _simulate(name: str, count: int, strategy: str | None, detail: bool, progress_callback=None,
+              progress_interval: int = 10000) -> dict:
+    sim = SIMULATORS[name](seed=SEED)
+    if name == 'weapon':
+        return sim.simulate_pulls(count, strategy, progress_callback, progress_interval, detail=detail)
+    return sim.simulate_pulls(count, progress_callback, progress_interval, detail=detail)
+
+
+def measure_rss(name: str, count: int, strategy: str | None = None, detail: bool = False) -> dict:
+    """模拟前后的进程峰值 RSS 及其增长（字节）"""
+    before = _rss_baseline()
+    start = time.perf_counter()
+    result = _simulate(name, count, strategy, detail)
+    elapsed = time.perf_counter() - start
+    after = peak_rss()
+    del result
+    return {
+        'simulator': name,
+        'count': count,
+        'rss_before': before,
+        'rss_peak': after,
+        'rss_growth': None if before is None else max(0, after - before),
+        'elapsed': elapsed,
+    }
+
+
+def _structure_name(filename: str, lineno: int) -> str:
+    """分配位置对应的数据结构名称（无法识别时返回源码本身）"""
+    line = linecache.getline(filename, lineno).strip()
+    match = _STRUCTURE_PATTERN.match(line)
+    if match:
+        return f"{match.group(1)}.append" if '.append(' in line[:match.end()] else match.group(1)
+    return line[:60] or '?'
+
+
+def _site_sizes(snapshot: tracemalloc.Snapshot, source_file: str) -> dict[tuple[str, int], int]:
+    """快照中模拟器源码内各分配位置的占用（字节）"""
+    filtered = snapshot.filter_traces([tracemalloc.Filter(True, source_file)])
+    return {(stat.traceback[0].filename, stat.traceback[0].lineno): stat.size
+            for stat in filtered.statistics('lineno')}
+
+
+def deep_size(value, _seen=None) -> int:
+    """对象的深度大小（字节）：NumPy 数组按 nbytes，容器递归累加元素（共享对象只计一次）"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return value.nbytes + sys.getsizeof(value) - (value.nbytes if value.flags.owndata else 0)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, _seen) + deep_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, _seen) for item in value)
+    return size
+
+
+def profile(name: str, count: int, strategy: str | None = None, detail: bool = False,
+            snapshots: int = DEFAULT_SNAPSHOTS) -> dict:
+    """在 tracemalloc 下运行一次模拟，返回整体、按分配位置和按结果字段的内存占用"""
+    source_file = sys.modules[SIMULATORS[name].__module__].__file__
+    interval = max(1, count // max(1, snapshots))
+    peaks: dict[tuple[str, int], int] = {}
+
+    def take_snapshot(progress=None):
+        for site, size in _site_sizes(tracemalloc.take_snapshot(), source_file).items():
+            if size > peaks.get(site, 0):
+                peaks[site] = size
+
+    rss_before = _rss_baseline()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = _simulate(name, count, strategy, detail, take_snapshot, interval)
+        elapsed = time.perf_counter() - start
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        final = _site_sizes(tracemalloc.take_snapshot(), source_file)
+    finally:
+        tracemalloc.stop()
+    rss_after = peak_rss()
+    for site, size in final.items():
+        peaks[site] = max(peaks.get(site, 0), size)
+
+    structures = {}
+    for (filename, lineno), peak in peaks.items():
+        label = _structure_name(filename, lineno)
+        entry = structures.setdefault(label, {'peak': 0, 'retained': 0, 'lines': []})
+        entry['peak'] += peak
+        entry['retained'] += final.get((filename, lineno), 0)
+        entry['lines'].append(lineno)
+    for entry in structures.values():
+        entry['lines'].sort()
+
+    return {
+        'simulator': name,
+        'count': count,
+        'strategy': strategy,
+        'detail': detail,
+        'elapsed': elapsed,
+        'traced_peak': traced_peak,
+        'traced_retained': traced_current,
+        'rss_growth': None if rss_before is None else max(0, rss_after - rss_before),
+        'snapshots': snapshots,
+        'structures': dict(sorted(structures.items(), key=lambda item: item[1]['peak'], reverse=True)),
+        'result_fields': dict(sorted(((key, deep_size(value)) for key, value in result.items()),
+                                     key=lambda item: item[1], reverse=True)),
+    }
+
+
+def _format_bytes(size: int | None) -> str:
+    if size is None:
+        return '-'
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.2f}GiB"
+
+
+def print_report(report: dict, top: int = DEFAULT_TOP) -> None:
+    print(f"{report['simulator']} simulate_pulls({report['count']:,}"
+          f"{', strategy=' + report['strategy'] if report['strategy'] else ''}"
+          f"{', detail=True' if report['detail'] else ''})  {report['elapsed']:.2f}s（tracemalloc 下）")
+    print(f"  tracemalloc 峰值 {_format_bytes(report['traced_peak'])}，结束时占用 {_format_bytes(report['traced_retained'])}，"
+          f"峰值 RSS 增长 {_format_bytes(report['rss_growth'])}")
+    print(f"\n{'structure':<36}{'peak':>12}{'retained':>12}  lines")
+    for label, entry in list(report['structures'].items())[:top]:
+        lines = ','.join(str(line) for line in entry['lines'])
+        print(f"{label:<36}{_format_bytes(entry['peak']):>12}{_format_bytes(entry['retained']):>12}  {lines}")
+    print(f"\n{'result field':<36}{'size':>12}")
+    for key, size in list(report['result_fields'].items())[:top]:
+        print(f"{key:<36}{_format_bytes(size):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在 tracemalloc 下运行自动模拟，按数据结构报告内存占用")
+    parser.add_argument('simulator', choices=sorted(SIMULATORS), help="模拟器")
+    parser.add_argument('count', type=int, help="模拟抽数")
+    parser.add_argument('--strategy', default=None, help="武器池定轨策略（如 5星UP武器-1）")
+    parser.add_argument('--detail', action='store_true', help="同时返回明细 NumPy 数组（与接口的 detail 参数相同）")
+    parser.add_argument('--snapshots', type=int, default=DEFAULT_SNAPSHOTS, help="模拟过程中拍摄的快照数")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="列出的数据结构 / 结果字段数")
+    parser.add_argument('--rss', action='store_true', help="不启用 tracemalloc，只测量峰值 RSS 的增长")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出")
+    args = parser.parse_args()
+    if args.count <= 0 or args.snapshots <= 0:
+        parser.error("count 和 --snapshots 必须为正数")
+    if args.strategy and args.simulator != 'weapon':
+        parser.error("--strategy 只适用于武器池")
+
+    if args.rss:
+        report = measure_rss(args.simulator, args.count, args.strategy, args.detail)
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print(f"{args.simulator} simulate_pulls({args.count:,})  峰值 RSS {_format_bytes(report['rss_peak'])}，"
+                  f"模拟期间增长 {_format_bytes(report['rss_growth'])}（{report['elapsed']:.2f}s）")
+        return
+
+    report = profile(args.simulator, args.count, args.strategy, args.detail, args.snapshots)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""请求回放 - 将录制的请求按原始（或缩放后的）节奏重新发往本机后端，比较延迟和结果
+
+简要说明：
+- 读取后端在 WISH_RECORD_DIR 中录制的请求日志（`*.ndjson` 和已滚动压缩的 `*.ndjson.gz`，多个进程的日志按时间合并）
+- 按录制时的到达间隔发出请求（开环，不等待前一个请求完成）；`--speed 2` 以两倍速回放，`--speed 0` 不保留间隔、尽快发出
+- 延迟：录制值为服务端处理耗时，回放值为客户端观测的端到端耗时（本机回放时网络开销很小），按接口（和祈愿 action）分组比较分位数
+- 结果：确定性结果（可缓存的目标概率 / 所需抽数响应）比较响应体摘要，不一致的请求列出样例；随机结果（单抽、十连、自动模拟）只比较状态码
+- 存在结果不一致时以非零状态退出，可用于验证优化后的版本在真实流量下结果不变
+- 只连接本机地址；`--spawn` 在空闲端口启动一个独立的后端进程
+
+主要用法：
+- 录制：启动后端前设置 `WISH_RECORD_DIR=/var/log/wish-requests`（可选 WISH_RECORD_SAMPLE_RATE=0.1 只录制 10%）
+- 回放：`python -m backend.benchmark.replay /var/log/wish-requests --spawn`
+- 两倍速回放到已运行的后端：`python -m backend.benchmark.replay requests.ndjson --url http://127.0.0.1:8888 --speed 2`
+- 只回放部分接口：`--filter /api/goal_probability --limit 500`
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.benchmark.load_test import (
+    DEFAULT_MAX_IN_FLIGHT, DEFAULT_URL, PERCENTILES, REQUEST_TIMEOUT,
+    _format_latency, _percentile, check_local, spawn_backend, stop_backend
+)
+from backend.utils.request_log import body_digest, read_records
+
+MAX_DIFFERENCE_EXAMPLES = 10  # 报告中列出的结果不一致样例数
+
+
+def group_name(entry: dict) -> str:
+    """分组名称：接口路径（不含查询字符串），祈愿接口附加 action"""
+    path = urlsplit(entry['p']).path
+    body = entry.get('b')
+    if path.startswith('/api/wish') and isinstance(body, dict):
+        return f"{path}:{body.get('action', 'auto' if path.endswith('/stream') else '?')}"
+    return path
+
+
+def _send(host: str, port: int, entry: dict) -> tuple[int, bytes]:
+    """重新发出一条录制的请求，返回 (状态码, 响应体)"""
+    headers = {}
+    body = None
+    if entry.get('b') is not None:
+        body = json.dumps(entry['b'], ensure_ascii=False).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    if entry.get('a'):
+        headers['Accept'] = entry['a']
+    conn = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT)
+    try:
+        conn.request(entry['m'], entry['p'], body, headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def replay(host: str, port: int, records: list[dict], speed: float = 1.0,
+           max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, progress: bool = True) -> list[dict]:
+    """按录制的到达间隔（除以 speed）回放，返回每条请求的回放结果"""
+    results = [None] * len(records)
+    first = records[0]['t'] if records else 0.0
+
+    def send(index, entry, scheduled):
+        started = time.perf_counter()
+        try:
+            status, body = _send(host, port, entry)
+        except (OSError, http.client.HTTPException) as e:
+            status, body = type(e).__name__, b''
+        finished = time.perf_counter()
+        result = {'status': status, 'latency': finished - (scheduled if speed > 0 else started)}
+        if 'h' in entry and status == 200:
+            result['digest'] = body_digest(body)
+        results[index] = result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='replay') as executor:
+        for index, entry in enumerate(records):
+            scheduled = start + ((entry['t'] - first) / speed if speed > 0 else 0.0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, index, entry, scheduled)
+            if progress and (index + 1) % 1000 == 0:
+                print(f"[INFO] 已发出 {index + 1}/{len(records)} 个请求", file=sys.stderr, flush=True)
+    return results
+
+
+def compare(records: list[dict], results: list[dict]) -> dict:
+    """按分组比较录制和回放的状态码、延迟分位数和确定性结果"""
+    groups = {}
+    differences = []
+    for entry, result in zip(records, results):
+        name = group_name(entry)
+        group = groups.setdefault(name, {
+            'requests': 0, 'status_mismatches': {}, 'results_same': 0, 'results_different': 0,
+            'recorded': [], 'replayed': [],
+        })
+        group['requests'] += 1
+        if result['status'] != entry.get('s'):
+            key = f"{entry.get('s')}->{result['status']}"
+            group['status_mismatches'][key] = group['status_mismatches'].get(key, 0) + 1
+        if 'digest' in result:
+            if result['digest'] == entry['h']:
+                group['results_same'] += 1
+            else:
+                group['results_different'] += 1
+                if len(differences) < MAX_DIFFERENCE_EXAMPLES:
+                    differences.append({'method': entry['m'], 'path': entry['p'], 'body': entry.get('b')})
+        if result['status'] == 200 and entry.get('s') == 200:
+            group['recorded'].append(entry.get('d', 0.0) / 1000)
+            group['replayed'].append(result['latency'])
+
+    summary = {}
+    for name, group in sorted(groups.items()):
+        recorded, replayed = sorted(group.pop('recorded')), sorted(group.pop('replayed'))
+        group['latency'] = {
+            f'p{p}': {'recorded': _percentile(recorded, p), 'replayed': _percentile(replayed, p)}
+            for p in PERCENTILES
+        }
+        summary[name] = group
+    return {
+        'groups': summary,
+        'result_differences': sum(group['results_different'] for group in summary.values()),
+        'difference_examples': differences,
+    }
+
+
+def _format_change(recorded, replayed) -> str:
+    if not recorded or replayed is None:
+        return '-'
+    return f"{(replayed / recorded - 1) * 100:+.0f}%"
+
+
+def print_report(report: dict) -> None:
+    print(f"{'endpoint':<44}{'n':>6}{'p50 rec':>10}{'p50 new':>10}{'change':>8}"
+          f"{'p99 rec':>10}{'p99 new':>10}{'results':>12}  status changes")
+    for name, group in report['groups'].items():
+        p50, p99 = group['latency']['p50'], group['latency']['p99']
+        compared = group['results_same'] + group['results_different']
+        results = f"{group['results_same']}/{compared}" if compared else '-'
+        mismatches = ', '.join(f"{key}×{count}" for key, count in sorted(group['status_mismatches'].items()))
+        print(f"{name:<44}{group['requests']:>6}"
+              f"{_format_latency(p50['recorded']):>10}{_format_latency(p50['replayed']):>10}"
+              f"{_format_change(p50['recorded'], p50['replayed']):>8}"
+              f"{_format_latency(p99['recorded']):>10}{_format_latency(p99['replayed']):>10}"
+              f"{results:>12}  {mismatches}")
+    for example in report['difference_examples']:
+        body = json.dumps(example['body'], ensure_ascii=False) if example['body'] is not None else ''
+        print(f"[DIFF] {example['method']} {example['path']} {body}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的请求，比较延迟和结果")
+    parser.add_argument('logs', nargs='+', metavar='PATH', help="请求日志文件或目录（WISH_RECORD_DIR）")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default=DEFAULT_URL, help=f"后端地址，只允许本机（默认 {DEFAULT_URL}）")
+    target.add_argument('--spawn', action='store_true', help="在空闲端口启动独立的后端进程，回放结束后关闭")
+    parser.add_argument('--speed', type=float, default=1.0, help="回放速度倍数（默认 1 为原始节奏，0 为尽快发出）")
+    parser.add_argument('--filter', action='append', default=None, metavar='PREFIX',
+                        help="只回放路径以该前缀开头的请求（可重复指定）")
+    parser.add_argument('--limit', type=int, default=None, help="最多回放的请求数")
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help=f"客户端最大并发请求数（默认 {DEFAULT_MAX_IN_FLIGHT}）")
+    parser.add_argument('--output', default=None, help="将比较结果保存为 JSON 文件")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出比较结果")
+    args = parser.parse_args()
+    if args.speed < 0 or args.max_in_flight <= 0:
+        parser.error("--speed 不能为负数，--max-in-flight 必须为正数")
+
+    records = read_records(args.logs)
+    if args.filter:
+        records = [entry for entry in records if any(entry['p'].startswith(prefix) for prefix in args.filter)]
+    if args.limit is not None:
+        records = records[:args.limit]
+    if not records:
+        parser.error("没有可回放的请求")
+
+    process = None
+    if args.spawn:
+        print("[INFO] 启动独立后端...", file=sys.stderr, flush=True)
+        process, port = spawn_backend()
+        host = '127.0.0.1'
+    else:
+        try:
+            host, port = check_local(args.url)
+        except ValueError as e:
+            parser.error(str(e))
+
+    span = records[-1]['t'] - records[0]['t']
+    print(f"[INFO] 回放 {len(records)} 个请求（录制时长 {span:.1f} 秒，速度 ×{args.speed:g}）...",
+          file=sys.stderr, flush=True)
+    try:
+        results = replay(host, port, records, args.speed, args.max_in_flight, progress=not args.json)
+    finally:
+        if process is not None:
+            stop_backend(process)
+
+    report = compare(records, results)
+    report['config'] = {'requests': len(records), 'speed': args.speed, 'recorded_span': span}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+    if report['result_differences']:
+        if not args.json:
+            print(f"\n✗ {report['result_differences']} 个确定性请求的结果与录制时不同")
+        sys.exit(1)
+    if not args.json:
+        print("\n✓ 确定性结果与录制时一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""启动耗时 - 多次冷启动后端，测量就绪时间、首个请求耗时和各模块的导入耗时
+
+简要说明：
+- 每轮在空闲端口启动一个生产模式的后端进程（与服务器管理器相同的启动方式），从启动进程起计时：
+  - `ready`：首次 `/api/health` 返回 200 的时间（每 10 毫秒轮询一次）
+  - `first_wish`：就绪后第一个十连请求的耗时
+  - `first_goal`：第一个目标概率请求的耗时（目标概率引擎在此时按需加载，包括其导入耗时）
+- 从后端的 `/api/metrics` 读取服务端记录的启动里程碑（导入完成、应用就绪、首个请求完成，均为距进程启动的秒数；
+  首个请求不包括 `/api/health` 探针和 `/api/metrics` 抓取，即此处的首个十连请求）
+  和各模块组的首次导入耗时（包括按需加载的模块）
+- 报告各项在多轮中的中位数和最大值；`--budget` 设置就绪时间的预算（秒），中位数超过预算时以非零状态退出
+
+主要用法：
+- `python -m backend.benchmark.startup_time --runs 5`
+- 部署前检查：`python -m backend.benchmark.startup_time --runs 5 --budget 1.5`
+- 保存结果：`--output startup.json`（或 `--json` 输出到标准输出）
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 添加项目根目录到系统路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from backend.benchmark.load_test import REQUEST_TIMEOUT, SPAWN_READY_TIMEOUT, _free_port, stop_backend
+
+DEFAULT_RUNS = 5
+POLL_INTERVAL = 0.01  # 就绪轮询间隔（秒）
+FIRST_WISH = {'mode': 'character', 'action': 'ten'}
+FIRST_GOAL = {'target_weapon_refinement_1': 1, 'resources': 180, 'trials': 1000, 'seed': 20240101}
+STARTUP_METRICS = {'wish_startup_seconds': 'milestones', 'wish_startup_import_seconds': 'imports'}
+
+
+def _request(port: int, method: str, path: str, body: dict | None = None,
+             timeout: float = REQUEST_TIMEOUT) -> tuple[int, bytes]:
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, payload, headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def _timed_request(port: int, path: str, body: dict) -> float:
+    start = time.perf_counter()
+    status, _ = _request(port, 'POST', path, body)
+    if status != 200:
+        raise RuntimeError(f"{path}: HTTP {status}")
+    return time.perf_counter() - start
+
+
+def parse_startup_metrics(text: str) -> dict:
+    """从 Prometheus 文本中读取启动里程碑和导入耗时"""
+    result = {section: {} for section in STARTUP_METRICS.values()}
+    for line in text.splitlines():
+        name, _, rest = line.partition('{')
+        if name not in STARTUP_METRICS:
+            continue
+        labels, _, value = rest.rpartition('}')
+        label = labels.partition('="')[2].rstrip('"')
+        result[STARTUP_METRICS[name]][label] = float(value)
+    return result
+
+
+def measure_once() -> dict:
+    """冷启动一个后端进程，返回各项耗时（秒）"""
+    port = _free_port()
+    server_dir = os.path.join(project_root, 'backend', 'server')
+    env = dict(os.environ, WISH_PORT=str(port), WISH_PRODUCTION='1')
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'flask_server.py'], cwd=server_dir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                if _request(port, 'GET', '/api/health', timeout=0.5)[0] == 200:
+                    break
+            except (OSError, http.client.HTTPException):
+                pass
+            if process.poll() is not None or time.perf_counter() - start > SPAWN_READY_TIMEOUT:
+                raise RuntimeError(f"后端未能在 {SPAWN_READY_TIMEOUT:g} 秒内就绪（退出码 {process.poll()}）")
+            time.sleep(POLL_INTERVAL)
+        ready = time.perf_counter() - start
+        first_wish = _timed_request(port, '/api/wish', FIRST_WISH)
+        first_goal = _timed_request(port, '/api/goal_probability', FIRST_GOAL)
+        _, metrics = _request(port, 'GET', '/api/metrics')
+    finally:
+        stop_backend(process)
+    return {
+        'ready': ready,
+        'first_wish': first_wish,
+        'first_goal': first_goal,
+        **parse_startup_metrics(metrics.decode('utf-8')),
+    }
+
+
+def summarize(runs: list[dict]) -> dict:
+    """各项耗时在多轮中的中位数和最大值"""
+    def stats(values):
+        return {'median': statistics.median(values), 'max': max(values)} if values else None
+
+    summary = {key: stats([run[key] for run in runs]) for key in ('ready', 'first_wish', 'first_goal')}
+    for section in STARTUP_METRICS.values():
+        names = dict.fromkeys(name for run in runs for name in run[section])
+        summary[section] = {name: stats([run[section][name] for run in runs if name in run[section]])
+                            for name in names}
+    return summary
+
+
+def _format_seconds(seconds: float) -> str:
+    return f"{seconds * 1e3:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+def print_report(summary: dict, runs: int) -> None:
+    print(f"{runs} 次冷启动（客户端测量，从启动进程起）")
+    print(f"  {'':<40}{'median':>10}{'max':>10}")
+    for key, label in (('ready', '就绪（首次 /api/health 成功）'), ('first_wish', '首个十连请求'),
+                       ('first_goal', '首个目标概率请求（含按需加载）')):
+        print(f"  {label:<40}{_format_seconds(summary[key]['median']):>10}{_format_seconds(summary[key]['max']):>10}")
+    print("服务端里程碑（距进程启动）")
+    for name, item in summary['milestones'].items():
+        print(f"  {name:<40}{_format_seconds(item['median']):>10}{_format_seconds(item['max']):>10}")
+    print("首次导入耗时")
+    for name, item in sorted(summary['imports'].items(), key=lambda pair: pair[1]['median'], reverse=True):
+        print(f"  {name:<40}{_format_seconds(item['median']):>10}{_format_seconds(item['max']):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多次冷启动后端，测量就绪时间和各模块的导入耗时")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help=f"冷启动次数（默认 {DEFAULT_RUNS}）")
+    parser.add_argument('--budget', type=float, default=None, metavar='SECONDS',
+                        help="就绪时间预算（秒）：中位数超过预算时以非零状态退出")
+    parser.add_argument('--output', default=None, help="将结果保存为 JSON 文件")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出结果")
+    args = parser.parse_args()
+    if args.runs <= 0:
+        parser.error("--runs 必须为正数")
+
+    runs = []
+    for index in range(args.runs):
+        if not args.json:
+            print(f"[INFO] 冷启动 {index + 1}/{args.runs}...", file=sys.stderr, flush=True)
+        runs.append(measure_once())
+    report = {'runs': runs, 'summary': summarize(runs), 'budget': args.budget}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report['summary'], len(runs))
+
+    ready = report['summary']['ready']['median']
+    if args.budget is not None:
+        if ready > args.budget:
+            if not args.json:
+                print(f"\n✗ 就绪时间中位数 {_format_seconds(ready)} 超过预算 {_format_seconds(args.budget)}")
+            sys.exit(1)
+        if not args.json:
+            print(f"\n✓ 就绪时间中位数 {_format_seconds(ready)}，预算 {_format_seconds(args.budget)}")
+
+
+if __name__ == "__main__":
+    main()
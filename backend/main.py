@@ -8,6 +8,8 @@
 主要用法：
 - 运行：`python backend/main.py`
 - 系统会自动启动前端和后端服务器
+- 生产模式：先 `npm run build`，再运行 `python backend/main.py --production`（或设置 WISH_PRODUCTION=1），
+  由后端直接提供 dist/，不启动 Vite 开发服务器
 """
 
 import sys
@@ -21,7 +23,8 @@ from backend.server.server_manager import WishServerManager
 
 def main():
     """主函数"""
-    manager = WishServerManager()
+    production = True if '--production' in sys.argv[1:] else None
+    manager = WishServerManager(production=production)
     manager.run()
 
 if __name__ == "__main__":
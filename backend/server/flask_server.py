@@ -8,53 +8,203 @@
 
 主要API：
 - POST /api/wish - 处理祈愿请求
+- POST /api/wish/stream - 自动模拟的流式进度（SSE / NDJSON）
+- POST /api/goal_probability/stream - 目标概率估算的流式进度（SSE / NDJSON）
+- POST /api/goal_probability/batch - 批量估算多个场景的目标概率（共享模拟）
+- GET|POST /api/goal_probability/grid - 固定抽数下命之座 × 精炼的概率网格
+- POST /api/jobs - 提交异步计算任务（目标概率、所需抽数）
+- GET /api/jobs/<job_id> - 查询任务进度与结果
+- DELETE /api/jobs/<job_id> - 取消任务
+- GET /api/health - 就绪探针（服务器管理器轮询）
+- GET /api/metrics - Prometheus 格式的运行指标（请求延迟、模拟吞吐量、缓存命中率）
 - POST /api/shutdown - 关闭服务器
+- GET /<path> - 生产模式（设置 WISH_STATIC_DIR）下提供预构建的前端资源
 """
 
 import sys
 import os
 import json
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import functools
+import hashlib
+import hmac
+import tempfile
+import time
 
-# 添加项目根目录到系统路径
+# 添加项目根目录到系统路径（直接运行本文件时 backend 包才能导入）
 current_dir = os.path.dirname(os.path.abspath(__file__))
 backend_dir = os.path.dirname(current_dir)
 project_root = os.path.dirname(backend_dir)
-
-# 添加必要的路径到系统路径
 sys.path.insert(0, project_root)
-sys.path.insert(0, backend_dir)
-
-# 直接指定抽卡模拟器模块的路径
-CharacterWish_path = os.path.join(backend_dir, "wish", "CharacterWish.py")
-CharacterWish2_path = os.path.join(backend_dir, "wish", "CharacterWish2.py")
-WeaponWish_path = os.path.join(backend_dir, "wish", "WeaponWish.py")
-GoalProbability_path = os.path.join(backend_dir, "wish", "GoalProbability.py")
-
-# 动态导入模块
-import importlib.util
-
-def import_module_from_path(module_name, file_path):
-    spec = importlib.util.spec_from_file_location(module_name, file_path)
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-    return module
-
-# 导入抽卡模拟器模块
-CharacterWish = import_module_from_path("CharacterWish", CharacterWish_path)
-CharacterWish2 = import_module_from_path("CharacterWish2", CharacterWish2_path)
-WeaponWish = import_module_from_path("WeaponWish", WeaponWish_path)
-GoalProbability = import_module_from_path("GoalProbability", GoalProbability_path)
+
+# 启动耗时：记录各模块的导入耗时，首个请求完成时输出报告
+from backend.utils import startup
+
+with startup.timed('flask'):
+    from flask import Flask, Response, g, request, send_file
+    from flask_cors import CORS
+
+# 抽卡模拟器（单抽、十连、自动模拟都需要，启动时导入；同时导入 NumPy）
+with startup.timed('backend.wish simulators'):
+    from backend.wish import CharacterWish, CharacterWish2, WeaponWish
+
+# 目标概率引擎在首次使用时才导入（阶段成本表等结果缓存同样在首次计算时建立）
+GoalProbability = startup.LazyModule('backend.wish.GoalProbability')
 
 CharacterWishSimulator = CharacterWish.CharacterWishSimulator
 CharacterWishSimulator2 = CharacterWish2.CharacterWishSimulator2
 WeaponWishSimulator = WeaponWish.WeaponWishSimulator
 
+with startup.timed('backend.utils'):
+    from backend.utils.admission import (
+        AdmissionController, AdmissionRejected, EndpointLimit, RequestTooExpensive
+    )
+    from backend.utils.binary import choose_binary_format, encode as encode_result
+    from backend.utils.compression import compress_response
+    from backend.utils.encoding import dumps as encode_json
+    from backend.utils.job_queue import JobManager, JobQueueFull
+    from backend.utils.metrics import (
+        COUNTER, GAUGE, HISTOGRAM, MetricsRegistry, MultiProcessStore, render_prometheus
+    )
+    from backend.utils.profiling import format_summary, profile_call, save_profile, summarize
+    from backend.utils.request_log import (
+        DEFAULT_BACKUPS, DEFAULT_MAX_BYTES, RequestRecorder, body_digest, normalize_body
+    )
+    from backend.utils.response_cache import ResponseCache
+    from backend.utils.single_flight import SingleFlight
+    from backend.utils.static_assets import resolve_asset
+    from backend.utils.streaming import (
+        NDJSON_MIMETYPE, SSE_MIMETYPE, choose_stream_format, stream_events
+    )
+    from backend.wish import instrumentation
+startup.mark('imports')
+
+# 异步计算任务配置（可通过环境变量调整）
+JOB_QUEUE_SIZE = int(os.environ.get('WISH_JOB_QUEUE_SIZE', 16))  # 排队任务上限
+JOB_WORKERS = int(os.environ.get('WISH_JOB_WORKERS', 2))  # 计算工作线程数
+JOB_RESULT_TTL = float(os.environ.get('WISH_JOB_RESULT_TTL', 300))  # 结果保留时间（秒）
+
+# 监听端口与实例标识（多实例部署时由服务器管理器为每个实例设置）
+PORT = int(os.environ.get('WISH_PORT', 8888))
+INSTANCE_ID = os.environ.get('WISH_INSTANCE_ID', '')  # 非空时作为任务ID前缀，负载均衡器据此路由任务查询
+
+# 确定性计算结果的 HTTP 缓存配置
+RESPONSE_CACHE_SIZE = int(os.environ.get('WISH_RESPONSE_CACHE_SIZE', 256))  # 响应缓存条目上限
+CACHE_MAX_AGE = int(os.environ.get('WISH_CACHE_MAX_AGE', 300))  # 客户端 / 代理缓存时间（秒）
+
+# 批量目标概率请求的场景数上限
+MAX_BATCH_SCENARIOS = int(os.environ.get('WISH_MAX_BATCH_SCENARIOS', 64))
+
+# 任务类型 -> 目标概率（None 表示目标达成概率计算）
+JOB_KINDS = {
+    'goal_probability': None,
+    'required_pulls_95': 0.95,
+    'required_pulls_50': 0.5,
+}
+
+# CPU 密集型接口的默认并发限制，可通过 WISH_LIMIT_<NAME>_CONCURRENCY / _QUEUE / _TIMEOUT 覆盖
+# 单抽和十连不受限制，避免被长耗时计算饿死
+ADMISSION_LIMITS = {
+    'wish_auto': EndpointLimit(max_concurrent=2, max_queue=8, queue_timeout=30.0),
+    'goal_probability': EndpointLimit(max_concurrent=2, max_queue=8, queue_timeout=30.0),
+    'required_pulls': EndpointLimit(max_concurrent=1, max_queue=4, queue_timeout=60.0),
+}
+
+# 生产模式：由后端直接提供预构建的前端（dist/），不运行 Vite 开发服务器和代理
+STATIC_DIR = os.environ.get('WISH_STATIC_DIR') or None  # dist 目录，未设置时不提供静态资源
+PRODUCTION = os.environ.get('WISH_PRODUCTION', '0') == '1'  # 关闭调试模式和自动重载
+
+# 运行指标：多实例部署时由服务器管理器设置共享目录，/api/metrics 合并所有实例的指标
+METRICS_DIR = os.environ.get('WISH_METRICS_DIR') or None
+# 带 action 标签的接口 -> (默认 action, 允许的取值)；其他取值记为 other，限制标签基数
+METRICS_ACTIONS = {'/api/wish': (None, ('one', 'ten', 'auto')), '/api/wish/stream': ('auto', ('auto',))}
+# 不计入 first_request 启动里程碑的接口：就绪探针和指标抓取在启动后立即到达，不代表首个实际请求
+STARTUP_IGNORED_ENDPOINTS = frozenset({'/api/health', '/api/metrics'})
+
+metrics = MetricsRegistry()
+metrics.describe('wish_http_requests_total', COUNTER, 'HTTP requests by endpoint, action and status')
+metrics.describe('wish_http_request_duration_seconds', HISTOGRAM, 'HTTP request latency including streamed bodies')
+metrics.describe('wish_http_requests_in_flight', GAUGE, 'HTTP requests currently being processed')
+metrics.describe('wish_simulated_pulls_total', COUNTER, 'Wish pulls simulated by /api/wish and /api/wish/stream')
+metrics.describe('wish_goal_trials_total', COUNTER, 'Monte Carlo trials simulated by goal probability computations (trial cache hits excluded)')
+metrics.describe('wish_cache_hits_total', COUNTER, 'Cache hits by cache')
+metrics.describe('wish_cache_misses_total', COUNTER, 'Cache misses by cache')
+metrics.describe('wish_cache_entries', GAUGE, 'Entries currently held by cache')
+metrics.describe('wish_admission_active', GAUGE, 'Requests holding an admission slot')
+metrics.describe('wish_admission_waiting', GAUGE, 'Requests queued for an admission slot')
+metrics.describe('wish_simulator_events_total', COUNTER,
+                 'draw_once branch counts by simulator, scope and event (WISH_SIM_COUNTERS)')
+metrics.describe('wish_startup_seconds', GAUGE, 'Seconds from process start to startup milestones')
+metrics.describe('wish_startup_import_seconds', GAUGE, 'First import time by module group, including lazy imports')
+metrics_store = MultiProcessStore(METRICS_DIR, metrics, INSTANCE_ID) if METRICS_DIR else None
+
+# 按请求开启的性能分析：仅在设置了令牌时可用，请求需带 `profile=1`（或 `X-Profile: 1`）和匹配的 `X-Profile-Token`
+PROFILE_TOKEN = os.environ.get('WISH_PROFILE_TOKEN') or None
+PROFILE_DIR = os.environ.get('WISH_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'wish-profiles')
+
+# 请求录制（供回放测试）：设置目录后录制计算类接口的请求参数、状态码和耗时，日志按大小滚动
+RECORD_DIR = os.environ.get('WISH_RECORD_DIR') or None
+RECORD_MAX_BYTES = int(os.environ.get('WISH_RECORD_MAX_BYTES', DEFAULT_MAX_BYTES))  # 单个日志文件的大小上限
+RECORD_BACKUPS = int(os.environ.get('WISH_RECORD_BACKUPS', DEFAULT_BACKUPS))  # 保留的滚动文件数量
+RECORD_SAMPLE_RATE = float(os.environ.get('WISH_RECORD_SAMPLE_RATE', 1.0))  # 录制的请求比例
+RECORD_ENDPOINTS = frozenset({
+    '/api/wish', '/api/wish/stream', '/api/goal_probability', '/api/goal_probability/stream',
+    '/api/goal_probability/batch', '/api/goal_probability/grid',
+    '/api/required_pulls_for_95_percent', '/api/required_pulls_for_50_percent', '/api/jobs',
+})
+
 app = Flask(__name__)
 CORS(app)  # 启用 CORS，允许跨域请求
 
+
+@app.after_request
+def compress(response):
+    """按 Accept-Encoding 压缩较大的响应和流式响应"""
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
+
+def json_response(data, status=None):
+    """使用可插拔编码器（优先 orjson）生成 JSON 响应，用法同 jsonify"""
+    return Response(encode_json(data), status=status, mimetype='application/json')
+
+
+def _profile_requested():
+    """当前请求是否要求性能分析（需要运维令牌）"""
+    if request.args.get('profile') != '1' and request.headers.get('X-Profile') != '1':
+        return False
+    return hmac.compare_digest(request.headers.get('X-Profile-Token', ''), PROFILE_TOKEN)
+
+
+def profiled(view):
+    """视图装饰器：按请求在 cProfile 下运行处理函数（包括结果编码），保存热点函数摘要
+
+    未设置 WISH_PROFILE_TOKEN 时原样返回视图，请求不经过任何额外代码。
+    分析期间模拟在当前线程中串行执行，响应头 `X-Profile-Id` 为保存的分析ID。
+    """
+    if PROFILE_TOKEN is None:
+        return view
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _profile_requested():
+            return view(*args, **kwargs)
+
+        def run():
+            with GoalProbability.compute_control(GoalProbability.ComputeControl(serial=True)):
+                return app.make_response(view(*args, **kwargs))
+
+        response, profile = profile_call(run)
+        summary = summarize(profile)
+        summary['path'] = request.full_path.rstrip('?')
+        profile_id = save_profile(profile, PROFILE_DIR, summary)
+        print(f"[PROFILE] {request.method} {summary['path']} -> {os.path.join(PROFILE_DIR, profile_id)}.prof\n"
+              f"{format_summary(summary)}")
+        response.headers['X-Profile-Id'] = profile_id
+        response.headers['Server-Timing'] = f"profile;dur={summary['total_time'] * 1000:.1f}"
+        return response
+
+    return wrapper
+
+
 class WishServer:
     """祈愿服务器类"""
     
@@ -63,6 +213,23 @@ class WishServer:
         self.character_simulator = None
         self.character_simulator_2 = None
         self.weapon_simulator = None
+        self.job_manager = JobManager(
+            self._run_job,
+            max_queue=JOB_QUEUE_SIZE,
+            workers=JOB_WORKERS,
+            result_ttl=JOB_RESULT_TTL,
+            id_prefix=f"{INSTANCE_ID}-" if INSTANCE_ID else "",
+        )
+        # 合并指纹相同的并发计算请求
+        self.single_flight = SingleFlight()
+        # CPU 密集型接口的并发限制与成本上限
+        self.admission = AdmissionController.from_env(ADMISSION_LIMITS)
+        # 目标概率、所需抽数结果的响应缓存（以 ETag 为键）
+        self.response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+        # 请求录制（未设置 WISH_RECORD_DIR 时关闭）
+        self.recorder = RequestRecorder(
+            RECORD_DIR, RECORD_MAX_BYTES, RECORD_BACKUPS, RECORD_SAMPLE_RATE, INSTANCE_ID
+        ) if RECORD_DIR else None
     
     def handle_wish(self):
         """处理祈愿请求"""
@@ -70,21 +237,34 @@ class WishServer:
             data = request.json
             mode = data.get('mode')
             action = data.get('action')
-            
-            if mode == 'character':
-                # 角色活动祈愿-1
-                return self._handle_character_wish(data, action, CharacterWishSimulator)
-            elif mode == 'character2':
-                # 角色活动祈愿-2
-                return self._handle_character_wish(data, action, CharacterWishSimulator2)
-            elif mode == 'weapon':
-                # 武器祈愿
-                return self._handle_weapon_wish(data, action)
-            else:
-                return jsonify({'error': 'Unknown mode'}), 400
+
+            if action == 'auto':
+                # 自动模拟：先检查抽数上限，再占用并发名额
+                self.admission.check_auto_count(data.get('count', 1000))
+                with self.admission.limiter('wish_auto').slot():
+                    return self._dispatch_wish(data, mode, action)
+            return self._dispatch_wish(data, mode, action)
+        except RequestTooExpensive as e:
+            return json_response({'error': str(e)}), 413
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
         except Exception as e:
             app.logger.error(f"Error handling wish request: {e}")
-            return jsonify({'error': str(e)}), 500
+            return json_response({'error': str(e)}), 500
+
+    def _dispatch_wish(self, data, mode, action):
+        """按祈愿类型分发请求"""
+        if mode == 'character':
+            # 角色活动祈愿-1
+            return self._handle_character_wish(data, action, CharacterWishSimulator)
+        elif mode == 'character2':
+            # 角色活动祈愿-2
+            return self._handle_character_wish(data, action, CharacterWishSimulator2)
+        elif mode == 'weapon':
+            # 武器祈愿
+            return self._handle_weapon_wish(data, action)
+        else:
+            return json_response({'error': 'Unknown mode'}), 400
 
     def _handle_character_wish(self, data, action, SimulatorClass):
         """处理角色祈愿的通用方法"""
@@ -125,21 +305,20 @@ class WishServer:
         if action == 'one':
             # 角色单抽
             result = sim.pull_one()
+            self._count_pulls(self._character_mode(SimulatorClass), 1)
             return self.process_character_result(result, five_star_up_name)
         elif action == 'ten':
             # 角色十连
             result = sim.pull_ten()
+            self._count_pulls(self._character_mode(SimulatorClass), 10)
             return self.process_character_ten_result(result, five_star_up_name)
         elif action == 'auto':
             # 角色自动模拟
-            count = data.get('count', 1000)
-            start_pity = data.get('start_pity', 0)
-            sim = SimulatorClass(start_pity)
-            result = sim.simulate_pulls(count)
-            result['total_pulls'] = count
-            return jsonify(result)
+            return self._result_response(
+                self._simulate_character_auto(data, SimulatorClass, columns=self._binary_requested())
+            )
         else:
-            return jsonify({'error': 'Unknown action'}), 400
+            return json_response({'error': 'Unknown action'}), 400
 
     def _handle_weapon_wish(self, data, action):
         """处理武器祈愿的通用方法"""
@@ -175,67 +354,539 @@ class WishServer:
         if action == 'one':
             # 武器单抽
             result = sim.pull_one()
+            self._count_pulls('weapon', 1)
             return self.process_weapon_result(result)
         elif action == 'ten':
             # 武器十连
             result = sim.pull_ten()
+            self._count_pulls('weapon', 10)
             return self.process_weapon_ten_result(result)
         elif action == 'auto':
             # 武器自动模拟
-            count = data.get('count', 1000)
-            start_pity = data.get('start_pity', 0)
-            strategy = data.get('strategy', None)
-            sim = WeaponWishSimulator(start_pity)
-            result = sim.simulate_pulls(count, strategy)
-            result['total_pulls'] = count
-            return jsonify(result)
+            return self._result_response(self._simulate_weapon_auto(data, columns=self._binary_requested()))
+        else:
+            return json_response({'error': 'Unknown action'}), 400
+
+    def _simulate_character_auto(self, data, SimulatorClass, progress_callback=None, columns=False):
+        """执行角色自动模拟，返回结果字典；`columns` 为 True 时5星记录按列返回（二进制响应用）"""
+        count = data.get('count', 1000)
+        start_pity = data.get('start_pity', 0)
+        sim = SimulatorClass(start_pity)
+        result = sim.simulate_pulls(
+            count, progress_callback, self._progress_interval(count), detail=bool(data.get('detail', False)),
+            five_star_columns=columns
+        )
+        result['total_pulls'] = count
+        self._count_pulls(self._character_mode(SimulatorClass), count)
+        return result
+
+    def _simulate_weapon_auto(self, data, progress_callback=None, columns=False):
+        """执行武器自动模拟，返回结果字典；`columns` 为 True 时5星记录按列返回（二进制响应用）"""
+        count = data.get('count', 1000)
+        start_pity = data.get('start_pity', 0)
+        strategy = data.get('strategy', None)
+        sim = WeaponWishSimulator(start_pity)
+        result = sim.simulate_pulls(
+            count, strategy, progress_callback, self._progress_interval(count),
+            detail=bool(data.get('detail', False)), five_star_columns=columns
+        )
+        result['total_pulls'] = count
+        self._count_pulls('weapon', count)
+        return result
+
+    @staticmethod
+    def _character_mode(SimulatorClass):
+        """角色模拟器类对应的祈愿类型（指标标签）"""
+        return 'character2' if SimulatorClass == CharacterWishSimulator2 else 'character'
+
+    @staticmethod
+    def _count_pulls(mode, count):
+        """累计模拟抽数"""
+        metrics.inc('wish_simulated_pulls_total', {'mode': mode}, count)
+
+    @staticmethod
+    def _progress_interval(count):
+        """自动模拟汇报进度的间隔：约每 1% 汇报一次，最少间隔 1000 抽"""
+        return max(1000, int(count) // 100)
+
+    @staticmethod
+    def _admission_rejected(e):
+        """并发名额已满或排队超时：返回 429 并提示重试时间"""
+        response = json_response({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+
+    @staticmethod
+    def _binary_requested():
+        """请求是否按 Accept 头要求 MessagePack / 类型化数组响应"""
+        return choose_binary_format(request.headers.get('Accept')) != 'json'
+
+    @staticmethod
+    def _result_response(result, downgraded=None):
+        """按 Accept 头返回 JSON（默认）、MessagePack 或类型化数组帧
+
+        请求被降级时在响应头中说明（不修改可能被缓存共享的结果）。
+        """
+        body, mimetype = encode_result(choose_binary_format(request.headers.get('Accept')), result)
+        response = Response(body, mimetype=mimetype)
+        response.headers['Vary'] = 'Accept'
+        if downgraded:
+            response.headers['X-Admission-Downgraded'] = downgraded
+        return response
+
+    @staticmethod
+    def _request_data():
+        """读取请求参数：POST 使用 JSON 请求体，GET 使用查询参数（值按 JSON 解析，失败时保留字符串）"""
+        if request.method == 'GET':
+            data = {}
+            for name, value in request.args.items():
+                try:
+                    data[name] = json.loads(value)
+                except ValueError:
+                    data[name] = value
+            return data
+        return request.json or {}
+
+    def request_record(self, response):
+        """当前请求的录制记录；未开启录制、接口不录制或未被采样时返回 None
+
+        POST 请求记录归一化的 JSON 请求体，GET 请求的参数保留在路径的查询字符串中。
+        确定性结果（可缓存的目标概率 / 所需抽数响应）同时记录响应体摘要，回放时据此比较结果。
+        """
+        if self.recorder is None or request.url_rule is None or request.url_rule.rule not in RECORD_ENDPOINTS:
+            return None
+        if not self.recorder.sampled():
+            return None
+        entry = {'m': request.method, 'p': request.full_path.rstrip('?'), 's': response.status_code}
+        if request.method != 'GET':
+            entry['b'] = normalize_body(request.get_json(silent=True))
+        accept = request.headers.get('Accept')
+        if accept and (choose_binary_format(accept) != 'json' or NDJSON_MIMETYPE in accept):
+            entry['a'] = accept
+        if response.status_code == 200 and 'X-Cache' in response.headers and not response.is_streamed:
+            entry['h'] = body_digest(response.get_data())
+        return entry
+
+    @staticmethod
+    def _etag_matches(etag):
+        """If-None-Match 是否包含指定 ETag（忽略弱校验标记和压缩编码后缀）"""
+        header = request.headers.get('If-None-Match')
+        if not header:
+            return False
+        for tag in header.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return True
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            if tag == etag or tag.rsplit('-', 1)[0] == etag:
+                return True
+        return False
+
+    @staticmethod
+    def _flight_key(key, data):
+        """合并并发计算的键：请求指纹加截止时间
+
+        指纹（ETag、响应缓存）不包括截止时间；但截止时间不同的请求不能共享同一次计算，
+        否则没有截止时间的请求可能收到另一个请求超时后的部分结果。
+        """
+        deadline_ms = data.get('deadline_ms')
+        return key if deadline_ms is None else f"{key}:{float(deadline_ms)}"
+
+    def _cacheable_response(self, key, compute, downgraded=None):
+        """确定性计算结果的响应：强 ETag + If-None-Match（304）+ 服务端响应缓存
+
+        ETag 由归一化请求指纹、模拟规则版本和响应格式决定。
+        超过截止时间的部分结果（truncated）不缓存，也不带 ETag。
+        """
+        fmt = choose_binary_format(request.headers.get('Accept'))
+        etag = hashlib.sha256(
+            f"{key}:{GoalProbability.ruleset_version()}:{fmt}".encode('utf-8')
+        ).hexdigest()[:32]
+
+        if self._etag_matches(etag):
+            response = Response(status=304)
+            cache_status = 'REVALIDATED'
         else:
-            return jsonify({'error': 'Unknown action'}), 400
+            cached = self.response_cache.get(etag)
+            if cached is not None:
+                body, mimetype = cached
+                cache_status = 'HIT'
+            else:
+                result = compute()
+                if result.get('truncated'):
+                    response = self._result_response(result, downgraded)
+                    response.headers['Cache-Control'] = 'no-store'
+                    return response
+                body, mimetype = encode_result(fmt, result)
+                self.response_cache.put(etag, body, mimetype)
+                cache_status = 'MISS'
+            response = Response(body, mimetype=mimetype)
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+        response.headers['X-Cache'] = cache_status
+        response.vary.add('Accept')
+        if downgraded:
+            response.headers['X-Admission-Downgraded'] = downgraded
+        return response
+
+    @staticmethod
+    def _request_trials(data, default):
+        """读取请求的模拟次数；不是正整数时抛出 ValueError（400）"""
+        try:
+            trials = int(data.get('trials', default))
+        except (TypeError, ValueError):
+            raise ValueError(f"trials must be an integer, got {data.get('trials')!r}") from None
+        if trials <= 0:
+            raise ValueError("trials must be >0")
+        return trials
+
+    def _fit_request(self, data, probability=None):
+        """按成本上限调整目标概率 / 所需抽数请求
+
+        工作量按 模拟次数 × 抽数 估算，抽数不超过目标的保底抽数上限（更多抽数直接走快速路径）。
+        所需抽数搜索要进行多次估算：快速定位和二分查找阶段的模拟次数固定，按估算次数上限计入固定工作量；
+        严格验证阶段使用请求的模拟次数，按 SEARCH_FINAL_ESTIMATES 次估算计价。
+        超过上限时减少模拟次数；降到最少模拟次数仍超过上限时抛出 RequestTooExpensive（413）；
+        参数无效时抛出 ValueError（400）。
+
+        Returns:
+            tuple: (计算器, 请求参数, 降级说明或 None)
+        """
+        calculator = GoalProbability.GoalProbabilityCalculator()
+        max_pulls = calculator.parse_targets(data).max_required_pulls()
+        ceilings = self.admission.ceilings
+        if probability is None:
+            trials = self._request_trials(data, calculator.trials)
+            pulls = min(calculator.request_pulls(data), max_pulls)
+            fitted = self.admission.fit_trials(trials, pulls, ceilings.max_goal_work)
+            if fitted != trials:
+                data = dict(data, trials=fitted)
+        else:
+            trials = calculator.trials
+            quick, medium = calculator.search_estimates(calculator.parse_targets(data))
+            fixed_work = (quick * GoalProbability.SEARCH_QUICK_TRIALS + medium * GoalProbability.SEARCH_MEDIUM_TRIALS) * max_pulls
+            fitted = self.admission.fit_trials(
+                trials, GoalProbability.SEARCH_FINAL_ESTIMATES * max_pulls, ceilings.max_required_pulls_work, fixed_work
+            )
+            if fitted != trials:
+                calculator = GoalProbability.GoalProbabilityCalculator(trials=fitted)
+        downgraded = None if fitted == trials else f"trials={fitted}; requested={trials}"
+        return calculator, data, downgraded
+
+    def _fit_batch_request(self, data):
+        """按成本上限调整批量目标概率请求
+
+        同一批次的场景共享阶段模拟，每次试验的工作量按不同目标组合的保底抽数上限之和估算。
+        场景数超过上限时抛出 RequestTooExpensive；工作量超过上限时减少各场景的模拟次数。
+
+        Returns:
+            tuple: (计算器, 请求参数, 降级说明或 None)
+        """
+        calculator = GoalProbability.GoalProbabilityCalculator()
+        scenarios = data.get('scenarios')
+        if not isinstance(scenarios, list) or not scenarios:
+            raise ValueError("scenarios must be a non-empty list")
+        if len(scenarios) > MAX_BATCH_SCENARIOS:
+            raise RequestTooExpensive(f"scenarios must be <= {MAX_BATCH_SCENARIOS}")
+
+        targets = {calculator.parse_targets(scenario) for scenario in scenarios}
+        pulls = sum(target.max_required_pulls() for target in targets)
+        trials = max(self._request_trials(scenario, calculator.trials) for scenario in scenarios)
+        fitted = self.admission.fit_trials(trials, pulls, self.admission.ceilings.max_goal_work)
+        if fitted == trials:
+            return calculator, data, None
+        scenarios = [
+            dict(scenario, trials=min(fitted, self._request_trials(scenario, calculator.trials)))
+            for scenario in scenarios
+        ]
+        return calculator, dict(data, scenarios=scenarios), f"trials={fitted}; requested={trials}"
+
+    def _fit_grid_request(self, data):
+        """按成本上限调整概率网格请求
+
+        网格只模拟最高命座和最高精炼各一次，每次试验的工作量按两者的保底抽数上限之和估算。
+
+        Returns:
+            tuple: (计算器, 请求参数, 降级说明或 None)
+        """
+        calculator = GoalProbability.GoalProbabilityCalculator()
+        max_target = GoalProbability.Targets(
+            five_star_up_character_1=calculator.constellation_to_copies(max(GoalProbability.GRID_CONSTELLATIONS)),
+            five_star_up_weapon_1=calculator.refinement_to_copies(max(GoalProbability.GRID_REFINEMENTS)),
+        )
+        trials = self._request_trials(data, calculator.trials)
+        fitted = self.admission.fit_trials(
+            trials, max_target.max_required_pulls(), self.admission.ceilings.max_goal_work
+        )
+        if fitted == trials:
+            return calculator, data, None
+        return calculator, dict(data, trials=fitted), f"trials={fitted}; requested={trials}"
+
+    def _stream_response(self, run, limiter=None):
+        """将计算包装为 SSE / NDJSON 流式响应
+
+        指定 `limiter` 时先占用并发名额（失败时抛出 AdmissionRejected），响应关闭时释放。
+        """
+        fmt = choose_stream_format(request.headers.get('Accept'), request.args.get('format'))
+        started_at = limiter.acquire() if limiter is not None else None
+        response = Response(
+            stream_events(run, fmt),
+            mimetype=NDJSON_MIMETYPE if fmt == 'ndjson' else SSE_MIMETYPE,
+        )
+        if limiter is not None:
+            response.call_on_close(lambda: limiter.release(started_at))
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # 禁止反向代理缓冲
+        return response
+
+    def handle_wish_stream(self):
+        """自动模拟的流式版本：定期推送当前累计结果，最后推送完整结果"""
+        try:
+            data = request.json or {}
+            mode = data.get('mode')
+            if data.get('action', 'auto') != 'auto':
+                return json_response({'error': 'Only auto action can be streamed'}), 400
+            self.admission.check_auto_count(data.get('count', 1000))
+            if mode == 'character':
+                simulate = lambda callback: self._simulate_character_auto(data, CharacterWishSimulator, callback)
+            elif mode == 'character2':
+                simulate = lambda callback: self._simulate_character_auto(data, CharacterWishSimulator2, callback)
+            elif mode == 'weapon':
+                simulate = lambda callback: self._simulate_weapon_auto(data, callback)
+            else:
+                return json_response({'error': 'Unknown mode'}), 400
+
+            def run(emit, cancel_event):
+                return simulate(lambda progress: emit('progress', progress))
+
+            return self._stream_response(run, self.admission.limiter('wish_auto'))
+        except RequestTooExpensive as e:
+            return json_response({'error': str(e)}), 413
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
+        except Exception as e:
+            app.logger.error(f"Error streaming wish request: {e}")
+            return json_response({'error': str(e)}), 500
+
+    def handle_goal_probability_stream(self):
+        """目标概率估算的流式版本：每批模拟后推送当前概率与置信区间，最后推送完整结果"""
+        try:
+            data = request.json or {}
+            # 提前校验参数并按成本上限调整，错误时直接返回 400 而不是建立事件流
+            try:
+                calculator, data, downgraded = self._fit_request(data)
+                calculator.normalize_request(data)
+            except (TypeError, ValueError) as e:
+                return json_response({'error': str(e)}), 400
+
+            def run(emit, cancel_event):
+                control = GoalProbability.ComputeControl(
+                    progress=lambda progress: emit('progress', progress),
+                    cancel_event=cancel_event,
+                )
+                with GoalProbability.compute_control(control):
+                    return calculator.process_api_request(data)
+
+            response = self._stream_response(run, self.admission.limiter('goal_probability'))
+            if downgraded:
+                response.headers['X-Admission-Downgraded'] = downgraded
+            return response
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
+        except Exception as e:
+            app.logger.error(f"Error streaming goal probability: {e}")
+            return json_response({'error': str(e)}), 500
 
     def handle_goal_probability(self):
         """根据资源与目标，估算达成目标概率（蒙特卡洛模拟）"""
         try:
-            data = request.json or {}
+            data = self._request_data()
 
-            # 执行蒙特卡洛模拟
-            calculator = GoalProbability.GoalProbabilityCalculator()
-            
-            result = calculator.process_api_request(data)
+            # 按成本上限调整后执行蒙特卡洛模拟（指纹相同的并发请求共享同一次计算）
+            try:
+                calculator, data, downgraded = self._fit_request(data)
+                key = calculator.request_fingerprint(data)
+            except RequestTooExpensive as e:
+                return json_response({'error': str(e)}), 413
+            except (TypeError, ValueError) as e:
+                return json_response({'error': str(e)}), 400
+            limiter = self.admission.limiter('goal_probability')
+
+            def compute():
+                with limiter.slot():
+                    return calculator.process_api_request(data)
 
-            return jsonify(result)
+            return self._cacheable_response(
+                key, lambda: self.single_flight.do(self._flight_key(key, data), compute)[0], downgraded
+            )
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
         except Exception as e:
             app.logger.error(f"Error calculating goal probability: {e}")
-            return jsonify({'error': str(e)}), 500
+            return json_response({'error': str(e)}), 500
 
-    def handle_required_pulls_for_95_percent(self):
-        """计算达成目标所需的抽数（95%置信度）"""
+    def handle_goal_probability_batch(self):
+        """批量估算多个场景的目标概率：各场景共享角色 / 武器阶段的模拟，结果与逐个请求相同"""
         try:
             data = request.json or {}
 
-            # 执行蒙特卡洛模拟
-            calculator = GoalProbability.GoalProbabilityCalculator()
-            
-            result = calculator.process_required_pulls_request(data, 0.95)
+            try:
+                calculator, data, downgraded = self._fit_batch_request(data)
+                key = calculator.batch_fingerprint(data)
+            except RequestTooExpensive as e:
+                return json_response({'error': str(e)}), 413
+            except (TypeError, ValueError) as e:
+                return json_response({'error': str(e)}), 400
+            limiter = self.admission.limiter('goal_probability')
 
-            return jsonify(result)
+            def compute():
+                with limiter.slot():
+                    return calculator.process_batch_request(data)
+
+            return self._cacheable_response(
+                key, lambda: self.single_flight.do(self._flight_key(key, data), compute)[0], downgraded
+            )
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
+        except Exception as e:
+            app.logger.error(f"Error calculating goal probability batch: {e}")
+            return json_response({'error': str(e)}), 500
+
+    def handle_goal_probability_grid(self):
+        """固定抽数下 UP角色-1 C0-C6 × UP武器-1 R0-R5 的目标概率网格（两个阶段各模拟一次）"""
+        try:
+            data = self._request_data()
+
+            try:
+                calculator, data, downgraded = self._fit_grid_request(data)
+                key = calculator.grid_fingerprint(data)
+            except RequestTooExpensive as e:
+                return json_response({'error': str(e)}), 413
+            except (TypeError, ValueError) as e:
+                return json_response({'error': str(e)}), 400
+            limiter = self.admission.limiter('goal_probability')
+
+            def compute():
+                with limiter.slot():
+                    return calculator.process_grid_request(data)
+
+            return self._cacheable_response(
+                key, lambda: self.single_flight.do(self._flight_key(key, data), compute)[0], downgraded
+            )
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
+        except Exception as e:
+            app.logger.error(f"Error calculating goal probability grid: {e}")
+            return json_response({'error': str(e)}), 500
+
+    def handle_required_pulls_for_95_percent(self):
+        """计算达成目标所需的抽数（95%置信度）"""
+        try:
+            data = self._request_data()
+
+            # 执行蒙特卡洛模拟（指纹相同的并发请求共享同一次计算）
+            return self._required_pulls_response(data, 0.95)
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
         except Exception as e:
             app.logger.error(f"Error calculating required pulls for 95%: {e}")
-            return jsonify({'error': str(e)}), 500
+            return json_response({'error': str(e)}), 500
 
     def handle_required_pulls_for_50_percent(self):
         """计算达成目标所需的抽数（50%置信度）"""
+        try:
+            data = self._request_data()
+
+            # 执行蒙特卡洛模拟（指纹相同的并发请求共享同一次计算）
+            return self._required_pulls_response(data, 0.5)
+        except AdmissionRejected as e:
+            return self._admission_rejected(e)
+        except Exception as e:
+            app.logger.error(f"Error calculating required pulls for 50%: {e}")
+            return json_response({'error': str(e)}), 500
+
+    def _required_pulls_response(self, data, probability):
+        """按成本上限调整后计算所需抽数，返回可缓存的响应（参数无效时为 400，超过成本上限时为 413）"""
+        try:
+            calculator, data, downgraded = self._fit_request(data, probability)
+            key = calculator.request_fingerprint(data, probability)
+        except RequestTooExpensive as e:
+            return json_response({'error': str(e)}), 413
+        except (TypeError, ValueError) as e:
+            return json_response({'error': str(e)}), 400
+        limiter = self.admission.limiter('required_pulls')
+
+        def compute():
+            with limiter.slot():
+                return calculator.process_required_pulls_request(data, probability)
+
+        return self._cacheable_response(
+            key, lambda: self.single_flight.do(self._flight_key(key, data), compute)[0], downgraded
+        )
+
+    def handle_submit_job(self):
+        """提交异步计算任务，立即返回任务ID"""
         try:
             data = request.json or {}
+            kind = data.get('kind')
+            params = data.get('params') or {}
+            if kind not in JOB_KINDS:
+                return json_response({'error': 'Unknown job kind'}), 400
 
-            # 执行蒙特卡洛模拟
-            calculator = GoalProbability.GoalProbabilityCalculator()
-            
-            result = calculator.process_required_pulls_request(data, 0.5)
+            # 提交前校验参数、按成本上限调整并计算请求指纹，指纹相同的任务会被合并
+            try:
+                calculator, params, downgraded = self._fit_request(params, JOB_KINDS[kind])
+                fingerprint = self._flight_key(calculator.request_fingerprint(params, JOB_KINDS[kind]), params)
+            except RequestTooExpensive as e:
+                return json_response({'error': str(e)}), 413
+            except (TypeError, ValueError) as e:
+                return json_response({'error': str(e)}), 400
 
-            return jsonify(result)
+            job, created = self.job_manager.submit(kind, params, fingerprint)
+            response = job.to_dict()
+            response['deduplicated'] = not created
+            response = json_response(response, 202)
+            if downgraded:
+                response.headers['X-Admission-Downgraded'] = downgraded
+            return response
+        except JobQueueFull as e:
+            return json_response({'error': str(e)}), 429
         except Exception as e:
-            app.logger.error(f"Error calculating required pulls for 50%: {e}")
-            return jsonify({'error': str(e)}), 500
+            app.logger.error(f"Error submitting job: {e}")
+            return json_response({'error': str(e)}), 500
+
+    def handle_get_job(self, job_id):
+        """查询任务状态、进度和结果"""
+        job = self.job_manager.get(job_id)
+        if job is None:
+            return json_response({'error': 'Job not found'}), 404
+        return json_response(job.to_dict())
+
+    def handle_cancel_job(self, job_id):
+        """取消任务"""
+        job = self.job_manager.cancel(job_id)
+        if job is None:
+            return json_response({'error': 'Job not found'}), 404
+        return json_response(job.to_dict())
+
+    def _run_job(self, job):
+        """在计算工作线程中执行任务，进度写回任务对象
+
+        任务的并发由工作线程数限制；提交时已按成本上限调整过参数，这里重新得到相同的计算器。
+        """
+        calculator, _, _ = self._fit_request(job.params, JOB_KINDS[job.kind])
+        control = GoalProbability.ComputeControl(
+            progress=job.update_progress,
+            cancel_event=job.cancel_event,
+        )
+        with GoalProbability.compute_control(control):
+            probability = JOB_KINDS[job.kind]
+            if probability is None:
+                return calculator.process_api_request(job.params)
+            return calculator.process_required_pulls_request(job.params, probability)
 
     def process_character_result(self, result, five_star_up_name='5星UP角色-1'):
         """处理角色单抽结果，转换为前端需要的格式"""
@@ -258,7 +909,7 @@ class WishServer:
             else:
                 name = '4星常驻物品'
         
-        return jsonify({
+        return json_response({
             'star': star,
             'name': name,
             'is_up': result['is_up'][0],
@@ -317,7 +968,7 @@ class WishServer:
                 'capture_minguang': result['capture_minguang'][i]
             })
         
-        return jsonify({
+        return json_response({
             'results': results,
             'current_pity': result['new_pity'],
             'four_star_pity': result['new_four_star_pity'],
@@ -340,7 +991,7 @@ class WishServer:
 
     def process_weapon_result(self, result):
         """处理武器单抽结果，转换为前端需要的格式"""
-        return jsonify({
+        return json_response({
             'star': 5 if result['results'][0] else (4 if result['four_star_results'][0] else 3),
             'name': result['weapon_names'][0],
             'is_up': result['is_up'][0],
@@ -363,7 +1014,7 @@ class WishServer:
 
     def process_weapon_ten_result(self, result):
         """处理武器十连结果，转换为前端需要的格式"""
-        return jsonify({
+        return json_response({
             'results': result['results'],
             'weapon_names': result['weapon_names'],
             'four_star_results': result['four_star_results'],
@@ -389,26 +1040,179 @@ class WishServer:
 # 创建服务器实例
 server = WishServer()
 
+
+def _metric_labels():
+    """当前请求的指标标签：路由规则（而非实际路径）和 action"""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    action = ''
+    if endpoint in METRICS_ACTIONS:
+        default, allowed = METRICS_ACTIONS[endpoint]
+        data = request.get_json(silent=True)
+        action = data.get('action', default) if isinstance(data, dict) else None
+        if action not in allowed:
+            action = 'other'
+    return endpoint, action
+
+
+@app.before_request
+def start_request_metrics():
+    """记录请求开始时间和进行中请求数"""
+    g.metrics_started_at = time.perf_counter()
+    g.metrics_labels = _metric_labels()
+    metrics.inc('wish_http_requests_in_flight', {'endpoint': g.metrics_labels[0]})
+
+
+@app.after_request
+def finish_request_metrics(response):
+    """响应关闭时（流式响应发送完成后）记录耗时"""
+    started_at = g.get('metrics_started_at')
+    if started_at is None:
+        return response
+    endpoint, action = g.metrics_labels
+    status = str(response.status_code)
+
+    def observe():
+        metrics.dec('wish_http_requests_in_flight', {'endpoint': endpoint})
+        metrics.inc('wish_http_requests_total', {'endpoint': endpoint, 'action': action, 'status': status})
+        metrics.observe('wish_http_request_duration_seconds', {'endpoint': endpoint, 'action': action},
+                        time.perf_counter() - started_at)
+        if endpoint not in STARTUP_IGNORED_ENDPOINTS and startup.mark('first_request'):
+            print(f"[STARTUP] {startup.format_report()}", flush=True)
+
+    response.call_on_close(observe)
+    return response
+
+
+@app.after_request
+def record_request(response):
+    """录制请求（设置 WISH_RECORD_DIR 时）：响应关闭时写入，耗时包括流式响应的发送"""
+    started_at = g.get('metrics_started_at')
+    entry = server.request_record(response) if started_at is not None else None
+    if entry is None:
+        return response
+
+    def write():
+        duration = time.perf_counter() - started_at
+        record = {'t': round(time.time() - duration, 3), **entry, 'd': round(duration * 1000, 2)}
+        try:
+            server.recorder.record(record)
+        except OSError as e:
+            app.logger.warning(f"Failed to record request: {e}")
+
+    response.call_on_close(write)
+    return response
+
+
+def _collect_metrics():
+    """导出时读取模拟次数、缓存、并发限制和启动耗时的当前统计（目标概率引擎尚未加载时不导出其统计，也不触发加载）"""
+    samples = []
+    caches = {}
+    if GoalProbability.loaded:
+        samples += [
+            ('wish_goal_trials_total', {'kind': kind}, count)
+            for kind, count in GoalProbability.simulated_trials().items()
+        ]
+        calculator = GoalProbability.GoalProbabilityCalculator
+        caches = {
+            'goal_probability': calculator.estimate_goal_probability_cached,
+            'trial': calculator._simulate_one_trial_cached,
+            'phase_table': calculator._phase_cost_table_cached,
+        }
+    for name, cached in caches.items():
+        info = cached.cache_info()
+        samples += [
+            ('wish_cache_hits_total', {'cache': name}, info.hits),
+            ('wish_cache_misses_total', {'cache': name}, info.misses),
+            ('wish_cache_entries', {'cache': name}, info.currsize),
+        ]
+    response_cache = server.response_cache
+    samples += [
+        ('wish_cache_hits_total', {'cache': 'response'}, response_cache.hits),
+        ('wish_cache_misses_total', {'cache': 'response'}, response_cache.misses),
+        ('wish_cache_entries', {'cache': 'response'}, len(response_cache)),
+    ]
+    for name in ADMISSION_LIMITS:
+        state = server.admission.limiter(name).snapshot()
+        samples += [
+            ('wish_admission_active', {'endpoint': name}, state['active']),
+            ('wish_admission_waiting', {'endpoint': name}, state['waiting']),
+        ]
+    samples += [
+        ('wish_simulator_events_total', {'simulator': simulator, 'scope': scope, 'event': event}, count)
+        for (simulator, scope, event), count in instrumentation.snapshot().items()
+    ]
+    timings = startup.report()
+    samples += [('wish_startup_seconds', {'phase': phase}, seconds) for phase, seconds in timings['milestones'].items()]
+    samples += [('wish_startup_import_seconds', {'module': name}, seconds) for name, seconds in timings['imports'].items()]
+    return samples
+
+
+metrics.register_collector(_collect_metrics)
+if metrics_store is not None:
+    metrics_store.start()
+
+
 @app.route('/api/wish', methods=['POST'])
+@profiled
 def handle_wish():
     """处理祈愿请求"""
     return server.handle_wish()
 
-@app.route('/api/goal_probability', methods=['POST'])
+@app.route('/api/wish/stream', methods=['POST'])
+def handle_wish_stream():
+    """自动模拟（流式进度）"""
+    return server.handle_wish_stream()
+
+@app.route('/api/goal_probability/stream', methods=['POST'])
+def handle_goal_probability_stream():
+    """目标概率估算（流式进度）"""
+    return server.handle_goal_probability_stream()
+
+@app.route('/api/goal_probability', methods=['GET', 'POST'])
+@profiled
 def handle_goal_probability():
     """根据资源与目标，估算达成目标概率（蒙特卡洛模拟）"""
     return server.handle_goal_probability()
 
-@app.route('/api/required_pulls_for_95_percent', methods=['POST'])
+@app.route('/api/goal_probability/batch', methods=['POST'])
+@profiled
+def handle_goal_probability_batch():
+    """批量估算多个场景的目标概率"""
+    return server.handle_goal_probability_batch()
+
+@app.route('/api/goal_probability/grid', methods=['GET', 'POST'])
+@profiled
+def handle_goal_probability_grid():
+    """UP角色命座 × UP武器精炼的目标概率网格"""
+    return server.handle_goal_probability_grid()
+
+@app.route('/api/required_pulls_for_95_percent', methods=['GET', 'POST'])
+@profiled
 def handle_required_pulls_for_95_percent():
     """计算达成目标所需的抽数（95%置信度）"""
     return server.handle_required_pulls_for_95_percent()
 
-@app.route('/api/required_pulls_for_50_percent', methods=['POST'])
+@app.route('/api/required_pulls_for_50_percent', methods=['GET', 'POST'])
+@profiled
 def handle_required_pulls_for_50_percent():
     """计算达成目标所需的抽数（50%置信度，中位数）"""
     return server.handle_required_pulls_for_50_percent()
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交异步计算任务"""
+    return server.handle_submit_job()
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询异步计算任务"""
+    return server.handle_get_job(job_id)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """取消异步计算任务"""
+    return server.handle_cancel_job(job_id)
+
 @app.route('/api/shutdown', methods=['POST'])
 def shutdown():
     """关闭服务器"""
@@ -419,10 +1223,10 @@ def shutdown():
     if func is not None:
         # 使用Werkzeug的内置关闭方法
         func()
-        return jsonify({'message': 'Server shutting down...'})
+        return json_response({'message': 'Server shutting down...'})
     else:
         # 如果不是运行在Werkzeug服务器上，使用信号关闭
-        response = jsonify({'message': 'Server shutting down...'})
+        response = json_response({'message': 'Server shutting down...'})
         # 在后台线程中关闭服务器
         import threading
         def shutdown_server():
@@ -436,28 +1240,90 @@ def shutdown():
         return response
 
 
+@app.route('/api/health')
+def health():
+    """就绪探针：能够处理请求时返回 200（`ruleset_version` 在目标概率引擎首次使用前为 null，探针不触发其加载）"""
+    response = json_response({
+        'status': 'ready',
+        'pid': os.getpid(),
+        'ruleset_version': GoalProbability.ruleset_version() if GoalProbability.loaded else None,
+        'uptime': round(startup.since_start(), 3),
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Prometheus 文本格式的运行指标（多实例时合并所有实例）"""
+    snapshot = metrics_store.collect() if metrics_store is not None else metrics.snapshot()
+    response = Response(render_prometheus(snapshot), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
 @app.route('/api/')
 def api_info():
     """API信息"""
-    return jsonify({
+    return json_response({
         'message': 'Wish Simulator API',
         'endpoints': [
             '/api/wish',
+            '/api/wish/stream',
             '/api/goal_probability',
+            '/api/goal_probability/stream',
+            '/api/goal_probability/batch',
+            '/api/goal_probability/grid',
             '/api/required_pulls_for_95_percent',
             '/api/required_pulls_for_50_percent',
+            '/api/jobs',
+            '/api/health',
+            '/api/metrics',
             '/api/shutdown'
         ]
     })
 
 
+if STATIC_DIR:
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def static_bundle(path):
+        """提供 dist/ 中的前端资源：带哈希的资源长期缓存，存在预压缩文件时直接返回"""
+        if path.startswith('api/'):
+            return json_response({'error': 'Not found'}), 404
+        asset = resolve_asset(STATIC_DIR, path, request.headers.get('Accept-Encoding'))
+        if asset is None:
+            return json_response({'error': 'Not found'}), 404
+        response = send_file(asset.path, mimetype=asset.mimetype, conditional=True, etag=True)
+        response.headers['Cache-Control'] = asset.cache_control
+        if asset.encoding is not None:
+            response.headers['Content-Encoding'] = asset.encoding
+        if asset.precompressed:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+startup.mark('app_ready')
+
+
 if __name__ == '__main__':
     print("Starting Wish Simulator Server...")
     print("API endpoints:")
     print("  - POST /api/wish")
-    print("  - POST /api/goal_probability")
-    print("  - POST /api/required_pulls_for_95_percent")
-    print("  - POST /api/required_pulls_for_50_percent")
+    print("  - POST /api/wish/stream")
+    print("  - GET|POST /api/goal_probability")
+    print("  - POST /api/goal_probability/stream")
+    print("  - POST /api/goal_probability/batch")
+    print("  - GET|POST /api/goal_probability/grid")
+    print("  - GET|POST /api/required_pulls_for_95_percent")
+    print("  - GET|POST /api/required_pulls_for_50_percent")
+    print("  - POST /api/jobs")
+    print("  - GET  /api/jobs/<job_id>")
+    print("  - DELETE /api/jobs/<job_id>")
+    print("  - GET  /api/health")
+    print("  - GET  /api/metrics")
     print("  - POST /api/shutdown")
     print("  - GET  /api/")
-    app.run(host='0.0.0.0', port=8888, debug=True)
+    if STATIC_DIR:
+        print(f"Serving frontend bundle from {STATIC_DIR}")
+    app.run(host='0.0.0.0', port=PORT, debug=not PRODUCTION)
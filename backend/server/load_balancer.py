@@ -0,0 +1,345 @@
+"""本地负载均衡器 - 多个后端实例前的轻量反向代理
+
+简要说明：
+- 监听原后端端口（8888），将请求转发到多个后端实例（8889 起），前端和 Vite 代理配置无需改动
+- 选择当前进行中请求最少的健康实例（相同时轮流），多核并行处理纯 Python 计算
+- 定期检查各实例的 /api/health；连接失败的实例立即标记为不可用，请求改发到其他实例
+- 任务查询（/api/jobs/<job_id>）按任务ID前缀路由回提交任务的实例
+- POST /api/shutdown 广播到所有实例
+- 流式响应（SSE / NDJSON）逐块转发，不缓冲
+
+主要用法：
+- `LoadBalancer(port, backend_ports)`：创建负载均衡器
+- `start()` / `stop()`：在后台线程中运行 / 停止
+- `stats()`：各实例的健康状态、进行中请求数和已转发请求数
+"""
+
+import http.client
+import itertools
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HEALTH_CHECK_INTERVAL = float(os.environ.get('WISH_LB_HEALTH_INTERVAL', 2.0))  # 健康检查间隔（秒）
+UPSTREAM_TIMEOUT = float(os.environ.get('WISH_LB_UPSTREAM_TIMEOUT', 600))  # 等待后端响应的超时时间（秒）
+_CHUNK_SIZE = 64 * 1024
+
+# 逐跳头部，不转发
+_HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+}
+
+
+class Backend:
+    """单个后端实例的状态"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.healthy = False
+        self.active = 0  # 进行中的请求数
+        self.requests = 0  # 已转发的请求数
+        self.failures = 0  # 连接失败次数
+
+
+class LoadBalancer:
+    """最少连接负载均衡 + 健康检查"""
+
+    def __init__(self, port: int, backend_ports, host: str = '0.0.0.0'):
+        self.port = port
+        self.host = host
+        self.backends = {int(p): Backend(int(p)) for p in backend_ports}
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+        self._stopping = threading.Event()
+        self._local = threading.local()  # 每个处理线程复用到各后端的连接
+        self._server = None
+        self._threads = []
+
+    # ===== 实例选择 =====
+
+    def choose(self, exclude=()) -> Backend | None:
+        """选择进行中请求最少的健康实例，没有可用实例时返回 None"""
+        with self._lock:
+            candidates = [b for b in self.backends.values() if b.healthy and b.port not in exclude]
+            if not candidates:
+                return None
+            fewest = min(b.active for b in candidates)
+            candidates = [b for b in candidates if b.active == fewest]
+            backend = candidates[next(self._round_robin) % len(candidates)]
+            backend.active += 1
+            backend.requests += 1
+            return backend
+
+    def pinned(self, port: int) -> Backend | None:
+        """占用指定实例（任务查询），实例不存在时返回 None"""
+        with self._lock:
+            backend = self.backends.get(port)
+            if backend is None:
+                return None
+            backend.active += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: Backend) -> None:
+        with self._lock:
+            backend.active -= 1
+
+    def mark_down(self, backend: Backend) -> None:
+        """连接失败：标记为不可用，等待健康检查恢复"""
+        with self._lock:
+            backend.healthy = False
+            backend.failures += 1
+
+    def set_healthy(self, port: int, healthy: bool) -> None:
+        """由外部（如进程监督）更新实例健康状态"""
+        with self._lock:
+            if port in self.backends:
+                self.backends[port].healthy = healthy
+
+    def stats(self) -> list[dict]:
+        """各实例状态"""
+        with self._lock:
+            return [
+                {"port": b.port, "healthy": b.healthy, "active": b.active,
+                 "requests": b.requests, "failures": b.failures}
+                for b in self.backends.values()
+            ]
+
+    # ===== 后端连接 =====
+
+    def connection(self, port: int, fresh: bool = False) -> http.client.HTTPConnection:
+        """获取当前线程到指定实例的连接（keep-alive 复用）"""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(port)
+        if conn is None or fresh:
+            if conn is not None:
+                conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=UPSTREAM_TIMEOUT)
+            connections[port] = conn
+        return conn
+
+    def drop_connection(self, port: int) -> None:
+        connections = getattr(self._local, 'connections', {})
+        conn = connections.pop(port, None)
+        if conn is not None:
+            conn.close()
+
+    def _probe(self, port: int) -> bool:
+        """健康检查：/api/health 返回 200"""
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1.0)
+            try:
+                conn.request('GET', '/api/health')
+                response = conn.getresponse()
+                response.read()
+                return response.status == 200
+            finally:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            return False
+
+    def check_health(self) -> None:
+        """检查所有实例一次"""
+        for port in list(self.backends):
+            self.set_healthy(port, self._probe(port))
+
+    def _health_loop(self) -> None:
+        while not self._stopping.wait(HEALTH_CHECK_INTERVAL):
+            self.check_health()
+
+    # ===== 运行 =====
+
+    def start(self) -> None:
+        """启动代理服务器和健康检查线程"""
+        self.check_health()
+        handler = type('BoundProxyHandler', (_ProxyHandler,), {'balancer': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        for target, name in ((self._server.serve_forever, 'lb-server'), (self._health_loop, 'lb-health')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """停止代理服务器"""
+        self._stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    """将请求转发到后端实例"""
+
+    protocol_version = 'HTTP/1.1'
+    balancer: LoadBalancer = None
+
+    def log_message(self, format, *args):
+        pass  # 访问日志由后端实例输出
+
+    def do_GET(self):
+        self._proxy()
+
+    def do_POST(self):
+        self._proxy()
+
+    def do_PUT(self):
+        self._proxy()
+
+    def do_DELETE(self):
+        self._proxy()
+
+    def do_OPTIONS(self):
+        self._proxy()
+
+    def do_HEAD(self):
+        self._proxy()
+
+    def _read_body(self) -> bytes | None:
+        length = self.headers.get('Content-Length')
+        if length is None:
+            if self.headers.get('Transfer-Encoding'):
+                return None  # 不支持分块请求体
+            return b''
+        return self.rfile.read(int(length))
+
+    def _job_port(self) -> int | None:
+        """任务查询路径中的实例端口（任务ID形如 `8889-<hex>`）"""
+        prefix = '/api/jobs/'
+        if not self.path.startswith(prefix):
+            return None
+        job_id = self.path[len(prefix):].split('?', 1)[0]
+        port, sep, _ = job_id.partition('-')
+        return int(port) if sep and port.isdigit() else None
+
+    def _send_error(self, status: int, message: str, retry_after: int | None = None) -> None:
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if retry_after is not None:
+            self.send_header('Retry-After', str(retry_after))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _forward_headers(self) -> dict:
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in _HOP_BY_HOP_HEADERS}
+        client = self.client_address[0]
+        forwarded = self.headers.get('X-Forwarded-For')
+        headers['X-Forwarded-For'] = f"{forwarded}, {client}" if forwarded else client
+        return headers
+
+    def _proxy(self):
+        balancer = self.balancer
+        body = self._read_body()
+        if body is None:
+            self._send_error(411, 'Content-Length required')
+            self.close_connection = True
+            return
+        if self.command == 'POST' and self.path.split('?', 1)[0] == '/api/shutdown':
+            self._broadcast_shutdown(body)
+            return
+
+        headers = self._forward_headers()
+        job_port = self._job_port()
+        tried = set()
+        while True:
+            backend = balancer.pinned(job_port) if job_port is not None else balancer.choose(tried)
+            if backend is None:
+                status = 404 if job_port is not None else 503
+                self._send_error(status, 'No backend instance available', retry_after=1)
+                return
+            try:
+                response = self._send_upstream(backend, body, headers)
+            except (OSError, http.client.HTTPException):
+                balancer.release(backend)
+                balancer.mark_down(backend)
+                balancer.drop_connection(backend.port)
+                tried.add(backend.port)
+                if job_port is not None:
+                    self._send_error(503, 'Backend instance unavailable', retry_after=1)
+                    return
+                continue
+            try:
+                self._relay(backend, response)
+            finally:
+                balancer.release(backend)
+            return
+
+    def _send_upstream(self, backend: Backend, body: bytes, headers: dict) -> http.client.HTTPResponse:
+        """发送请求；复用的连接已被后端关闭时重连一次"""
+        for fresh in (False, True):
+            conn = self.balancer.connection(backend.port, fresh=fresh)
+            try:
+                conn.request(self.command, self.path, body=body or None, headers=headers)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                if fresh:
+                    raise
+        raise ConnectionError('unreachable')
+
+    def _relay(self, backend: Backend, response: http.client.HTTPResponse) -> None:
+        """将后端响应逐块写回客户端"""
+        self.send_response_only(response.status, response.reason)
+        length = response.getheader('Content-Length')
+        chunked = length is None and self.command != 'HEAD' and response.status not in (204, 304)
+        for key, value in response.getheaders():
+            if key.lower() not in _HOP_BY_HOP_HEADERS:
+                self.send_header(key, value)
+        self.send_header('X-Backend-Instance', str(backend.port))
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        if response.will_close:
+            self.close_connection = True
+        self.end_headers()
+
+        try:
+            while True:
+                chunk = response.read1(_CHUNK_SIZE) if chunked else response.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if chunked:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                else:
+                    self.wfile.write(chunk)
+                self.wfile.flush()
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端断开：关闭到后端的连接，后端的流式计算随之取消
+            self.balancer.drop_connection(backend.port)
+            self.close_connection = True
+            return
+        if response.will_close:
+            self.balancer.drop_connection(backend.port)
+
+    def _broadcast_shutdown(self, body: bytes) -> None:
+        """将关闭请求发送到所有实例"""
+        results = {}
+        for port in list(self.balancer.backends):
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                try:
+                    conn.request('POST', '/api/shutdown', body=body or b'{}',
+                                 headers={'Content-Type': 'application/json'})
+                    response = conn.getresponse()
+                    response.read()
+                    results[str(port)] = response.status
+                finally:
+                    conn.close()
+            except (OSError, http.client.HTTPException) as e:
+                results[str(port)] = str(e)
+            self.balancer.set_healthy(port, False)
+        payload = json.dumps({'message': 'Server shutting down...', 'instances': results}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
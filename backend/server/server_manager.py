@@ -9,8 +9,11 @@
 主要功能：
 - 检查Node.js安装状态
 - 启动后端API服务器
-- 启动前端开发服务器
-- 监控服务器进程状态
+- 启动前端开发服务器（开发模式），或由后端直接提供预构建的 dist/（生产模式，不需要 Node.js）
+- 轮询就绪探针等待服务器启动，并报告启动耗时
+- 监督后端进程和前端开发服务器：进程退出时立即收到通知，异常退出时按退避策略重启
+- 多实例模式：在 8889 起的端口启动多个后端实例，由 8888 端口的本地负载均衡器分发请求
+- 多实例模式下为各实例设置共享的指标目录，任一实例的 /api/metrics 都返回合并后的指标
 - 停止服务器进程
 """
 
@@ -26,23 +29,63 @@ import webbrowser
 import re
 import threading
 import socket
+import shutil
+import tempfile
 
 # 添加当前目录到系统路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from backend.server.load_balancer import LoadBalancer
+from backend.server.supervisor import ProcessSupervisor
+from backend.utils.static_assets import precompress_dist
+
+# 就绪探针配置（可通过环境变量调整）
+READY_TIMEOUT = float(os.environ.get('WISH_READY_TIMEOUT', 30))  # 等待服务器就绪的最长时间（秒）
+READY_POLL_INITIAL = 0.05  # 首次轮询间隔（秒），之后每次翻倍
+READY_POLL_MAX = 0.5  # 最大轮询间隔（秒）
+FRONTEND_PORT = 3000  # 与 vite.config.js 保持一致
+
+# 后端实例配置：单实例时直接监听 8888；多实例时实例监听 8889 起的端口，负载均衡器监听 8888
+BACKEND_PORT = 8888
+MAX_BACKEND_INSTANCES = 4  # 实例端口范围 8889-8892（与 find_backend_port 的查找范围一致）
+BACKEND_INSTANCES = int(os.environ.get('WISH_BACKEND_INSTANCES', 1))  # 后端实例数
+
 class WishServerManager:
     """祈愿模拟器服务器管理器"""
     
-    def __init__(self):
-        """初始化服务器管理器"""
+    def __init__(self, production=None, backend_instances=None):
+        """初始化服务器管理器
+
+        Args:
+            production: 是否使用生产模式（后端直接提供 dist/）；为 None 时读取环境变量 WISH_PRODUCTION
+            backend_instances: 后端实例数；为 None 时读取环境变量 WISH_BACKEND_INSTANCES
+        """
         # 获取项目根目录
         self.project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         # 初始化属性
         self.backend_port = None
         self.backend_process = None
         self.frontend_process = None
+        self.frontend_supervisor = None
         self.node_installed = False
         self.npm_path = None
+        if production is None:
+            production = os.environ.get('WISH_PRODUCTION', '0') == '1'
+        self.production = production
+        self.dist_dir = os.path.join(self.project_root, "dist")
+        # 启动耗时统计（秒）
+        self.started_at = time.monotonic()
+        self.ready_times = {}
+        # 后端实例（端口 -> 进程）、进程监督（重启次数、停机时间）和负载均衡器
+        if backend_instances is None:
+            backend_instances = BACKEND_INSTANCES
+        self.backend_instances = max(1, min(int(backend_instances), MAX_BACKEND_INSTANCES))
+        self.backend_processes = {}
+        self.backend_supervisors = {}
+        self.load_balancer = None
+        # 多实例共享的指标目录（WISH_METRICS_DIR）；由管理器创建时停止后删除
+        self.metrics_dir = os.environ.get('WISH_METRICS_DIR') or None
+        self._owns_metrics_dir = False
     
     def _check_npm_path(self, npm_path):
         """检查指定的npm路径是否有效"""
@@ -141,6 +184,57 @@ class WishServerManager:
         except Exception:
             return False
     
+    def _http_status(self, port, path, timeout=0.5):
+        """请求 http://localhost:{port}{path}，返回状态码；无法连接时返回 None"""
+        try:
+            import http.client
+            conn = http.client.HTTPConnection('localhost', port, timeout=timeout)
+            try:
+                conn.request('GET', path)
+                return conn.getresponse().status
+            finally:
+                conn.close()
+        except Exception:
+            return None
+    
+    def is_backend_ready(self, port):
+        """后端就绪探针：/api/health 返回 200"""
+        return self._http_status(port, '/api/health') == 200
+    
+    def is_frontend_ready(self, port=FRONTEND_PORT):
+        """前端就绪探针：开发服务器能够响应页面请求"""
+        return self._http_status(port, '/') is not None
+    
+    def wait_until_ready(self, name, process, probe, timeout=READY_TIMEOUT):
+        """轮询就绪探针直到服务器就绪（轮询间隔指数退避）
+
+        Args:
+            name: 服务器名称（用于输出）
+            process: 服务器进程，进程退出时立即返回
+            probe: 就绪探针，返回 True 表示已就绪
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            float | None: 从开始等待到就绪的耗时（秒）；进程退出或超时时返回 None
+        """
+        print(f"等待{name}就绪...")
+        started = time.monotonic()
+        delay = READY_POLL_INITIAL
+        while True:
+            if probe():
+                elapsed = time.monotonic() - started
+                print(f"✓ {name}已就绪，耗时 {elapsed:.2f} 秒")
+                return elapsed
+            if process.poll() is not None:
+                print(f"✗ {name}进程已退出，退出码: {process.poll()}")
+                return None
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                print(f"✗ {name}未在 {timeout:g} 秒内就绪")
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, READY_POLL_MAX)
+    
     def find_backend_port(self):
         """查找后端服务器实际使用的端口"""
         print("正在查找后端服务器端口...")
@@ -152,8 +246,19 @@ class WishServerManager:
         print("✗ 未找到后端服务器端口，使用默认端口")
         return "8888"  # 默认端口，与flask_server.py保持一致
     
+    @property
+    def instance_ports(self):
+        """后端实例监听的端口"""
+        if self.backend_instances == 1:
+            return [BACKEND_PORT]
+        return list(range(BACKEND_PORT + 1, BACKEND_PORT + 1 + self.backend_instances))
+    
+    def _instance_name(self, port):
+        """实例名称（用于输出）"""
+        return "后端服务器" if self.backend_instances == 1 else f"后端实例 {port}"
+    
     def start_backend_server(self):
-        """启动后端服务器"""
+        """启动后端服务器（多实例模式下同时启动负载均衡器）"""
         print("=== 启动后端服务器 ===")
         backend_dir = os.path.join(self.project_root, "backend", "server")
         flask_server_path = os.path.join(backend_dir, "flask_server.py")
@@ -169,46 +274,48 @@ class WishServerManager:
         
         try:
             # 检查端口是否已经被占用
-            print(f"检查端口 {8888} 是否被占用")
-            if self.is_port_in_use(8888):
-                print(f"✗ 错误：端口 {8888} 已被占用，请先关闭占用该端口的进程")
-                return False
+            for port in sorted({BACKEND_PORT, *self.instance_ports}):
+                print(f"检查端口 {port} 是否被占用")
+                if self.is_port_in_use(port):
+                    print(f"✗ 错误：端口 {port} 已被占用，请先关闭占用该端口的进程")
+                    return False
             
             # 启动后端服务器
             print("正在启动后端服务器...")
             print(f"启动命令: {sys.executable} flask_server.py")
             print(f"工作目录: {backend_dir}")
             
-            # 启动后端服务器
+            # 启动后端服务器（多个实例同时启动，再逐个等待就绪）
             print("使用标准的进程创建方式启动后端服务器")
-            # 不重定向输出，让后端服务器的输出直接显示在终端中
-            self.backend_process = subprocess.Popen(
-                [sys.executable, "flask_server.py"],
-                cwd=backend_dir,
-                shell=False
-            )
+            started = time.monotonic()
+            if self.backend_instances > 1 and self.metrics_dir is None:
+                self.metrics_dir = tempfile.mkdtemp(prefix="wish-metrics-")
+                self._owns_metrics_dir = True
+            for port in self.instance_ports:
+                self.backend_processes[port] = self._spawn_backend_process(port)
+            self.backend_process = self.backend_processes[self.instance_ports[0]]
             
-            # 打印进程信息
-            print(f"后端进程ID: {self.backend_process.pid}")
-            print(f"后端进程状态: {self.backend_process.poll()}")
-            
-            # 等待服务器启动（减少等待时间）
-            print("等待后端服务器启动...")
-            for i in range(2):  # 减少等待次数
-                time.sleep(0.5)  # 减少每次等待时间
-                if self.backend_process.poll() is not None:
-                    print(f"✗ 后端服务器进程已退出，退出码: {self.backend_process.poll()}")
-                    return False
-                print(f"... {i+1}秒")
-            
-            # 检查进程是否还在运行
-            if self.backend_process.poll() is not None:
-                print(f"✗ 后端服务器进程已退出，退出码: {self.backend_process.poll()}")
+            # 轮询就绪探针，直到后端能够处理请求
+            ready_ports = []
+            for port, process in self.backend_processes.items():
+                elapsed = self.wait_until_ready(
+                    self._instance_name(port), process, lambda port=port: self.is_backend_ready(port)
+                )
+                if elapsed is not None:
+                    ready_ports.append(port)
+            # 多实例模式下只要有一个实例就绪即可提供服务，其余实例由进程监督重启
+            if not ready_ports:
                 return False
+            self.ready_times['backend'] = time.monotonic() - started
             
-            # 直接设置后端服务器端口为默认值 8888
-            # 因为我们已经确认 Flask 后端服务器会使用这个端口
-            self.backend_port = "8888"
+            if self.backend_instances > 1:
+                self.load_balancer = LoadBalancer(BACKEND_PORT, self.instance_ports)
+                self.load_balancer.start()
+                print(f"✓ 负载均衡器已启动，端口: {BACKEND_PORT}，"
+                      f"就绪实例: {', '.join(map(str, ready_ports))}")
+            
+            # 对外使用的后端端口始终为 8888（单实例时为后端本身，多实例时为负载均衡器）
+            self.backend_port = str(BACKEND_PORT)
             print(f"✓ 后端服务器启动成功，使用端口: {self.backend_port}")
             return True
         except Exception as e:
@@ -217,6 +324,34 @@ class WishServerManager:
             traceback.print_exc()
             return False
     
+    def _spawn_backend_process(self, port=BACKEND_PORT):
+        """启动后端服务器进程（首次启动和崩溃重启共用）"""
+        backend_dir = os.path.join(self.project_root, "backend", "server")
+        env = os.environ.copy()
+        env['WISH_PORT'] = str(port)
+        if self.backend_instances > 1:
+            # 任务ID带实例端口前缀，负载均衡器据此将任务查询路由回该实例
+            env['WISH_INSTANCE_ID'] = str(port)
+        if self.metrics_dir is not None:
+            # 各实例（包括重启后的新进程）将指标写入同一目录
+            env['WISH_METRICS_DIR'] = self.metrics_dir
+        if self.production:
+            # 生产模式：后端提供 dist/ 并关闭调试模式
+            env['WISH_STATIC_DIR'] = self.dist_dir
+            env['WISH_PRODUCTION'] = '1'
+        # 不重定向输出，让后端服务器的输出直接显示在终端中
+        process = subprocess.Popen(
+            [sys.executable, "flask_server.py"],
+            cwd=backend_dir,
+            env=env,
+            shell=False
+        )
+        
+        # 打印进程信息
+        print(f"后端进程ID: {process.pid}")
+        print(f"后端进程状态: {process.poll()}")
+        return process
+    
     def update_vite_config(self):
         """更新前端的vite.config.js文件，设置正确的代理端口"""
         print("=== 更新前端配置文件 ===")
@@ -272,33 +407,15 @@ class WishServerManager:
             # 启动前端开发服务器
             print(f"正在使用npm路径: {npm_path}")
             print("正在启动前端开发服务器...")
-            if sys.platform == 'win32':
-                # 在Windows上，使用shell=True来确保命令正确执行
-                self.frontend_process = subprocess.Popen(
-                    f"{npm_path} run dev",
-                    shell=True,
-                    cwd=self.project_root
-                )
-            else:
-                # 在非Windows系统上
-                self.frontend_process = subprocess.Popen(
-                    [npm_path, "run", "dev"],
-                    cwd=self.project_root
-                )
+            self.frontend_process = self._spawn_frontend_process(npm_path)
             
-            # 简化前端服务器启动检查，只检查进程是否启动
-            print("等待前端开发服务器启动...")
-            for i in range(3):  # 减少等待次数
-                time.sleep(0.8)  # 减少每次等待时间
-                if self.frontend_process.poll() is not None:
-                    print(f"✗ 前端开发服务器进程已退出，退出码: {self.frontend_process.poll()}")
-                    return False
-                print(f"... {i+1}秒")
-            
-            # 检查进程是否还在运行
-            if self.frontend_process.poll() is not None:
-                print(f"✗ 前端开发服务器进程已退出，退出码: {self.frontend_process.poll()}")
+            # 轮询就绪探针，直到开发服务器能够响应页面请求
+            elapsed = self.wait_until_ready(
+                "前端开发服务器", self.frontend_process, self.is_frontend_ready
+            )
+            if elapsed is None:
                 return False
+            self.ready_times['frontend'] = elapsed
             
             print("✓ 前端开发服务器启动成功")
             return True
@@ -308,6 +425,21 @@ class WishServerManager:
             traceback.print_exc()
             return False
     
+    def _spawn_frontend_process(self, npm_path):
+        """启动前端开发服务器进程（首次启动和崩溃重启共用）"""
+        if sys.platform == 'win32':
+            # 在Windows上，使用shell=True来确保命令正确执行
+            return subprocess.Popen(
+                f"{npm_path} run dev",
+                shell=True,
+                cwd=self.project_root
+            )
+        # 在非Windows系统上
+        return subprocess.Popen(
+            [npm_path, "run", "dev"],
+            cwd=self.project_root
+        )
+    
     def _try_terminate_process(self, process, name):
         """尝试使用terminate()停止进程"""
         print(f"1. 尝试使用terminate()停止{name}进程...")
@@ -364,7 +496,7 @@ class WishServerManager:
     
     def _stop_port_process(self, port):
         """尝试停止占用指定端口的进程"""
-        print(f"3. 检查后端服务器端口 {port} 是否仍然被占用...")
+        print(f"3. 检查端口 {port} 是否仍然被占用...")
         if self.is_port_in_use(int(port)):
             print(f"端口 {port} 仍然被占用，尝试查找并终止占用该端口的进程...")
             if sys.platform == 'win32':
@@ -395,8 +527,14 @@ class WishServerManager:
                             except Exception as e:
                                 print(f"终止进程时出错: {e}")
     
-    def stop_process(self, process, name):
-        """停止进程及其子进程"""
+    def stop_process(self, process, name, port=None):
+        """停止进程及其子进程
+
+        Args:
+            process: 要停止的进程
+            name: 进程名称（用于输出）
+            port: 进程监听的端口；进程无法终止时检查该端口并终止仍占用它的进程
+        """
         if process is None:
             return
         
@@ -419,9 +557,9 @@ class WishServerManager:
                 if self._try_kill_process(process, name):
                     return
             
-            # 第三次尝试：检查端口是否仍然被占用（针对服务器进程）
-            if name == "后端服务器" and self.backend_port:
-                self._stop_port_process(self.backend_port)
+            # 第三次尝试：检查进程的端口是否仍然被占用（针对服务器进程）
+            if port is not None:
+                self._stop_port_process(port)
             
             # 最后检查进程状态
             if process.poll() is None:
@@ -434,30 +572,23 @@ class WishServerManager:
             import traceback
             traceback.print_exc()
     
-    def monitor_process(self, process, name):
-        """监控进程状态"""
-        if process is None:
-            return
-        
-        print(f"开始监控{name}进程...")
-        try:
-            # 简单监控进程状态
-            while process.poll() is None:
-                time.sleep(1)
-        except Exception as e:
-            print(f"监控{name}进程时出错: {e}")
-        
-        print(f"{name}进程已停止，退出码: {process.poll()}")
-    
     def _stop_frontend_server(self):
         """停止前端服务器"""
         if self.frontend_process:
-            self.stop_process(self.frontend_process, "前端开发服务器")
+            self.stop_process(self.frontend_process, "前端开发服务器", FRONTEND_PORT)
     
     def _stop_backend_server(self):
-        """停止后端服务器"""
-        if self.backend_process:
-            self.stop_process(self.backend_process, "后端服务器")
+        """停止后端服务器（多实例模式下先停止负载均衡器）"""
+        if self.load_balancer is not None:
+            self.load_balancer.stop()
+            self.load_balancer = None
+            print("✓ 负载均衡器已停止")
+        for port, process in self.backend_processes.items():
+            self.stop_process(process, self._instance_name(port), port)
+        if self._owns_metrics_dir:
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+            self.metrics_dir = None
+            self._owns_metrics_dir = False
     
     def _check_backend_port_release(self):
         """检查后端端口是否已释放"""
@@ -517,6 +648,10 @@ class WishServerManager:
         print("\n=== 停止服务器 ===")
         print("正在停止所有服务器进程...")
         
+        # 先停止监督，避免被终止的进程被重启
+        for supervisor in self._supervisors():
+            supervisor.stop()
+        
         # 停止前端服务器
         self._stop_frontend_server()
         
@@ -547,9 +682,27 @@ class WishServerManager:
             traceback.print_exc()
     
     def start_frontend_thread(self):
-        """在线程中启动前端服务器"""
-        if self.node_installed:
-            self.start_frontend_server(self.npm_path)
+        """在线程中启动前端服务器，就绪后开始监督"""
+        if self.node_installed and self.start_frontend_server(self.npm_path):
+            self._supervise_frontend_process()
+    
+    def _supervise_frontend_process(self):
+        """监督前端开发服务器进程：异常退出时与后端实例一样退避重启"""
+        name = "前端开发服务器"
+        self.frontend_supervisor = ProcessSupervisor(
+            name,
+            spawn=lambda: self._spawn_frontend_process(self.npm_path),
+            ready=lambda process: self.wait_until_ready(name, process, self.is_frontend_ready) is not None,
+            on_restart=lambda process: setattr(self, 'frontend_process', process),
+        )
+        self.frontend_supervisor.start(self.frontend_process)
+    
+    def _supervisors(self):
+        """所有进程监督（后端实例和前端开发服务器）"""
+        supervisors = list(self.backend_supervisors.values())
+        if self.frontend_supervisor is not None:
+            supervisors.append(self.frontend_supervisor)
+        return supervisors
     
     def _print_startup_header(self):
         """打印启动流程的头部信息"""
@@ -573,6 +726,32 @@ class WishServerManager:
             print(f"[DEBUG] npm路径: {self.npm_path}")
         print()
     
+    @property
+    def frontend_url(self):
+        """前端地址：生产模式下由后端直接提供"""
+        if self.production:
+            return f"http://localhost:{self.backend_port or 8888}"
+        return f"http://localhost:{FRONTEND_PORT}"
+    
+    def _start_production_server(self):
+        """生产模式：检查并预压缩 dist/，只启动后端（不需要 Node.js 和 Vite）"""
+        print("🚀 步骤 2: 启动服务器（生产模式）")
+        print("-" * 60)
+        index_path = os.path.join(self.dist_dir, "index.html")
+        if not os.path.exists(index_path):
+            print(f"[ERROR] ✗ 找不到前端构建产物 {index_path}")
+            print("[INFO] 请先运行 `npm run build`")
+            return False
+        
+        result = precompress_dist(self.dist_dir)
+        print(f"[INFO] 预压缩前端资源: 新生成 {result['written']} 个，已是最新 {result['skipped']} 个")
+        
+        self.backend_port = "8888"
+        if not self.start_backend_server():
+            return False
+        self._report_ready_times()
+        return True
+    
     def _start_servers(self):
         """启动后端和前端服务器"""
         print("🚀 步骤 2: 启动服务器")
@@ -596,22 +775,30 @@ class WishServerManager:
         frontend_thread.start()
         print(f"[DEBUG] 前端服务器线程ID: {frontend_thread.ident}")
         
-        # 等待前端服务器线程完成启动
-        if self.node_installed:
-            print("[INFO] 等待前端服务器启动完成...")
-            # 给前端服务器一些启动时间
-            time.sleep(3)
-            print("[INFO] 前端服务器线程启动完成")
+        # 等待两个服务器通过就绪探针（线程内部有超时，这里多留一点余量）
+        print("[INFO] 等待服务器就绪...")
+        backend_thread.join(READY_TIMEOUT + 5)
+        frontend_thread.join(READY_TIMEOUT + 5)
+        self._report_ready_times()
         
         return frontend_thread
     
+    def _report_ready_times(self):
+        """输出各服务器的启动耗时，便于跟踪冷启动时间"""
+        total = time.monotonic() - self.started_at
+        self.ready_times['total'] = total
+        for key, name in (('backend', '后端服务器'), ('frontend', '前端开发服务器')):
+            if key in self.ready_times:
+                print(f"[INFO] {name}就绪耗时: {self.ready_times[key]:.2f} 秒")
+        print(f"[INFO] 启动总耗时: {total:.2f} 秒")
+    
     def _open_browser_and_show_completion(self):
         """打开浏览器并显示启动完成信息"""
         # 打开浏览器
         print()
         print("🌐 步骤 3: 打开浏览器")
         print("-" * 60)
-        frontend_url = "http://localhost:3000"
+        frontend_url = self.frontend_url
         print(f"[INFO] 正在打开浏览器: {frontend_url}")
         webbrowser.open(frontend_url)
         print(f"[SUCCESS] ✓ 浏览器已打开，请访问: {frontend_url}")
@@ -648,25 +835,35 @@ class WishServerManager:
         print(f"[INFO] 后端服务器正在运行，使用端口: {self.backend_port}")
         print("[INFO] 按 Ctrl+C 停止服务器")
         print("[INFO] 开始监控后端服务器进程...")
-        if self.backend_process:
-            print(f"[DEBUG] 后端进程ID: {self.backend_process.pid}")
+        if self.backend_processes:
+            for port, process in self.backend_processes.items():
+                print(f"[DEBUG] {self._instance_name(port)}进程ID: {process.pid}")
             
-            # 简化的进程监控，减少检查频率
-            print("[DEBUG] 开始简化的后端进程监控...")
+            # 每个实例一个监督线程，阻塞在 waitpid 上：进程退出时立即收到通知，异常退出时退避重启
+            print("[DEBUG] 开始监督后端进程...")
             try:
-                # 循环监控进程状态
-                while True:
-                    # 检查进程是否还在运行
-                    poll_result = self.backend_process.poll()
-                    if poll_result is not None:
-                        print(f"[INFO] 后端服务器进程已停止，退出码: {poll_result}")
-                        # 当后端进程被关闭时，关闭所有服务器
-                        print("[INFO] 后端服务器进程已关闭，正在停止所有服务器...")
-                        self.stop_servers()
-                        break
-                    
-                    # 每 3 秒检查一次，减少输出频率
-                    time.sleep(3)
+                for port, process in self.backend_processes.items():
+                    name = self._instance_name(port)
+                    supervisor = ProcessSupervisor(
+                        name,
+                        spawn=lambda port=port: self._spawn_backend_process(port),
+                        ready=lambda process, name=name, port=port: self.wait_until_ready(
+                            name, process, lambda: self.is_backend_ready(port)
+                        ) is not None,
+                        on_restart=lambda process, port=port: self._on_backend_restart(port, process),
+                    )
+                    self.backend_supervisors[port] = supervisor
+                    supervisor.start(process)
+                # 所有实例都结束（正常退出或放弃重启）后才停止服务；单个实例崩溃期间由其他实例继续服务
+                for supervisor in self.backend_supervisors.values():
+                    supervisor.wait()
+                
+                for supervisor in self.backend_supervisors.values():
+                    stats = supervisor.stats()
+                    print(f"[INFO] {stats['name']}进程已停止，退出码: {stats['last_exit_code']}")
+                # 当后端进程正常关闭或放弃重启时，关闭所有服务器
+                print("[INFO] 后端服务器进程已关闭，正在停止所有服务器...")
+                self.stop_servers()
             except Exception as e:
                 print(f"[ERROR] 监控后端进程时出错: {e}")
                 import traceback
@@ -674,6 +871,24 @@ class WishServerManager:
         else:
             print("[WARNING] 后端进程未初始化，无法监控")
     
+    def _on_backend_restart(self, port, process):
+        """后端进程重启后记录新进程，并立即恢复负载均衡"""
+        self.backend_processes[port] = process
+        if port == self.instance_ports[0]:
+            self.backend_process = process
+        if self.load_balancer is not None:
+            self.load_balancer.set_healthy(port, True)
+    
+    def _report_supervision_stats(self):
+        """输出各被监督进程的重启次数和停机时间"""
+        for supervisor in self._supervisors():
+            stats = supervisor.stats()
+            print(f"[INFO] {stats['name']}重启次数: {stats['restarts']}（失败 {stats['failed_restarts']} 次）")
+            print(f"[INFO] {stats['name']}累计停机时间: {stats['total_downtime']:.2f} 秒")
+            for record in supervisor.history:
+                exited_at = time.strftime('%H:%M:%S', time.localtime(record['exited_at']))
+                print(f"  - {exited_at} 退出码 {record['exit_code']}，停机 {record['downtime']:.2f} 秒")
+    
     def _handle_keyboard_interrupt(self):
         """处理用户按下Ctrl+C的情况"""
         print()
@@ -698,6 +913,7 @@ class WishServerManager:
         print("-" * 60)
         print("[INFO] 正在停止所有服务器进程...")
         self.stop_servers()
+        self._report_supervision_stats()
         print("[SUCCESS] ✓ 所有服务器进程已停止")
         print("=" * 80)
         print("🎮 抽卡模拟器已退出")
@@ -708,17 +924,23 @@ class WishServerManager:
         self._print_startup_header()
         
         try:
-            # 检查Node.js是否安装
-            self._check_nodejs_installation()
-            
-            # 并行启动后端和前端服务器
-            frontend_thread = self._start_servers()
-            
-            # 等待前端服务器启动
-            if self.node_installed:
+            if self.production:
+                # 生产模式：后端直接提供前端资源，运行时不需要 Node.js
+                if not self._start_production_server():
+                    return
                 self._open_browser_and_show_completion()
             else:
-                self._show_nodejs_not_installed_message()
+                # 检查Node.js是否安装
+                self._check_nodejs_installation()
+                
+                # 并行启动后端和前端服务器
+                frontend_thread = self._start_servers()
+                
+                # 等待前端服务器启动
+                if self.node_installed:
+                    self._open_browser_and_show_completion()
+                else:
+                    self._show_nodejs_not_installed_message()
             
             # 监控后端进程
             self._monitor_backend_process()
@@ -0,0 +1,169 @@
+"""进程监督 - 子进程退出通知与退避重启
+
+简要说明：
+- 每个被监督的进程由一个专用线程阻塞在 `process.wait()`（waitpid）上，进程退出时立即收到通知，不做轮询
+- 非正常退出时按指数退避重启，进程稳定运行一段时间后退避时间复位
+- 正常退出（退出码 0、SIGINT / SIGTERM，例如 /api/shutdown 或 Ctrl+C）不重启，监督随之结束
+- 记录重启次数、每次退出的退出码和停机时间（从退出到新进程就绪），供运维查看
+
+主要用法：
+- `ProcessSupervisor(name, spawn, ready)`：`spawn()` 启动并返回新进程，`ready(process)` 阻塞等待进程就绪并返回是否就绪
+- `supervisor.start(process)`：开始监督已启动的进程
+- `supervisor.wait()`：阻塞直到监督结束（正常退出、放弃重启或调用 `stop()`）
+- `supervisor.stats()`：重启次数、累计停机时间等统计
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+
+RESTART_BACKOFF_INITIAL = float(os.environ.get('WISH_RESTART_BACKOFF_INITIAL', 0.5))  # 首次重启前等待时间（秒）
+RESTART_BACKOFF_MAX = float(os.environ.get('WISH_RESTART_BACKOFF_MAX', 30))  # 最长重启等待时间（秒）
+RESTART_STABLE_AFTER = float(os.environ.get('WISH_RESTART_STABLE_AFTER', 60))  # 运行超过该时间视为稳定，退避复位（秒）
+MAX_CONSECUTIVE_RESTARTS = int(os.environ.get('WISH_MAX_RESTARTS', 10))  # 连续重启失败上限，超过后放弃
+
+# 视为正常退出的退出码（Popen 中被信号终止时退出码为负的信号值）
+INTENTIONAL_EXIT_CODES = {0, -signal.SIGINT, -signal.SIGTERM}
+
+
+class ProcessSupervisor:
+    """监督单个子进程：退出通知 + 退避重启 + 停机统计"""
+
+    def __init__(self, name, spawn, ready=None, on_restart=None):
+        """
+        Args:
+            name: 进程名称（用于输出）
+            spawn: 启动新进程并返回 Popen 对象；失败时返回 None
+            ready: 阻塞等待进程就绪，返回是否就绪；为 None 时启动即视为就绪
+            on_restart: 新进程就绪后的回调 `on_restart(process)`
+        """
+        self.name = name
+        self._spawn = spawn
+        self._ready = ready
+        self._on_restart = on_restart
+        self.process = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+        # 统计
+        self.restarts = 0
+        self.failed_restarts = 0
+        self.total_downtime = 0.0
+        self.last_exit_code = None
+        self.last_downtime = None
+        self.exit_reason = None
+        self.history = []  # 每次退出：{"exit_code", "exited_at", "downtime"}
+
+    def start(self, process):
+        """开始监督已启动的进程"""
+        self.process = process
+        self._thread = threading.Thread(target=self._supervise, name=f"supervisor-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监督（不再重启）；进程本身由调用方终止"""
+        self._stopping.set()
+
+    def wait(self):
+        """阻塞直到监督结束"""
+        # POSIX 上无超时的等待可被 Ctrl+C 中断；Windows 上需要定期返回才能响应 Ctrl+C
+        timeout = 1.0 if sys.platform == 'win32' else None
+        while not self._done.wait(timeout):
+            pass
+
+    @property
+    def running(self):
+        """监督是否仍在进行"""
+        return not self._done.is_set()
+
+    def stats(self):
+        """监督统计"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "pid": self.process.pid if self.process is not None else None,
+                "restarts": self.restarts,
+                "failed_restarts": self.failed_restarts,
+                "total_downtime": round(self.total_downtime, 3),
+                "last_downtime": None if self.last_downtime is None else round(self.last_downtime, 3),
+                "last_exit_code": self.last_exit_code,
+                "exit_reason": self.exit_reason,
+            }
+
+    def _supervise(self):
+        """监督线程：阻塞等待进程退出，按需退避重启"""
+        backoff = RESTART_BACKOFF_INITIAL
+        consecutive = 0
+        try:
+            while True:
+                started_at = time.monotonic()
+                exit_code = self.process.wait()  # 阻塞在 waitpid 上，进程退出时立即返回
+                exited_at = time.monotonic()
+                with self._lock:
+                    self.last_exit_code = exit_code
+
+                if self._stopping.is_set():
+                    self._finish("stopped")
+                    return
+                if exit_code in INTENTIONAL_EXIT_CODES:
+                    print(f"[INFO] {self.name}进程正常退出，退出码: {exit_code}")
+                    self._finish("exited")
+                    return
+
+                # 稳定运行一段时间后崩溃：退避时间复位
+                if exited_at - started_at >= RESTART_STABLE_AFTER:
+                    backoff = RESTART_BACKOFF_INITIAL
+                    consecutive = 0
+                print(f"[WARNING] {self.name}进程异常退出，退出码: {exit_code}")
+
+                while True:
+                    if consecutive >= MAX_CONSECUTIVE_RESTARTS:
+                        print(f"[ERROR] {self.name}连续重启 {consecutive} 次失败，放弃重启")
+                        self._finish("gave_up")
+                        return
+                    print(f"[INFO] {backoff:.1f} 秒后重启{self.name}...")
+                    if self._stopping.wait(backoff):
+                        self._finish("stopped")
+                        return
+                    consecutive += 1
+                    backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                    if self._restart():
+                        break
+                    with self._lock:
+                        self.failed_restarts += 1
+
+                downtime = time.monotonic() - exited_at
+                with self._lock:
+                    self.restarts += 1
+                    self.total_downtime += downtime
+                    self.last_downtime = downtime
+                    self.history.append({"exit_code": exit_code, "exited_at": time.time() - downtime, "downtime": downtime})
+                print(f"[INFO] {self.name}已重启（第 {self.restarts} 次），停机 {downtime:.2f} 秒")
+                if self._on_restart is not None:
+                    self._on_restart(self.process)
+        except Exception as e:
+            print(f"[ERROR] 监督{self.name}进程时出错: {e}")
+            self._finish("error")
+
+    def _restart(self):
+        """启动新进程并等待就绪，返回是否成功"""
+        process = self._spawn()
+        if process is None:
+            return False
+        self.process = process
+        if self._ready is not None and not self._ready(process):
+            # 未就绪的进程不再使用，交给下一轮重启
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            return False
+        return True
+
+    def _finish(self, reason):
+        """结束监督"""
+        with self._lock:
+            self.exit_reason = reason
+        self._done.set()
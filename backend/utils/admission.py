@@ -0,0 +1,170 @@
+"""准入控制 - CPU 密集型接口的并发限制与成本上限
+
+简要说明：
+- 每个接口有独立的并发上限和有界等待队列
+- 等待队列已满或等待超时时拒绝请求（调用方返回 429 并附带 Retry-After）
+- Retry-After 根据最近请求的平均耗时估算
+- 预估工作量超过上限的请求被降级（减少模拟次数）；降到最少模拟次数仍超过上限、或无法降级（自动模拟抽数）时拒绝（413）
+- 并发上限、队列长度和成本上限均可通过环境变量配置
+
+主要用法：
+- `AdmissionController.from_env(defaults)`：按默认配置和环境变量创建各接口的限流器
+- `controller.limiter(name).slot()`：在 with 块内占用一个并发名额
+- `limiter.acquire()` / `limiter.release()`：名额需要跨越函数返回时（如流式响应）使用
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+class AdmissionRejected(Exception):
+    """请求被准入控制拒绝
+
+    属性:
+    - `retry_after`: 建议客户端重试前等待的秒数
+    """
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = int(retry_after)
+
+
+class RequestTooExpensive(ValueError):
+    """请求的预估工作量超过上限且无法降级"""
+
+
+@dataclass(frozen=True)
+class EndpointLimit:
+    """单个接口的限流参数"""
+    max_concurrent: int = 2  # 同时执行的请求数上限
+    max_queue: int = 8  # 等待执行的请求数上限
+    queue_timeout: float = 30.0  # 最长等待时间（秒）
+
+
+@dataclass(frozen=True)
+class CostCeilings:
+    """请求成本上限（由运维配置）"""
+    max_auto_count: int = 10_000_000  # 自动模拟的最大抽数
+    max_goal_work: int = 50_000_000  # 目标概率估算的最大工作量（模拟次数 × 抽数）
+    max_required_pulls_work: int = 200_000_000  # 所需抽数计算的最大工作量（搜索中各次估算的 模拟次数 × 抽数上限 之和）
+    min_trials: int = 1000  # 降级后的最少模拟次数
+
+
+class EndpointLimiter:
+    """单个接口的并发限制器：并发名额 + 有界等待队列"""
+
+    def __init__(self, name: str, limit: EndpointLimit):
+        self.name = name
+        self.limit = limit
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._avg_duration = 1.0  # 最近请求耗时的指数移动平均（秒）
+
+    def _retry_after(self) -> int:
+        """估算排队中的请求全部完成所需的时间（需持有锁）"""
+        rounds = (self._waiting + self._active) / max(1, self.limit.max_concurrent)
+        return max(1, math.ceil(rounds * self._avg_duration))
+
+    def acquire(self) -> float:
+        """占用一个并发名额，返回开始时间；无法获得时抛出 AdmissionRejected"""
+        with self._cond:
+            if self._active >= self.limit.max_concurrent:
+                if self._waiting >= self.limit.max_queue:
+                    raise AdmissionRejected(f"{self.name}: too many requests", self._retry_after())
+                self._waiting += 1
+                deadline = time.monotonic() + self.limit.queue_timeout
+                try:
+                    while self._active >= self.limit.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise AdmissionRejected(f"{self.name}: queue wait timed out", self._retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+        return time.monotonic()
+
+    def release(self, started_at: float) -> None:
+        """释放并发名额，并更新平均耗时"""
+        duration = time.monotonic() - started_at
+        with self._cond:
+            self._active -= 1
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """在 with 块内占用一个并发名额"""
+        started_at = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(started_at)
+
+    def snapshot(self) -> dict:
+        """当前状态（执行中、排队中的请求数）"""
+        with self._cond:
+            return {"active": self._active, "waiting": self._waiting}
+
+
+class AdmissionController:
+    """各接口限流器与成本上限的集合"""
+
+    def __init__(self, limits: dict[str, EndpointLimit], ceilings: CostCeilings):
+        self.ceilings = ceilings
+        self._limiters = {name: EndpointLimiter(name, limit) for name, limit in limits.items()}
+
+    def limiter(self, name: str) -> EndpointLimiter:
+        """获取接口限流器"""
+        return self._limiters[name]
+
+    @staticmethod
+    def _env_limit(name: str, default: EndpointLimit) -> EndpointLimit:
+        """读取 WISH_LIMIT_<NAME>_CONCURRENCY / _QUEUE / _TIMEOUT 环境变量"""
+        prefix = f"WISH_LIMIT_{name.upper()}_"
+        return EndpointLimit(
+            max_concurrent=int(os.environ.get(prefix + "CONCURRENCY", default.max_concurrent)),
+            max_queue=int(os.environ.get(prefix + "QUEUE", default.max_queue)),
+            queue_timeout=float(os.environ.get(prefix + "TIMEOUT", default.queue_timeout)),
+        )
+
+    @classmethod
+    def from_env(cls, defaults: dict[str, EndpointLimit]) -> "AdmissionController":
+        """按环境变量覆盖默认配置创建控制器"""
+        limits = {name: cls._env_limit(name, limit) for name, limit in defaults.items()}
+        base = CostCeilings()
+        ceilings = CostCeilings(
+            max_auto_count=int(os.environ.get("WISH_MAX_AUTO_COUNT", base.max_auto_count)),
+            max_goal_work=int(os.environ.get("WISH_MAX_GOAL_WORK", base.max_goal_work)),
+            max_required_pulls_work=int(os.environ.get("WISH_MAX_REQUIRED_PULLS_WORK", base.max_required_pulls_work)),
+            min_trials=int(os.environ.get("WISH_MIN_TRIALS", base.min_trials)),
+        )
+        return cls(limits, ceilings)
+
+    def check_auto_count(self, count: int) -> None:
+        """自动模拟抽数超过上限时抛出 RequestTooExpensive"""
+        if int(count) > self.ceilings.max_auto_count:
+            raise RequestTooExpensive(f"count must be <= {self.ceilings.max_auto_count}")
+
+    def fit_trials(self, trials: int, pulls: int, max_work: int, fixed_work: int = 0) -> int:
+        """返回工作量（`fixed_work` + 模拟次数 × 抽数）不超过上限的模拟次数
+
+        `fixed_work` 为不随模拟次数变化的工作量（如所需抽数搜索中固定模拟次数的阶段）。
+        降级后不低于 min_trials；降到 min_trials（或请求本身更少的模拟次数）仍超过上限时抛出 RequestTooExpensive。
+        """
+        trials = int(trials)
+        pulls = max(1, int(pulls))
+        if fixed_work + trials * pulls <= max_work:
+            return trials
+        fitted = min(trials, max(self.ceilings.min_trials, (max_work - fixed_work) // pulls))
+        if fixed_work + fitted * pulls > max_work:
+            raise RequestTooExpensive(
+                f"estimated work {fixed_work + fitted * pulls} exceeds the limit {max_work} "
+                f"even with trials={fitted}; reduce the targets or resources"
+            )
+        return fitted
@@ -0,0 +1,127 @@
+"""响应压缩 - gzip / brotli
+
+简要说明：
+- 根据 Accept-Encoding 选择 brotli（需要可选依赖 brotli）或 gzip
+- 小于阈值的响应（如单抽结果）不压缩，避免增加延迟
+- 流式响应（SSE / NDJSON）逐块压缩并立即刷新，客户端可以实时收到每个事件
+- 阈值和压缩级别可通过环境变量配置
+
+主要用法：
+- `compress_response(response, accept_encoding)`：在 Flask `after_request` 中调用
+"""
+
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+COMPRESSION_ENABLED = os.environ.get('WISH_COMPRESSION', '1') != '0'  # 是否启用响应压缩
+COMPRESS_MIN_SIZE = int(os.environ.get('WISH_COMPRESS_MIN_SIZE', 1024))  # 压缩阈值（字节）
+GZIP_LEVEL = int(os.environ.get('WISH_GZIP_LEVEL', 6))  # gzip 压缩级别（1-9）
+BROTLI_QUALITY = int(os.environ.get('WISH_BROTLI_QUALITY', 4))  # brotli 压缩质量（0-11）
+
+# 已经是压缩格式的内容不再压缩
+_INCOMPRESSIBLE_PREFIXES = ('image/', 'video/', 'audio/', 'font/woff')
+
+
+def _parse_accept_encoding(header: str | None) -> dict[str, float]:
+    """解析 Accept-Encoding 头，返回 {编码: q 值}"""
+    encodings = {}
+    for part in (header or '').split(','):
+        fields = part.strip().split(';')
+        name = fields[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def accepts_encoding(accept_encoding: str | None, encoding: str) -> bool:
+    """客户端是否接受指定编码"""
+    encodings = _parse_accept_encoding(accept_encoding)
+    return encodings.get(encoding, encodings.get('*', 0.0)) > 0
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """选择压缩编码：优先 brotli，其次 gzip；客户端不接受时返回 None"""
+    if brotli is not None and accepts_encoding(accept_encoding, 'br'):
+        return 'br'
+    if accepts_encoding(accept_encoding, 'gzip'):
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """一次性压缩完整响应体"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding: str):
+    """逐块压缩流式响应，每块之后刷新，保证事件及时送达"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = process(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # 客户端断开时关闭原始迭代器（触发流式计算的取消逻辑）
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response, accept_encoding: str | None):
+    """按需压缩 Flask 响应，返回（可能被修改的）同一个响应对象"""
+    if not COMPRESSION_ENABLED:
+        return response
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+            or (response.mimetype or '').startswith(_INCOMPRESSIBLE_PREFIXES)):
+        return response
+
+    if not response.is_streamed and response.calculate_content_length() < COMPRESS_MIN_SIZE:
+        return response
+
+    # 超过阈值的响应内容取决于 Accept-Encoding，即使本次未压缩也要告知缓存
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    # 强 ETag 对应具体字节内容，压缩后的表示需要不同的 ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
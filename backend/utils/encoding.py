@@ -0,0 +1,107 @@
+"""响应编码 - 可插拔的 JSON 编码器
+
+简要说明：
+- 安装了 orjson 时使用 orjson 编码，NumPy 数组和标量直接编码，不经过 `.tolist()` 复制
+- 未安装时回退到标准库 json，NumPy 类型在 `default` 中转换
+- 可通过环境变量 WISH_JSON_ENCODER（`orjson` / `stdlib`）指定编码器
+- 输出为 UTF-8 字节串，非 ASCII 字符（如角色名）不转义
+
+主要用法：
+- `get_encoder()`：返回当前配置的编码器
+- `dumps(obj)`：使用当前编码器编码为字节串
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+def _numpy_default(obj):
+    """标准库 json 无法直接编码的 NumPy 类型"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonEncoder(ABC):
+    """编码器接口：`dumps(obj) -> bytes`"""
+
+    name = "base"
+
+    @abstractmethod
+    def dumps(self, obj) -> bytes:
+        """将对象编码为 UTF-8 JSON 字节串"""
+
+
+class StdlibJsonEncoder(JsonEncoder):
+    """标准库 json 编码器（紧凑输出）"""
+
+    name = "stdlib"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=False, separators=(",", ":"), default=_numpy_default
+        )
+
+    def dumps(self, obj) -> bytes:
+        return self._encoder.encode(obj).encode("utf-8")
+
+
+class OrjsonEncoder(JsonEncoder):
+    """orjson 编码器：原生支持 NumPy 数组与标量、非字符串字典键"""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        self._option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj) -> bytes:
+        # 非连续数组等 orjson 不支持的类型交给 _numpy_default 处理
+        return orjson.dumps(obj, default=_numpy_default, option=self._option)
+
+
+ENCODERS = {
+    StdlibJsonEncoder.name: StdlibJsonEncoder,
+    OrjsonEncoder.name: OrjsonEncoder,
+}
+
+
+def available_encoders() -> list[str]:
+    """当前环境可用的编码器名称"""
+    return [name for name in ENCODERS if name != OrjsonEncoder.name or orjson is not None]
+
+
+def create_encoder(name: str | None = None) -> JsonEncoder:
+    """按名称创建编码器；未指定时优先使用 orjson"""
+    if name is None:
+        name = OrjsonEncoder.name if orjson is not None else StdlibJsonEncoder.name
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown JSON encoder: {name}")
+    return ENCODERS[name]()
+
+
+_encoder: JsonEncoder | None = None
+
+
+def get_encoder() -> JsonEncoder:
+    """返回当前配置的编码器（首次调用时按 WISH_JSON_ENCODER 创建）"""
+    global _encoder
+    if _encoder is None:
+        _encoder = create_encoder(os.environ.get("WISH_JSON_ENCODER") or None)
+    return _encoder
+
+
+def dumps(obj) -> bytes:
+    """使用当前编码器编码为 UTF-8 JSON 字节串"""
+    return get_encoder().dumps(obj)
@@ -0,0 +1,203 @@
+"""计算任务队列 - 长耗时计算的异步任务管理
+
+简要说明：
+- 提供有界任务队列和计算工作线程池，HTTP 线程只负责提交和轮询
+- 相同请求指纹的任务会被合并，重复提交返回同一个任务
+- 任务运行时记录进度（已完成模拟次数、当前搜索区间等）
+- 已结束任务的结果在 TTL 内保留，过期后自动清理
+
+主要用法：
+- `JobManager(runner)`：`runner(job)` 在工作线程中执行实际计算并返回结果字典
+- `submit(kind, params, fingerprint)`：提交任务，队列已满时抛出 `JobQueueFull`
+- `get(job_id)` / `cancel(job_id)`：轮询和取消任务
+"""
+
+import queue
+import threading
+import time
+import uuid
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """任务队列已满，无法接受新任务"""
+
+
+class Job:
+    """单个计算任务
+
+    属性:
+    - `job_id`: 任务ID
+    - `kind`: 任务类型（如 `goal_probability`）
+    - `params`: 请求参数
+    - `fingerprint`: 归一化请求指纹，用于去重
+    - `status`: 任务状态（queued/running/done/failed/cancelled）
+    - `progress`: 最近一次汇报的进度
+    - `result` / `error`: 计算结果或错误信息
+    - `cancel_event`: 取消标志，计算过程中会定期检查
+    """
+
+    def __init__(self, kind: str, params: dict, fingerprint: str, id_prefix: str = ""):
+        self.job_id = id_prefix + uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.fingerprint = fingerprint
+        self.status = JOB_QUEUED
+        self.progress: dict = {}
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def update_progress(self, event: dict) -> None:
+        """合并一条进度事件（由计算线程调用）"""
+        with self._lock:
+            self.progress.update(event)
+
+    def to_dict(self) -> dict:
+        """转换为API返回格式"""
+        with self._lock:
+            data = {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+        if self.status == JOB_DONE:
+            data["result"] = self.result
+        elif self.status == JOB_FAILED:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """有界任务队列 + 计算工作线程池
+
+    参数:
+    - `runner`: 任务执行函数，签名为 `runner(job) -> dict`
+    - `max_queue`: 排队任务上限，超过时 `submit` 抛出 `JobQueueFull`
+    - `workers`: 计算工作线程数
+    - `result_ttl`: 已结束任务的保留时间（秒）
+    """
+
+    def __init__(self, runner, *, max_queue: int = 16, workers: int = 2, result_ttl: float = 300.0,
+                 id_prefix: str = ""):
+        self.runner = runner
+        self.id_prefix = id_prefix  # 任务ID前缀（多实例部署时用于将查询路由回提交任务的实例）
+        self.workers = int(workers)
+        self.result_ttl = float(result_ttl)
+        self._queue: queue.Queue = queue.Queue(maxsize=int(max_queue))
+        self._jobs: dict[str, Job] = {}
+        self._by_fingerprint: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def _ensure_workers(self) -> None:
+        """首次提交任务时再启动工作线程，避免模块导入时创建线程"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _purge_expired(self) -> None:
+        """清理超过 TTL 的已结束任务（需持有锁）"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATES and job.finished_at is not None
+            and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._by_fingerprint.get(job.fingerprint) is job:
+                del self._by_fingerprint[job.fingerprint]
+
+    def submit(self, kind: str, params: dict, fingerprint: str) -> tuple[Job, bool]:
+        """提交任务
+
+        返回 `(job, created)`，`created` 为 False 表示复用了指纹相同的已有任务。
+        """
+        with self._lock:
+            self._ensure_workers()
+            self._purge_expired()
+            existing = self._by_fingerprint.get(fingerprint)
+            if existing is not None and existing.status in (JOB_QUEUED, JOB_RUNNING, JOB_DONE):
+                return existing, False
+
+            job = Job(kind, params, fingerprint, self.id_prefix)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise JobQueueFull("job queue is full")
+            self._jobs[job.job_id] = job
+            self._by_fingerprint[fingerprint] = job
+            return job, True
+
+    def get(self, job_id: str) -> Job | None:
+        """按ID查询任务，过期或不存在时返回 None"""
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        """取消任务：排队中的任务直接取消，运行中的任务在下一批模拟前终止"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == JOB_QUEUED:
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+            job.cancel_event.set()
+            return job
+
+    def _worker_loop(self) -> None:
+        """工作线程主循环"""
+        while True:
+            job = self._queue.get()
+            try:
+                self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job: Job) -> None:
+        """执行单个任务并记录结果"""
+        with self._lock:
+            if job.status != JOB_QUEUED:
+                # 排队期间已被取消
+                return
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+
+        try:
+            result = self.runner(job)
+        except Exception as e:
+            with self._lock:
+                if job.cancel_event.is_set():
+                    job.status = JOB_CANCELLED
+                else:
+                    job.status = JOB_FAILED
+                    job.error = str(e)
+                job.finished_at = time.time()
+            return
+
+        with self._lock:
+            job.result = result
+            job.status = JOB_CANCELLED if job.cancel_event.is_set() else JOB_DONE
+            job.finished_at = time.time()
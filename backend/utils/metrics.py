@@ -0,0 +1,238 @@
+"""指标 - 低开销的计数器 / 仪表 / 直方图与 Prometheus 文本格式输出
+
+简要说明：
+- 指标值保存在进程内的字典中，每次更新只需一次加锁和字典操作
+- 采集函数（collector）在导出时调用，用于读取缓存命中率等已有统计，不增加请求路径开销
+- 多进程：设置 WISH_METRICS_DIR 后，每个进程定期将快照写入该目录（`<实例>-<pid>.json`），
+  导出时合并所有快照：计数器和直方图求和（已退出进程的累计值保留），仪表只合并仍在更新的进程
+- 输出 Prometheus 文本格式（0.0.4）
+
+主要用法：
+- `registry.describe(name, type, help)`：声明指标
+- `registry.inc(name, labels)` / `registry.dec(...)` / `registry.observe(name, labels, value)`：更新指标
+- `registry.register_collector(fn)`：`fn()` 返回 `(name, labels, value)` 列表
+- `MultiProcessStore(directory, registry)`：多进程快照的写入与合并
+- `render_prometheus(snapshot)`：将快照转换为 Prometheus 文本
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# 请求耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS_FLUSH_INTERVAL = float(os.environ.get('WISH_METRICS_FLUSH_INTERVAL', 1.0))  # 多进程快照写入间隔（秒）
+_HEARTBEAT_INTERVAL = 10.0  # 无变化时也定期重写快照，表明进程仍然存活
+_STALE_AFTER = 3 * _HEARTBEAT_INTERVAL  # 超过该时间未更新的快照不再计入仪表
+
+
+def _label_key(labels) -> tuple:
+    """标签字典 -> 有序元组（可作为字典键）"""
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._meta: dict[str, tuple[str, str]] = {}  # 指标名 -> (类型, 说明)
+        self._values: dict[tuple, float] = {}  # (指标名, 标签) -> 值（计数器和仪表）
+        self._histograms: dict[tuple, list] = {}  # (指标名, 标签) -> [各分桶计数..., 总和, 次数]
+        self._collectors = []
+        self.version = 0  # 每次更新递增，用于判断是否需要写入快照
+
+    def describe(self, name: str, metric_type: str, help_text: str) -> None:
+        """声明指标类型和说明"""
+        self._meta[name] = (metric_type, help_text)
+
+    def inc(self, name: str, labels: dict | None = None, amount: float = 1.0) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+            self.version += 1
+
+    def dec(self, name: str, labels: dict | None = None, amount: float = 1.0) -> None:
+        self.inc(name, labels, -amount)
+
+    def set(self, name: str, labels: dict | None = None, value: float = 0.0) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = float(value)
+            self.version += 1
+
+    def observe(self, name: str, labels: dict | None, value: float) -> None:
+        """记录一次直方图观测值"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            data = self._histograms.get(key)
+            if data is None:
+                data = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+            self.version += 1
+
+    def register_collector(self, collector) -> None:
+        """注册采集函数：导出时调用，返回 `(name, labels, value)` 列表"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """当前进程的指标快照（可 JSON 序列化）"""
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: list(data) for key, data in self._histograms.items()}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                values[(name, _label_key(labels))] = float(value)
+
+        def encode(key):
+            return json.dumps([key[0], [list(pair) for pair in key[1]]], ensure_ascii=False)
+
+        return {
+            "meta": {name: list(meta) for name, meta in self._meta.items()},
+            "buckets": list(self.buckets),
+            "values": {encode(key): value for key, value in values.items()},
+            "histograms": {encode(key): data for key, data in histograms.items()},
+        }
+
+
+def merge_snapshots(snapshots: list[dict], live: list[bool] | None = None) -> dict:
+    """合并多个进程的快照：计数器和直方图求和，仪表只合并存活进程"""
+    merged = {"meta": {}, "buckets": [], "values": {}, "histograms": {}}
+    for index, snapshot in enumerate(snapshots):
+        alive = live is None or live[index]
+        merged["meta"].update(snapshot.get("meta", {}))
+        merged["buckets"] = snapshot.get("buckets", merged["buckets"])
+        for key, value in snapshot.get("values", {}).items():
+            name = json.loads(key)[0]
+            metric_type = snapshot.get("meta", {}).get(name, [COUNTER])[0]
+            if metric_type == GAUGE and not alive:
+                continue
+            merged["values"][key] = merged["values"].get(key, 0.0) + value
+        for key, data in snapshot.get("histograms", {}).items():
+            current = merged["histograms"].get(key)
+            merged["histograms"][key] = list(data) if current is None else [a + b for a, b in zip(current, data)]
+    return merged
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(pairs, extra: tuple = ()) -> str:
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """将快照转换为 Prometheus 文本格式"""
+    series: dict[str, list] = {}
+    for key, value in snapshot["values"].items():
+        name, pairs = json.loads(key)
+        series.setdefault(name, []).append((pairs, value))
+    for key, data in snapshot["histograms"].items():
+        name, pairs = json.loads(key)
+        series.setdefault(name, []).append((pairs, data))
+
+    buckets = snapshot.get("buckets", [])
+    lines = []
+    for name in sorted(series):
+        metric_type, help_text = snapshot["meta"].get(name, (COUNTER, ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for pairs, value in sorted(series[name], key=lambda item: item[0]):
+            if metric_type == HISTOGRAM:
+                for bound, count in zip(buckets, value):
+                    lines.append(f"{name}_bucket{_format_labels(pairs, (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(pairs, (('le', '+Inf'),))} {value[-1]}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value[-2])}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {value[-1]}")
+            else:
+                lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MultiProcessStore:
+    """多进程指标：定期写入本进程快照，导出时合并目录中所有进程的快照"""
+
+    def __init__(self, directory: str, registry: MetricsRegistry, instance: str = ""):
+        self.directory = directory
+        self.registry = registry
+        self.path = os.path.join(directory, f"{instance or 'main'}-{os.getpid()}.json")
+        self._written_version = -1
+        self._written_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> None:
+        """启动后台写入线程"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.flush(force=True)
+        self._thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                pass  # 目录被清理等情况，下一轮重试
+
+    def flush(self, force: bool = False) -> None:
+        """指标有变化（或到达心跳间隔）时写入快照（先写临时文件再替换，读取方不会读到半个文件）"""
+        with self._lock:
+            now = time.monotonic()
+            version = self.registry.version
+            if not force and version == self._written_version and now - self._written_at < _HEARTBEAT_INTERVAL:
+                return
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.registry.snapshot(), f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self._written_version = version
+            self._written_at = now
+
+    def collect(self) -> dict:
+        """合并所有进程的快照（本进程使用内存中的最新值）"""
+        snapshots = [self.registry.snapshot()]
+        live = [True]
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".json") or path == self.path:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+                live.append(now - os.path.getmtime(path) < _STALE_AFTER)
+            except (OSError, ValueError):
+                continue
+        return merge_snapshots(snapshots, live)
@@ -0,0 +1,72 @@
+"""性能分析 - 按请求开启的确定性分析（cProfile）
+
+简要说明：
+- 只分析显式要求的单个请求，其余请求不经过分析器
+- 分析结果按累计耗时排序，保留前若干个热点函数（调用次数、自身耗时、累计耗时）
+- 同时保存原始 `.prof` 文件（可用 `python -m pstats` 或 snakeviz 打开）和热点摘要 `.json`
+- cProfile 只能看到当前线程：调用方应让计算在当前线程中串行执行
+
+主要用法：
+- `profile_call(fn)`：在分析器下调用 `fn()`，返回 `(结果, Profile)`
+- `summarize(profile, limit)`：热点函数摘要
+- `save_profile(profile, directory, summary)`：保存分析结果，返回分析ID
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import time
+import uuid
+
+PROFILE_TOP_FUNCTIONS = 30  # 摘要中保留的热点函数数量
+
+
+def profile_call(fn):
+    """在 cProfile 下调用 `fn()`，返回 `(结果, Profile)`；`fn` 抛出异常时照常抛出"""
+    profile = cProfile.Profile()
+    result = profile.runcall(fn)
+    return result, profile
+
+
+def _function_name(func: tuple) -> str:
+    """pstats 的函数键 `(文件, 行号, 函数名)` -> `文件:行号(函数名)`（内置函数只保留名称）"""
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def summarize(profile: cProfile.Profile, limit: int = PROFILE_TOP_FUNCTIONS) -> dict:
+    """按累计耗时排序的热点函数摘要"""
+    stats = pstats.Stats(profile)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    functions = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, total_calls, own_time, cumulative_time, _ = stats.stats[func]
+        functions.append({
+            "function": _function_name(func),
+            "ncalls": total_calls,
+            "primitive_calls": primitive_calls,
+            "tottime": round(own_time, 6),
+            "cumtime": round(cumulative_time, 6),
+        })
+    return {"total_time": round(stats.total_tt, 6), "functions": functions}
+
+
+def save_profile(profile: cProfile.Profile, directory: str, summary: dict) -> str:
+    """保存 `<ID>.prof` 和 `<ID>.json`，返回分析ID"""
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    profile.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+    with open(os.path.join(directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return profile_id
+
+
+def format_summary(summary: dict, limit: int = 15) -> str:
+    """热点摘要的文本形式（用于日志）"""
+    lines = [f"total {summary['total_time']:.3f}s", f"{'ncalls':>10} {'tottime':>9} {'cumtime':>9}  function"]
+    for item in summary["functions"][:limit]:
+        lines.append(f"{item['ncalls']:>10} {item['tottime']:>9.4f} {item['cumtime']:>9.4f}  {item['function']}")
+    return "\n".join(lines)
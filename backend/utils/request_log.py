@@ -0,0 +1,123 @@
+"""请求录制 - 将请求参数和时间戳写入紧凑的滚动日志，供回放测试使用
+
+简要说明：
+- 每个请求一行 JSON（NDJSON），使用短字段名和紧凑分隔符：
+  `t` 开始时间（Unix 时间戳）、`m` 方法、`p` 路径、`b` 归一化请求参数（键排序）、`s` 状态码、`d` 服务端耗时（毫秒）、
+  `a` Accept 请求头（仅非默认时）、`h` 响应体摘要（仅确定性结果，用于回放时比较结果）
+- 当前文件超过大小上限时滚动：旧文件在后台线程中 gzip 压缩为 `<前缀>-<时间>.ndjson.gz`，只保留最近若干个
+- 多进程：每个进程写入自己的文件（文件名包括实例标识和 PID），回放时按时间戳合并
+- 采样：可只录制一部分请求，降低高流量时的开销
+
+主要用法：
+- `RequestRecorder(directory, max_bytes, backups, sample_rate, instance)`：创建录制器
+- `recorder.record(entry)`：写入一条记录（线程安全）
+- `read_records(paths)`：读取文件或目录中的全部记录（包括已压缩的滚动文件），按开始时间排序
+- `body_digest(body)`：响应体摘要
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import random
+import shutil
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024  # 单个日志文件的大小上限
+DEFAULT_BACKUPS = 10  # 保留的滚动文件数量
+
+
+def normalize_body(data) -> object:
+    """请求参数的归一化形式：键排序后的可 JSON 序列化对象（相同参数得到相同的记录）"""
+    return json.loads(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str))
+
+
+def body_digest(body: bytes) -> str:
+    """响应体摘要（比较回放结果用）"""
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+class RequestRecorder:
+    """按大小滚动的 NDJSON 请求日志"""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS,
+                 sample_rate: float = 1.0, instance: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.prefix = f"requests-{instance or 'main'}-{os.getpid()}"
+        self.path = os.path.join(directory, f"{self.prefix}.ndjson")
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self.recorded = 0
+
+    def sampled(self) -> bool:
+        """当前请求是否录制（按采样比例）"""
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(self, entry: dict) -> None:
+        """写入一条记录；超过大小上限时滚动"""
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = open(self.path, "ab")
+                self._size = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+            self.recorded += 1
+            if self._size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        """关闭当前文件并改名，在后台压缩（调用方持有锁）"""
+        self._file.close()
+        self._file = None
+        rotated = os.path.join(self.directory, f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{self.recorded}.ndjson")
+        os.replace(self.path, rotated)
+        threading.Thread(target=self._compress, args=(rotated,), name="request-log-compress", daemon=True).start()
+
+    def _compress(self, path: str) -> None:
+        try:
+            with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+            backups = sorted(glob.glob(os.path.join(self.directory, f"{self.prefix}-*.ndjson.gz")),
+                             key=os.path.getmtime)
+            for old in backups[:-self.backups] if self.backups > 0 else backups:
+                os.remove(old)
+        except OSError:
+            pass  # 磁盘已满等情况：保留未压缩的文件，不影响请求处理
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _log_files(path: str) -> list[str]:
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.ndjson")) + glob.glob(os.path.join(path, "*.ndjson.gz")))
+    return [path]
+
+
+def read_records(paths) -> list[dict]:
+    """读取日志文件或目录中的全部记录，按开始时间排序（跳过不完整的行）"""
+    records = []
+    for path in paths:
+        for filename in _log_files(path):
+            opener = gzip.open if filename.endswith(".gz") else open
+            with opener(filename, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+    records.sort(key=lambda entry: entry.get("t", 0))
+    return records
@@ -0,0 +1,55 @@
+"""响应缓存 - 确定性计算结果的 LRU 缓存
+
+简要说明：
+- 以 ETag 为键缓存已编码的响应体和 MIME 类型，重复请求不再计算和编码
+- 只应缓存确定性结果（相同归一化请求 + 相同规则版本 -> 相同结果）
+- 超过容量时淘汰最久未使用的条目
+
+主要用法：
+- `ResponseCache(max_entries)`：`get(key)` 返回 `(body, mimetype)` 或 None，`put(key, body, mimetype)` 写入
+- `clear()`：清空缓存（基准测试测量未命中路径时使用）
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """线程安全的 LRU 响应缓存"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = int(max_entries)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> tuple[bytes, str] | None:
+        """查询缓存，命中时将条目移到最近使用的位置"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, body: bytes, mimetype: str) -> None:
+        """写入缓存，超过容量时淘汰最久未使用的条目"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (body, mimetype)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存条目（不重置命中统计）"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
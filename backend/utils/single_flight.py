@@ -0,0 +1,62 @@
+"""请求合并（single-flight）
+
+简要说明：
+- 同一时刻键相同的多个调用只执行一次，其余调用等待并共享同一个结果
+- 执行出错时，所有等待者收到同一个异常
+- 调用结束后立即移除记录，不做结果缓存
+
+主要用法：
+- `SingleFlight().do(key, fn)`：返回 `(result, shared)`，`shared` 表示结果来自其他请求的计算
+"""
+
+import threading
+
+
+class _Call:
+    """一次进行中的计算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+
+    def do(self, key, fn):
+        """执行 `fn()`；若相同 `key` 的计算正在进行，则等待其结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """当前进行中的计算数量"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,112 @@
+"""启动耗时 - 记录模块导入耗时和启动里程碑，并提供按需加载的模块代理
+
+简要说明：
+- `timed(name)`：上下文管理器，记录一段导入（或初始化）的耗时；同名只记录第一次
+- `LazyModule(name)`：首次访问属性时才导入模块（线程安全），导入耗时同样记入报告；之后的属性访问直接转发
+- `mark(event)`：记录里程碑（如首个请求完成）距进程启动的时间；同名只记录第一次
+- 进程启动时间：Linux 上读取 /proc（包括解释器自身的初始化），其他平台为本模块导入的时间
+
+主要用法：
+- `with startup.timed('flask'): from flask import Flask`
+- `GoalProbability = startup.LazyModule('backend.wish.GoalProbability')`，`GoalProbability.loaded` 表示是否已导入
+- `startup.report()`：`{'imports': {名称: 秒}, 'milestones': {事件: 距进程启动的秒数}}`；`format_report()` 为单行文本
+"""
+
+import importlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_imported_at = time.time()
+_lock = threading.Lock()
+_imports: dict[str, float] = {}
+_milestones: dict[str, float] = {}
+
+
+def _process_start() -> float:
+    """进程启动的 Unix 时间戳（无法获取时为本模块导入的时间）"""
+    try:
+        with open('/proc/self/stat') as f:
+            # 进程名可能包含空格，从最后一个 ')' 之后开始按字段解析；第 22 个字段为启动时间（开机后的时钟滴答数）
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        started = float(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return time.time() - (uptime - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return _imported_at
+
+
+PROCESS_START = _process_start()
+
+
+def since_start() -> float:
+    """距进程启动的秒数"""
+    return time.time() - PROCESS_START
+
+
+@contextmanager
+def timed(name: str):
+    """记录一段代码（通常为导入）的耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _imports.setdefault(name, elapsed)
+
+
+def mark(event: str) -> bool:
+    """记录里程碑；第一次记录时返回 True"""
+    with _lock:
+        if event in _milestones:
+            return False
+        _milestones[event] = since_start()
+        return True
+
+
+class LazyModule:
+    """首次访问属性时导入的模块代理"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self):
+        """导入并返回模块（已导入时直接返回）"""
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    with timed(self._name):
+                        self._module = importlib.import_module(self._name)
+                module = self._module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<LazyModule {self._name!r}{'' if self.loaded else ' (not loaded)'}>"
+
+
+def report() -> dict:
+    """导入耗时和里程碑（秒）"""
+    with _lock:
+        return {'imports': dict(_imports), 'milestones': dict(_milestones)}
+
+
+def format_report() -> str:
+    """单行文本：里程碑，以及按耗时排序的导入"""
+    data = report()
+    milestones = ', '.join(f"{event} {seconds:.3f}s" for event, seconds in data['milestones'].items())
+    imports = ', '.join(f"{name} {seconds * 1000:.1f}ms"
+                        for name, seconds in sorted(data['imports'].items(), key=lambda item: item[1], reverse=True))
+    return f"{milestones}; imports: {imports}"
@@ -0,0 +1,134 @@
+"""静态资源 - 生产模式下由后端直接提供预构建的前端 dist/
+
+简要说明：
+- `npm run build` 生成的 dist/ 由 Flask 直接提供，不再运行 Vite 开发服务器和代理
+- Vite 输出到 assets/ 下的文件名带内容哈希，使用长期缓存（immutable）；index.html 等其他文件每次校验
+- 预压缩：为文本类资源生成 .br（需要可选依赖 brotli）和 .gz 文件，请求时按 Accept-Encoding 直接返回，不在请求路径上压缩
+- 前端使用 history 路由，没有扩展名的未知路径返回 index.html
+
+主要用法：
+- `precompress_dist(dist_dir)`：生成 / 更新预压缩文件（跳过已是最新的文件）
+- `resolve_asset(dist_dir, path, accept_encoding)`：返回要发送的文件、编码和缓存策略
+- 命令行：`python -m backend.utils.static_assets [dist目录]`
+"""
+
+import gzip
+import mimetypes
+import os
+import sys
+from dataclasses import dataclass
+
+from backend.utils.compression import accepts_encoding
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # 带哈希的资源
+REVALIDATE_CACHE_CONTROL = 'no-cache'  # index.html 等入口文件：使用前向服务器校验（ETag）
+HASHED_ASSET_DIR = 'assets'  # Vite 默认的带哈希资源目录
+PRECOMPRESS_MIN_SIZE = 1024  # 小于该大小的文件不预压缩
+PRECOMPRESS_EXTENSIONS = ('.html', '.js', '.mjs', '.css', '.svg', '.json', '.txt', '.map', '.xml', '.wasm')
+
+# 预压缩文件后缀（按优先顺序）
+_ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    """待发送的静态文件"""
+    path: str  # 实际发送的文件（可能是 .br / .gz 预压缩文件）
+    mimetype: str  # 原始文件的 MIME 类型
+    encoding: str | None  # Content-Encoding；未压缩时为 None
+    cache_control: str
+    precompressed: bool  # 是否存在预压缩版本（响应需要 Vary: Accept-Encoding）
+
+
+def _safe_path(dist_dir: str, path: str) -> str | None:
+    """将请求路径映射到 dist 目录内的文件，越界时返回 None"""
+    root = os.path.realpath(dist_dir)
+    full = os.path.realpath(os.path.join(root, path.lstrip('/')))
+    if full != root and not full.startswith(root + os.sep):
+        return None
+    return full
+
+
+def resolve_asset(dist_dir: str, path: str, accept_encoding: str | None) -> StaticAsset | None:
+    """查找请求路径对应的文件
+
+    文件不存在时：没有扩展名的路径（前端路由）返回 index.html，其余返回 None（404）。
+    """
+    full = _safe_path(dist_dir, path)
+    if full is None:
+        return None
+    if not os.path.isfile(full):
+        if '.' in os.path.basename(path):
+            return None
+        full = os.path.join(os.path.realpath(dist_dir), 'index.html')
+        if not os.path.isfile(full):
+            return None
+
+    relative = os.path.relpath(full, os.path.realpath(dist_dir))
+    hashed = relative.split(os.sep, 1)[0] == HASHED_ASSET_DIR
+    cache_control = IMMUTABLE_CACHE_CONTROL if hashed else REVALIDATE_CACHE_CONTROL
+    mimetype = mimetypes.guess_type(full)[0] or 'application/octet-stream'
+
+    precompressed = False
+    for encoding, suffix in _ENCODING_SUFFIXES.items():
+        if not os.path.isfile(full + suffix):
+            continue
+        precompressed = True
+        # 发送预压缩文件不需要 brotli 库，只看客户端是否接受
+        if accepts_encoding(accept_encoding, encoding):
+            return StaticAsset(full + suffix, mimetype, encoding, cache_control, True)
+    return StaticAsset(full, mimetype, None, cache_control, precompressed)
+
+
+def _compress_file(source: str, target: str, encoding: str) -> bool:
+    """压缩单个文件；压缩后不更小时删除目标文件，返回是否写入"""
+    with open(source, 'rb') as f:
+        data = f.read()
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=11)
+    else:
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) >= len(data):
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+    with open(target, 'wb') as f:
+        f.write(compressed)
+    return True
+
+
+def precompress_dist(dist_dir: str) -> dict:
+    """为 dist 目录中的文本类资源生成预压缩文件（离线使用最高压缩级别）
+
+    Returns:
+        dict: `written` 为新生成的文件数，`skipped` 为已是最新的文件数
+    """
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    written = skipped = 0
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            if os.path.getsize(source) < PRECOMPRESS_MIN_SIZE:
+                continue
+            mtime = os.path.getmtime(source)
+            for encoding in encodings:
+                target = source + _ENCODING_SUFFIXES[encoding]
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    skipped += 1
+                    continue
+                if _compress_file(source, target, encoding):
+                    written += 1
+    return {'written': written, 'skipped': skipped}
+
+
+if __name__ == '__main__':
+    default_dist = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'dist')
+    target_dir = sys.argv[1] if len(sys.argv) > 1 else default_dist
+    print(precompress_dist(target_dir))
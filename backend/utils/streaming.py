@@ -0,0 +1,83 @@
+"""计算进度流式输出 - SSE / NDJSON
+
+简要说明：
+- 将长耗时计算放到后台线程执行，计算过程中的进度事件实时推送给客户端
+- 支持 Server-Sent Events（`text/event-stream`）和分块 NDJSON（`application/x-ndjson`）
+- 事件流以 `result` 事件结束，内容与对应的非流式接口返回值相同；出错时以 `error` 事件结束
+- 客户端断开连接时设置取消标志，后台计算在下一次汇报进度时终止
+
+主要用法：
+- `stream_events(run, fmt)`：`run(emit, cancel_event)` 返回最终结果，`emit(event, data)` 推送进度
+"""
+
+import queue
+import threading
+
+from backend.utils.encoding import dumps
+
+SSE_MIMETYPE = "text/event-stream"
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+_STREAM_END = object()  # 队列结束标记
+
+
+class StreamCancelled(Exception):
+    """客户端已断开连接，流式计算被取消"""
+
+
+def choose_stream_format(accept_header: str | None, requested: str | None = None) -> str:
+    """根据查询参数或 Accept 头选择流格式，默认 SSE"""
+    if requested in ("sse", "ndjson"):
+        return requested
+    if accept_header and NDJSON_MIMETYPE in accept_header:
+        return "ndjson"
+    return "sse"
+
+
+def format_event(fmt: str, event: str, data) -> bytes:
+    """将单个事件编码为 SSE 或 NDJSON 字节串"""
+    if fmt == "ndjson":
+        return dumps({"event": event, "data": data}) + b"\n"
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def stream_events(run, fmt: str):
+    """在后台线程中执行计算，并以生成器形式逐个产出编码后的事件
+
+    参数:
+    - `run`: 计算函数，签名为 `run(emit, cancel_event) -> dict`
+    - `fmt`: 流格式（`sse` 或 `ndjson`）
+    """
+    events: queue.Queue = queue.Queue()
+    cancel_event = threading.Event()
+
+    def emit(event: str, data) -> None:
+        if cancel_event.is_set():
+            raise StreamCancelled("client disconnected")
+        events.put((event, data))
+
+    def worker():
+        try:
+            result = run(emit, cancel_event)
+            events.put(("result", result))
+        except StreamCancelled:
+            pass
+        except Exception as e:
+            if not cancel_event.is_set():
+                events.put(("error", {"error": str(e)}))
+        finally:
+            events.put(_STREAM_END)
+
+    thread = threading.Thread(target=worker, name="stream-worker", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = events.get()
+            if item is _STREAM_END:
+                break
+            event, data = item
+            yield format_event(fmt, event, data)
+    finally:
+        # 正常结束或客户端断开连接（生成器被关闭）时都会执行
+        cancel_event.set()
@@ -30,6 +30,7 @@
 import numpy as np
 import sys
 import os
+from array import array
 
 # 添加项目根目录到系统路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -37,6 +38,7 @@ backend_dir = os.path.dirname(current_dir)
 project_root = os.path.dirname(backend_dir)
 sys.path.insert(0, project_root)
 
+from backend.wish import instrumentation
 
 
 # 5星物品概率设置
@@ -78,6 +80,7 @@ class CharacterWishSimulator:
     - `four_star_avg_count`: 当前已获取的常驻4星物品数
     - `base_rate`, `pity_threshold`, `pity_increase`：概率参数
     - `rng`: numpy 随机数生成器
+    - `counters`: 分支计数器（默认关闭，为 None）
 
     方法:
     - `current_rate(pity=None)`: 返回给定（或当前）pity 的5星命中概率
@@ -94,7 +97,8 @@ class CharacterWishSimulator:
                  capture_minguang_counter_max: int = CAPTURE_MINGUANG_COUNTER_MAX,
                  four_star_base_rate: float = FOUR_STAR_BASE_RATE, four_star_pity_threshold: int = FOUR_STAR_PITY_THRESHOLD,
                  four_star_pity_increase: float = FOUR_STAR_PITY_INCREASE, four_star_up_rate: float = FOUR_STAR_UP_RATE,
-                 four_star_up_characters: list = FOUR_STAR_UP_CHARACTERS):
+                 four_star_up_characters: list = FOUR_STAR_UP_CHARACTERS,
+                 counter_scope: str = instrumentation.SCOPE_WISH):
         self.total_pulls = 0  # 累计总抽数
         self.pity = int(pity)  # 当前已连续未抽中 5★ 角色的抽数
         self.up_pity = int(pity)  # 距离上次抽中 5★ UP 角色的抽数
@@ -124,6 +128,8 @@ class CharacterWishSimulator:
         self.capture_minguang_counter = 0  # 捕获明光计数器（记录连续通过大保底抽到UP5星角色的次数，达到最大值时必定触发捕获明光）
         self.capture_minguang_count = 0  # 捕获明光触发总次数
         self.four_star_up_characters = four_star_up_characters  # 4星UP角色列表
+        # 分支计数器（见 instrumentation 模块，未开启 WISH_SIM_COUNTERS 时为 None）
+        self.counters = instrumentation.counters('character', counter_scope)
 
     def current_five_star_rate(self, pity: int | None = None) -> float:
         """返回给定或当前 `pity` 下的 5★ 角色命中概率。
@@ -155,6 +161,25 @@ class CharacterWishSimulator:
         extra_steps = p - (self.four_star_pity_threshold - 1)
         return min(1.0, self.four_star_base_rate + extra_steps * self.four_star_pity_increase)
 
+    def _count_draw(self, branch: str | None, probability: float) -> None:
+        """记录一次抽卡触发的分支（仅在开启计数器时调用）
+
+        `branch` 为命中 4★ / 5★ 时的判定分支（4★ 带 `four_star_` 前缀），未命中时为 None；
+        `probability` 为命中时使用的概率，据此区分软保底和硬保底。
+        """
+        counters = self.counters
+        counters.add('draws')
+        if branch is None:
+            return
+        four_star = branch.startswith('four_star_')
+        prefix = 'four_star_' if four_star else ''
+        counters.add('four_star' if four_star else 'five_star')
+        if probability >= 1.0:
+            counters.add(prefix + 'hard_pity')
+        elif probability > (self.four_star_base_rate if four_star else self.base_rate):
+            counters.add(prefix + 'soft_pity')
+        counters.add(branch)
+
     def draw_once(self) -> tuple[bool, bool, int, int, float, bool, bool, bool]:
         """进行一次抽卡：使用当前 `pity` 计算命中率并进行随机判定。
 
@@ -173,6 +198,7 @@ class CharacterWishSimulator:
         is_four_star_up = False
         capture_minguang_triggered = False
         four_star_item = '4星常驻物品'
+        branch = None  # 本次命中的判定分支（计数器使用）
         
         if is_5star:
             # 命中5星
@@ -180,6 +206,7 @@ class CharacterWishSimulator:
             if self.capture_minguang_counter >= self.capture_minguang_counter_max:
                 capture_minguang_triggered = True
                 is_up = True
+                branch = 'capture_minguang_forced'
                 self.up_count += 1
                 self.capture_minguang_count += 1  # 增加捕获明光触发次数
                 self.capture_minguang_counter = 0
@@ -189,6 +216,7 @@ class CharacterWishSimulator:
                 if self.guarantee_up:
                     # 大保底：上次获得常驻角色，本次必定 UP
                     is_up = True
+                    branch = 'guarantee_consumed'
                     self.guarantee_up = False
                     self.up_count += 1
                     # 捕获明光计数器+1（触发大保底时），最高为最大值
@@ -198,6 +226,7 @@ class CharacterWishSimulator:
                     capture_minguang_triggered = self.rng.random() < self.capture_minguang_base_rate
                     if capture_minguang_triggered:
                         is_up = True
+                        branch = 'capture_minguang'
                         self.up_count += 1
                         self.capture_minguang_count += 1  # 增加捕获明光触发次数
                         self.capture_minguang_counter = 0
@@ -205,6 +234,7 @@ class CharacterWishSimulator:
                     else:
                         # 小保底：UP 概率为 self.five_star_up_rate，其余概率为常驻
                         is_up = self.rng.random() < self.five_star_up_rate
+                        branch = 'won_fifty_fifty' if is_up else 'lost_fifty_fifty'
                         if is_up:
                             self.up_count += 1
                             # 小保底命中UP时清零捕获明光计数器
@@ -236,11 +266,13 @@ class CharacterWishSimulator:
                 if self.guarantee_four_star_up:
                     # 4星大保底：必定为UP物品
                     is_four_star_up = True
+                    branch = 'four_star_guarantee_consumed'
                     self.four_star_up_count += 1
                     self.guarantee_four_star_up = False
                 else:
                     # UP概率为 self.four_star_up_rate
                     is_four_star_up = self.rng.random() < self.four_star_up_rate
+                    branch = 'four_star_won_fifty_fifty' if is_four_star_up else 'four_star_lost_fifty_fifty'
                     if is_four_star_up:
                         self.four_star_up_count += 1
                     else:
@@ -274,6 +306,10 @@ class CharacterWishSimulator:
             self.pity += 1
             self.up_pity += 1
 
+        # 分支计数（WISH_SIM_COUNTERS 开启时）
+        if self.counters is not None:
+            self._count_draw(branch, four_star_prob if is_4star else five_star_prob)
+
         # 增加累计抽数（在本次抽卡完成后计入）
         self.total_pulls += 1
         
@@ -388,10 +424,19 @@ class CharacterWishSimulator:
         sim = cls(pity, seed=seed)
         return sim.pull_ten()
 
-    def simulate_pulls(self, total_pulls: int) -> dict:
+    def simulate_pulls(self, total_pulls: int, progress_callback=None, progress_interval: int = 10000,
+                       detail: bool = False, five_star_columns: bool = False) -> dict:
         """
         模拟实际抽卡 `total_pulls` 次，返回抽卡结果统计。
 
+        若提供 `progress_callback`，每 `progress_interval` 抽以当前累计结果字典调用一次，
+        用于流式输出进度；回调抛出的异常会终止模拟。
+
+        `detail` 为 True 时额外返回 pity 历史（int16）和命中位置（int32）等明细 NumPy 数组。
+
+        `five_star_columns` 为 True 时5星记录按列返回 NumPy 数组（供二进制响应直接发送缓冲区），
+        否则 `five_star_costs` 为逐条的 `{cost, is_up, capture_minguang}` 字典列表（JSON 响应的格式）。
+
         返回字典：包含抽卡结果的统计信息，包括：
         - up_count: UP角色数量
         - avg_count: 常驻角色数量
@@ -407,6 +452,9 @@ class CharacterWishSimulator:
         - four_star_positions: 4星命中位置列表
         - four_star_up_positions: 4星UP命中位置列表
         - stats: 数学统计信息，包括期望抽数、中位数抽数、标准差、最小抽数、最大抽数
+        - five_star_costs: 每次5星的记录：抽数成本、是否UP、是否由捕获明光触发
+          （`five_star_columns` 为 True 时为抽数成本的 int32 数组，
+          另有一一对应的 five_star_up / five_star_capture_minguang 标记数组，int8，1 为是）
         """
         total_pulls = int(total_pulls)
         if total_pulls <= 0:
@@ -427,6 +475,8 @@ class CharacterWishSimulator:
                 'avg_positions': [],
                 'four_star_positions': [],
                 'four_star_up_positions': [],
+                'five_star_costs': [],
+                **({'five_star_up': [], 'five_star_capture_minguang': []} if five_star_columns else {}),
                 'stats': {
                     'expected_pulls': 0,
                     'median_pulls': 0,
@@ -454,14 +504,17 @@ class CharacterWishSimulator:
         total_four_star_hits = 0  # 4星总命中次数
         
         # 记录抽卡过程
-        pity_history = []  # 每次抽卡后的5星保底计数
-        four_star_pity_history = []  # 每次抽卡后的4星保底计数
-        hit_positions = []  # 5星命中位置列表
-        up_positions = []  # 5星UP角色命中位置列表
-        avg_positions = []  # 5星常驻角色命中位置列表
-        four_star_positions = []  # 4星命中位置列表
-        four_star_up_positions = []  # 4星UP物品命中位置列表
-        five_star_costs = []  # 5星抽数成本记录
+        pity_history = array('h')  # 每次抽卡后的5星保底计数
+        four_star_pity_history = array('h')  # 每次抽卡后的4星保底计数
+        hit_positions = array('i')  # 5星命中位置列表
+        up_positions = array('i')  # 5星UP角色命中位置列表
+        avg_positions = array('i')  # 5星常驻角色命中位置列表
+        four_star_positions = array('i')  # 4星命中位置列表
+        four_star_up_positions = array('i')  # 4星UP物品命中位置列表
+        # 5星记录按列保存，结束时再按需组合为逐条字典
+        five_star_costs = array('i')  # 每次5星的抽数成本
+        five_star_up = array('b')  # 每次5星是否为UP（1/0）
+        five_star_capture_minguang = array('b')  # 每次5星是否由捕获明光触发（1/0）
         last_hit_position = 0  # 上一次5星命中的位置
 
         rs = self.rng  # 随机数生成器
@@ -531,11 +584,9 @@ class CharacterWishSimulator:
                                 current_guarantee = True  # 下次必UP
                 
                 # 记录本次5星的信息
-                five_star_costs.append({
-                    'cost': cost,
-                    'is_up': is_up,
-                    'capture_minguang': capture_minguang
-                })
+                five_star_costs.append(cost)
+                five_star_up.append(is_up)
+                five_star_capture_minguang.append(capture_minguang)
                 
                 # 重置pity
                 current_pity = 0
@@ -596,6 +647,19 @@ class CharacterWishSimulator:
             pity_history.append(current_pity)
             four_star_pity_history.append(current_four_star_pity)
 
+            # 定期汇报当前累计结果
+            if progress_callback is not None and pull_num % progress_interval == 0:
+                progress_callback({
+                    'pulls_done': pull_num,
+                    'total_pulls': total_pulls,
+                    'up_count': current_up_count,
+                    'avg_count': current_avg_count,
+                    'four_star_up_count': current_four_star_up_count,
+                    'four_star_avg_count': current_four_star_avg_count,
+                    'total_hits': total_hits,
+                    'capture_minguang_count': current_capture_minguang_count
+                })
+
         # 计算数学统计信息
         # 初始化统计信息字典
         stats = {
@@ -643,7 +707,7 @@ class CharacterWishSimulator:
                 stats['five_star_up_min_count'] = int(np.min(five_star_up_intervals))
                 stats['five_star_up_max_count'] = int(np.max(five_star_up_intervals))
 
-        return {
+        result = {
             'up_count': current_up_count,
             'avg_count': current_avg_count,
             'four_star_up_count': current_four_star_up_count,
@@ -653,6 +717,29 @@ class CharacterWishSimulator:
             'four_star_avg_count': current_four_star_avg_count,
             'total_hits': total_hits,
             'capture_minguang_count': current_capture_minguang_count,
-            'five_star_costs': five_star_costs,
             'stats': stats
-        }
\ No newline at end of file
+        }
+        if five_star_columns:
+            # 与明细数组一样直接引用 array 缓冲区，二进制编码时作为原始缓冲区发送
+            result.update({
+                'five_star_costs': np.asarray(five_star_costs),
+                'five_star_up': np.asarray(five_star_up),
+                'five_star_capture_minguang': np.asarray(five_star_capture_minguang),
+            })
+        else:
+            result['five_star_costs'] = [
+                {'cost': cost, 'is_up': bool(is_up), 'capture_minguang': bool(capture_minguang)}
+                for cost, is_up, capture_minguang in zip(five_star_costs, five_star_up, five_star_capture_minguang)
+            ]
+        if detail:
+            # 明细数组直接引用 array 缓冲区，不逐元素转换
+            result.update({
+                'pity_history': np.asarray(pity_history),
+                'four_star_pity_history': np.asarray(four_star_pity_history),
+                'hit_positions': np.asarray(hit_positions),
+                'up_positions': np.asarray(up_positions),
+                'avg_positions': np.asarray(avg_positions),
+                'four_star_positions': np.asarray(four_star_positions),
+                'four_star_up_positions': np.asarray(four_star_up_positions),
+            })
+        return result
\ No newline at end of file
@@ -18,16 +18,168 @@
 
 from __future__ import annotations
 
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import Literal
+from typing import Callable, Literal
 
 import numpy as np
 
+from backend.wish import CharacterWish, CharacterWish2, WeaponWish
+from backend.wish.instrumentation import SCOPE_GOAL
+
 
 Strategy = Literal["character_then_weapon", "weapon_then_character"]
 
 DEFAULT_TRIALS: int = 10000  # 默认模拟次数，用于概率估算
+TRIAL_BATCH_SIZE: int = 1000  # 每批模拟次数，批与批之间汇报进度并检查是否取消
+GRID_CONSTELLATIONS: tuple[int, ...] = tuple(range(7))  # 概率网格的命之座层数（C0-C6）
+GRID_REFINEMENTS: tuple[int, ...] = tuple(range(6))  # 概率网格的精炼等级（R0 表示不抽武器，R1-R5）
+SEARCH_QUICK_TRIALS: int = 1000  # 所需抽数搜索：快速定位上界阶段每次估算的模拟次数
+SEARCH_MEDIUM_TRIALS: int = 3000  # 所需抽数搜索：二分查找阶段每次估算的模拟次数
+SEARCH_FINAL_ESTIMATES: int = 3  # 所需抽数搜索：严格验证阶段最多估算的次数（准入控制按此计价）
+
+
+class ComputationCancelled(Exception):
+    """计算被调用方取消（例如异步任务被取消、客户端断开连接）"""
+
+
+class DeadlineExceeded(Exception):
+    """计算超过截止时间
+
+    `partial` 为截止时已完成部分的估算结果（`truncated` 为 True），可能为 None。
+    """
+
+    def __init__(self, partial: dict | None = None):
+        super().__init__("computation deadline exceeded")
+        self.partial = partial
+
+
+@dataclass
+class ComputeControl:
+    """计算控制参数
+
+    通过 `compute_control` 绑定到当前线程后，概率估算和所需抽数搜索会在
+    每批模拟之间汇报进度并检查是否被取消。
+    """
+    progress: Callable[[dict], None] | None = None  # 进度回调，参数为进度字典
+    cancel_event: threading.Event | None = None  # 被设置时终止计算
+    deadline: float | None = None  # 截止时间（time.monotonic()），超过后返回已有的最佳估计
+    serial: bool = False  # 在当前线程中串行模拟（性能分析时使用，分析器只能看到当前线程）
+
+
+_compute_control: contextvars.ContextVar[ComputeControl | None] = contextvars.ContextVar(
+    "goal_probability_compute_control", default=None
+)
+
+
+@contextmanager
+def compute_control(control: ComputeControl):
+    """在当前线程的计算中启用进度汇报与取消检查"""
+    token = _compute_control.set(control)
+    try:
+        yield control
+    finally:
+        _compute_control.reset(token)
+
+
+def _report_progress(**event) -> None:
+    """向当前计算控制汇报进度（未启用时无开销）"""
+    control = _compute_control.get()
+    if control is not None and control.progress is not None:
+        control.progress(event)
+
+
+def _check_cancelled() -> None:
+    """若当前计算已被取消，抛出 ComputationCancelled"""
+    control = _compute_control.get()
+    if control is not None and control.cancel_event is not None and control.cancel_event.is_set():
+        raise ComputationCancelled("computation cancelled")
+
+
+def _deadline_passed() -> bool:
+    """当前计算是否已超过截止时间"""
+    control = _compute_control.get()
+    return control is not None and control.deadline is not None and time.monotonic() >= control.deadline
+
+
+def _trial_executor():
+    """批量模拟使用的线程池；串行模式或不可用时返回 None"""
+    control = _compute_control.get()
+    if control is not None and control.serial:
+        return None
+    try:
+        import concurrent.futures
+        # 使用ThreadPoolExecutor，避免多进程无法访问局部函数的问题
+        return concurrent.futures.ThreadPoolExecutor()
+    except ImportError:
+        # 回退到串行执行
+        return None
+
+
+@contextmanager
+def request_deadline(deadline_ms: float | None):
+    """为当前线程的计算设置截止时间（毫秒），保留已绑定的进度回调和取消标志"""
+    if deadline_ms is None:
+        yield
+        return
+    current = _compute_control.get()
+    control = ComputeControl(
+        progress=current.progress if current is not None else None,
+        cancel_event=current.cancel_event if current is not None else None,
+        deadline=time.monotonic() + float(deadline_ms) / 1000.0,
+        serial=current.serial if current is not None else False,
+    )
+    with compute_control(control):
+        yield
+
+
+_simulated_trials: dict[str, int] = {}  # 计算类型 -> 已完成的模拟次数（命中缓存的不计）
+_simulated_trials_lock = threading.Lock()
+
+
+def _count_trials(kind: str, count: int) -> None:
+    """累计已完成的模拟次数（阶段成本表每批调用一次；逐次模拟在未命中缓存的试验中调用）"""
+    with _simulated_trials_lock:
+        _simulated_trials[kind] = _simulated_trials.get(kind, 0) + count
+
+
+def simulated_trials() -> dict[str, int]:
+    """本进程已完成的模拟次数：`goal` 为逐次模拟的概率估算，`character` / `weapon` 为阶段成本表"""
+    with _simulated_trials_lock:
+        return dict(_simulated_trials)
+
+
+# 决定模拟规则的模块：其中的大写常量（概率、保底阈值、UP 物品等）变化时结果随之变化
+_RULESET_MODULES = (
+    "backend.wish.CharacterWish",
+    "backend.wish.CharacterWish2",
+    "backend.wish.WeaponWish",
+)
+
+
+@lru_cache(maxsize=None)
+def ruleset_version() -> str:
+    """模拟规则版本：各模拟器模块及本模块大写常量的哈希，用于生成 ETag 等缓存键"""
+    import importlib
+
+    def module_constants(namespace: dict) -> dict:
+        return {
+            name: value for name, value in namespace.items()
+            if name.isupper() and not name.startswith("_") and isinstance(value, (bool, int, float, str, list, tuple))
+        }
+
+    constants = {"GoalProbability": module_constants(globals())}
+    for module_name in _RULESET_MODULES:
+        module = importlib.import_module(module_name)
+        constants[module_name.rsplit(".", 1)[-1]] = module_constants(vars(module))
+    encoded = json.dumps(constants, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
 
 
 @dataclass(frozen=True)
@@ -66,6 +218,15 @@ class Targets:
             self.five_star_up_weapon_2
         )
 
+    def max_required_pulls(self) -> int:
+        """达成目标的抽数上限（角色每个180抽、武器每个160抽必定获得）"""
+        return (
+            (self.five_star_up_character_1 * 180) +
+            (self.five_star_up_character_2 * 180) +
+            (self.five_star_up_weapon_1 * 160) +
+            (self.five_star_up_weapon_2 * 160)
+        )
+
 
 class GoalProbabilityCalculator:
     """目标达成概率计算器
@@ -188,11 +349,6 @@ class GoalProbabilityCalculator:
         Returns:
             bool: 是否达成目标
         """
-        # 导入模块
-        import backend.wish.CharacterWish as draw_character_module
-        import backend.wish.CharacterWish2 as draw_character2_module
-        import backend.wish.WeaponWish as draw_weapon_module
-        
         # 预计算目标数量，减少重复计算
         need_char1 = max(0, int(five_star_up_character_1))
         need_char2 = max(0, int(five_star_up_character_2))
@@ -210,38 +366,151 @@ class GoalProbabilityCalculator:
         if total_needed == 0:
             return True
 
-        # 减少模块属性访问开销
-        CharacterWishSimulator = draw_character_module.CharacterWishSimulator
-        CharacterWish2Simulator = draw_character2_module.CharacterWishSimulator2
-        WeaponWishSimulator = draw_weapon_module.WeaponWishSimulator
+        # 只有未命中缓存时才会执行到这里，因此命中缓存的试验不计入模拟次数
+        _count_trials("goal", 1)
 
         # 分离 seed，避免角色/武器强相关
+        seed_char, seed_weap = cls._phase_seeds(seed)
+
+        # 默认抽取顺序：角色活动祈愿 -> 角色活动祈愿-2 -> 武器活动祈愿
+        # 角色池与武器池使用各自的模拟器和随机数，武器阶段只受角色阶段剩余抽数的影响
+        char_costs = cls._character_phase_costs(
+            seed_char=seed_char,
+            need_char1=need_char1,
+            need_char2=need_char2,
+            character_pity=character_pity,
+            character_guarantee_up=character_guarantee_up,
+            budget=remaining,
+        )
+        if len(char_costs) < need_char1 + need_char2:
+            return False
+        remaining -= char_costs[-1] if char_costs else 0
+
+        weap_costs = cls._weapon_phase_costs(
+            seed_weap=seed_weap,
+            need_weap1=need_weap1,
+            need_weap2=need_weap2,
+            weapon_pity=weapon_pity,
+            weapon_guarantee_up=weapon_guarantee_up,
+            weapon_fate_point=weapon_fate_point,
+            budget=remaining,
+        )
+        return len(weap_costs) == need_weap1 + need_weap2
+
+    @staticmethod
+    def _phase_seeds(seed: int) -> tuple[int, int]:
+        """由单次试验的种子派生角色阶段和武器阶段的种子"""
         rng = np.random.default_rng(seed)
         seed_char = int(rng.integers(0, 2**31 - 1))
         seed_weap = int(rng.integers(0, 2**31 - 1))
+        return seed_char, seed_weap
+
+    @staticmethod
+    def _sync_character_state(source_sim, target_sim) -> None:
+        """将源模拟器的状态同步到目标模拟器（保底计数和UP保证状态）"""
+        target_sim.pity = source_sim.pity
+        target_sim.guarantee_up = source_sim.guarantee_up
+        # 同步捕获明光相关状态（如果存在）
+        if hasattr(source_sim, 'capture_minguang_counter') and hasattr(target_sim, 'capture_minguang_counter'):
+            target_sim.capture_minguang_counter = source_sim.capture_minguang_counter
+
+    @classmethod
+    def _character_phase_costs(
+        cls,
+        *,
+        seed_char: int,
+        need_char1: int,
+        need_char2: int,
+        character_pity: int,
+        character_guarantee_up: bool,
+        budget: int | None = None,
+    ) -> list[int]:
+        """角色阶段：先抽UP角色-1，再抽UP角色-2（两个池子共享保底）
+
+        Args:
+            seed_char: 角色阶段随机种子
+            need_char1: 5星UP角色-1的目标数量
+            need_char2: 5星UP角色-2的目标数量
+            character_pity: 当前已连续未抽中5星角色的抽数
+            character_guarantee_up: 下次5星是否必定为UP角色
+            budget: 可用抽数，None 表示不限
 
+        Returns:
+            list[int]: 每获得一个目标角色时累计消耗的抽数；长度小于目标总数表示在 budget 内未完成。
+            抽卡过程与目标数量无关，因此前 k 个元素也是目标数量更少时的成本。
+        """
         # 创建角色模拟器实例（UP角色-1 和 UP角色-2 分别在不同的池子，但共享保底）
         # 使用相同的seed和初始状态，确保保底同步
-        char1_sim = CharacterWishSimulator(pity=character_pity, seed=seed_char)
+        char1_sim = CharacterWish.CharacterWishSimulator(
+            pity=character_pity, seed=seed_char, counter_scope=SCOPE_GOAL
+        )
         char1_sim.guarantee_up = bool(character_guarantee_up)
-        
-        char2_sim = CharacterWish2Simulator(pity=character_pity, seed=seed_char)
+
+        char2_sim = CharacterWish2.CharacterWishSimulator2(
+            pity=character_pity, seed=seed_char, counter_scope=SCOPE_GOAL
+        )
         char2_sim.guarantee_up = bool(character_guarantee_up)
 
+        costs: list[int] = []
+        used = 0
+        got_char1 = 0
+        got_char2 = 0
+        while (budget is None or used < budget) and (got_char1 < need_char1 or got_char2 < need_char2):
+            # 优先抽取UP角色-1，如果还需要
+            if got_char1 < need_char1:
+                is_5star, _, _, _, _, is_up, _, _, _ = char1_sim.draw_once()
+                used += 1
+                if is_5star:
+                    if is_up:
+                        got_char1 += 1
+                        costs.append(used)
+                    # 同步状态到角色池2
+                    cls._sync_character_state(char1_sim, char2_sim)
+            # 然后抽取UP角色-2
+            else:
+                is_5star, _, _, _, _, is_up, _, _, _ = char2_sim.draw_once()
+                used += 1
+                if is_5star:
+                    if is_up:
+                        got_char2 += 1
+                        costs.append(used)
+                    # 同步状态到角色池1
+                    cls._sync_character_state(char2_sim, char1_sim)
+        return costs
+
+    @classmethod
+    def _weapon_phase_costs(
+        cls,
+        *,
+        seed_weap: int,
+        need_weap1: int,
+        need_weap2: int,
+        weapon_pity: int,
+        weapon_guarantee_up: bool,
+        weapon_fate_point: int,
+        budget: int | None = None,
+    ) -> list[int]:
+        """武器阶段：在武器活动祈愿中抽取UP武器-1和UP武器-2，按剩余需求定轨
+
+        Args:
+            seed_weap: 武器阶段随机种子
+            need_weap1: 5星UP武器-1的目标数量
+            need_weap2: 5星UP武器-2的目标数量
+            weapon_pity: 当前已连续未抽中5星武器的抽数
+            weapon_guarantee_up: 下次5星是否必定为UP武器
+            weapon_fate_point: 命定值（0或1）
+            budget: 可用抽数，None 表示不限
+
+        Returns:
+            list[int]: 每获得一个仍需要的目标武器时累计消耗的抽数；长度小于目标总数表示在 budget 内未完成。
+            只需要一把武器时定轨不会改变，前 k 个元素也是目标数量更少时的成本；
+            两把都需要时定轨取决于两者的剩余需求，只有最后一个元素有意义。
+        """
         # 创建武器模拟器实例
-        weap_sim = WeaponWishSimulator(pity=weapon_pity, seed=seed_weap)
+        weap_sim = WeaponWish.WeaponWishSimulator(pity=weapon_pity, seed=seed_weap, counter_scope=SCOPE_GOAL)
         weap_sim.guarantee_up = bool(weapon_guarantee_up)
         weap_sim.fate_point = int(weapon_fate_point)
 
-        # 辅助函数：同步角色池状态（保底计数和UP保证状态）
-        def sync_character_state(source_sim, target_sim):
-            """将源模拟器的状态同步到目标模拟器"""
-            target_sim.pity = source_sim.pity
-            target_sim.guarantee_up = source_sim.guarantee_up
-            # 同步捕获明光相关状态（如果存在）
-            if hasattr(source_sim, 'capture_minguang_counter') and hasattr(target_sim, 'capture_minguang_counter'):
-                target_sim.capture_minguang_counter = source_sim.capture_minguang_counter
-
         # 辅助函数：根据当前剩余需求决定定轨武器
         def update_fate_weapon(current_got_weap1: int, current_got_weap2: int) -> None:
             """根据当前已获得数量更新定轨武器"""
@@ -272,54 +541,22 @@ class GoalProbabilityCalculator:
         # 初始化定轨武器
         update_fate_weapon(0, 0)
 
-        got_char1 = 0
-        got_char2 = 0
+        costs: list[int] = []
+        used = 0
         got_weap1 = 0
         got_weap2 = 0
-
-        # 默认抽取顺序：角色活动祈愿 -> 角色活动祈愿-2 -> 武器活动祈愿
-        # 角色池共享保底，需要同步状态
-        
-        # 抽取角色（两个池子共享保底）
-        while remaining > 0 and (got_char1 < need_char1 or got_char2 < need_char2):
-            # 优先抽取UP角色-1，如果还需要
-            if got_char1 < need_char1:
-                is_5star, _, _, _, _, is_up, _, _, _ = char1_sim.draw_once()
-                remaining -= 1
-                if is_5star:
-                    if is_up:
-                        got_char1 += 1
-                    # 同步状态到角色池2
-                    sync_character_state(char1_sim, char2_sim)
-            # 然后抽取UP角色-2，如果还需要
-            elif got_char2 < need_char2:
-                is_5star, _, _, _, _, is_up, _, _, _ = char2_sim.draw_once()
-                remaining -= 1
-                if is_5star:
-                    if is_up:
-                        got_char2 += 1
-                    # 同步状态到角色池1
-                    sync_character_state(char2_sim, char1_sim)
-            
-            # 提前终止检查
-            if (
-                got_char1 >= need_char1 and
-                got_char2 >= need_char2 and
-                got_weap1 >= need_weap1 and
-                got_weap2 >= need_weap2
-            ):
-                return True
-        
-        # 抽取武器（武器活动祈愿）
-        while remaining > 0 and (got_weap1 < need_weap1 or got_weap2 < need_weap2):
+        while (budget is None or used < budget) and (got_weap1 < need_weap1 or got_weap2 < need_weap2):
             is_5star, _, _, _, _, is_up, _, is_fate, weapon_name, _, _ = weap_sim.draw_once()
-            remaining -= 1
+            used += 1
             if is_5star and is_up:
+                useful_before = min(got_weap1, need_weap1) + min(got_weap2, need_weap2)
                 # 根据武器名称判断是哪个UP武器
                 if weapon_name == '5星UP武器-1':
                     got_weap1 += 1
                 elif weapon_name == '5星UP武器-2':
                     got_weap2 += 1
+                if min(got_weap1, need_weap1) + min(got_weap2, need_weap2) > useful_before:
+                    costs.append(used)
                 # 如果获得了定轨武器（命定值清零），重新计算定轨策略
                 if is_fate:
                     update_fate_weapon(got_weap1, got_weap2)
@@ -329,21 +566,7 @@ class GoalProbabilityCalculator:
                     # 先取消定轨，再重新定轨离目标更远的那把
                     weap_sim.cancel_fate_weapon()
                     update_fate_weapon(got_weap1, got_weap2)
-            # 提前终止检查
-            if (
-                got_char1 >= need_char1 and
-                got_char2 >= need_char2 and
-                got_weap1 >= need_weap1 and
-                got_weap2 >= need_weap2
-            ):
-                return True
-
-        return (
-            got_char1 >= need_char1 and
-            got_char2 >= need_char2 and
-            got_weap1 >= need_weap1 and
-            got_weap2 >= need_weap2
-        )
+        return costs
 
     def _simulate_one_trial(
         self,
@@ -426,10 +649,7 @@ class GoalProbabilityCalculator:
         Returns:
             dict: 包含概率估算结果的字典
         """
-        # 导入模块
-        import backend.wish.CharacterWish as draw_character_module
-        import backend.wish.CharacterWish2 as draw_character2_module
-        import backend.wish.WeaponWish as draw_weapon_module
+        draw_character_module, draw_character2_module, draw_weapon_module = CharacterWish, CharacterWish2, WeaponWish
         
         pulls = int(pulls)
         trials = int(trials)
@@ -438,6 +658,124 @@ class GoalProbabilityCalculator:
         if trials <= 0:
             raise ValueError("trials must be >0")
 
+        # 快速路径：抽数不足（概率为0）或超过保底上限（概率为100%）
+        fast_result = cls._fast_path_result(
+            pulls=pulls,
+            trials=trials,
+            strategy=strategy,
+            targets={
+                "five_star_up_character_1": five_star_up_character_1,
+                "five_star_up_character_2": five_star_up_character_2,
+                "five_star_up_weapon_1": five_star_up_weapon_1,
+                "five_star_up_weapon_2": five_star_up_weapon_2
+            },
+        )
+        if fast_result is not None:
+            return fast_result
+
+        # 使用传入的trials参数
+        effective_trials = trials
+
+        trial_seeds = cls._trial_seeds(seed, effective_trials)
+
+        successes = 0
+
+        # 定义模拟函数
+        def simulate_trial(trial_seed):
+            return cls._simulate_one_trial_cached(
+                pulls=pulls,
+                five_star_up_character_1=five_star_up_character_1,
+                five_star_up_character_2=five_star_up_character_2,
+                five_star_up_weapon_1=five_star_up_weapon_1,
+                five_star_up_weapon_2=five_star_up_weapon_2,
+                strategy=strategy,
+                seed=trial_seed,
+                character_pity=character_pity,
+                character_guarantee_up=character_guarantee_up,
+                weapon_pity=weapon_pity,
+                weapon_guarantee_up=weapon_guarantee_up,
+                weapon_fate_point=weapon_fate_point,
+            )
+
+        # 尝试使用并行计算
+        executor = _trial_executor()
+
+        try:
+            # 分批执行，批与批之间汇报进度并检查是否被取消
+            for batch_start in range(0, effective_trials, TRIAL_BATCH_SIZE):
+                _check_cancelled()
+                batch_seeds = trial_seeds[batch_start:batch_start + TRIAL_BATCH_SIZE]
+                if executor is not None:
+                    successes += sum(executor.map(simulate_trial, batch_seeds))
+                else:
+                    successes += sum(1 for trial_seed in batch_seeds if simulate_trial(trial_seed))
+                trials_done = batch_start + len(batch_seeds)
+                _report_progress(
+                    pulls=pulls,
+                    trials_done=trials_done,
+                    trials_total=effective_trials,
+                    successes=successes,
+                    # 当前的平滑估计与置信区间，便于客户端观察收敛情况
+                    probability=float((successes + 0.5) / (trials_done + 1)),
+                    ci95_wilson=list(cls._wilson_ci95(successes, trials_done)),
+                )
+                # 超过截止时间：返回已完成批次的估计（抛出异常，避免部分结果被缓存）
+                if trials_done < effective_trials and _deadline_passed():
+                    raise DeadlineExceeded(cls._estimate_result(
+                        strategy=strategy,
+                        pulls=pulls,
+                        trials=trials,
+                        trials_used=trials_done,
+                        successes=successes,
+                        targets={
+                            "five_star_up_character_1": five_star_up_character_1,
+                            "five_star_up_character_2": five_star_up_character_2,
+                            "five_star_up_weapon_1": five_star_up_weapon_1,
+                            "five_star_up_weapon_2": five_star_up_weapon_2
+                        },
+                        truncated=True,
+                    ))
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        return cls._estimate_result(
+            strategy=strategy,
+            pulls=pulls,
+            trials=trials,
+            trials_used=effective_trials,
+            successes=successes,
+            targets={
+                "five_star_up_character_1": five_star_up_character_1,
+                "five_star_up_character_2": five_star_up_character_2,
+                "five_star_up_weapon_1": five_star_up_weapon_1,
+                "five_star_up_weapon_2": five_star_up_weapon_2
+            },
+        )
+
+    @staticmethod
+    def _trial_seeds(seed: int | None, trials: int) -> list[int]:
+        """生成每次试验的种子（未指定时使用固定种子，结果可复现）
+
+        SeedSequence 派生的前 n 个子种子与试验次数无关，不同试验次数的估算共享前缀。
+        """
+        base_seed = 123456789 if seed is None else int(seed)
+        ss = np.random.SeedSequence(base_seed)
+        child_seeds = ss.spawn(trials)
+        return [int(child_seeds[i].generate_state(1, dtype=np.uint32)[0]) for i in range(trials)]
+
+    @staticmethod
+    def _fast_path_result(*, pulls: int, trials: int, strategy: Strategy, targets: dict) -> dict | None:
+        """无需模拟即可确定结果时返回结果字典，否则返回 None
+
+        - 总抽数小于总目标拷贝数：概率为 0
+        - 总抽数不少于保底上限（角色每个180抽、武器每个160抽）：概率为 100%
+        """
+        five_star_up_character_1 = targets["five_star_up_character_1"]
+        five_star_up_character_2 = targets["five_star_up_character_2"]
+        five_star_up_weapon_1 = targets["five_star_up_weapon_1"]
+        five_star_up_weapon_2 = targets["five_star_up_weapon_2"]
+
         # 计算总目标拷贝数
         total_needed = five_star_up_character_1 + five_star_up_character_2 + five_star_up_weapon_1 + five_star_up_weapon_2
 
@@ -463,7 +801,8 @@ class GoalProbabilityCalculator:
                     "probability": 0.0,
                     "ci95_wilson": [0.0, 0.0],
                     "trials_used": 0
-                }
+                },
+                "truncated": False
             }
 
         # 当抽数足够大时，直接返回100%概率
@@ -497,79 +836,63 @@ class GoalProbabilityCalculator:
                     "probability": 1.0,
                     "ci95_wilson": [1.0, 1.0],
                     "trials_used": 0
-                }
+                },
+                "truncated": False
             }
 
-        # 使用传入的trials参数
-        effective_trials = trials
+        return None
 
-        base_seed = 123456789 if seed is None else int(seed)
-        ss = np.random.SeedSequence(base_seed)
-        child_seeds = ss.spawn(effective_trials)
-
-        successes = 0
-
-        # 定义模拟函数
-        def simulate_trial(trial_seed):
-            return cls._simulate_one_trial_cached(
-                pulls=pulls,
-                five_star_up_character_1=five_star_up_character_1,
-                five_star_up_character_2=five_star_up_character_2,
-                five_star_up_weapon_1=five_star_up_weapon_1,
-                five_star_up_weapon_2=five_star_up_weapon_2,
-                strategy=strategy,
-                seed=trial_seed,
-                character_pity=character_pity,
-                character_guarantee_up=character_guarantee_up,
-                weapon_pity=weapon_pity,
-                weapon_guarantee_up=weapon_guarantee_up,
-                weapon_fate_point=weapon_fate_point,
-            )
+    @classmethod
+    def _estimate_result(
+        cls,
+        *,
+        strategy: Strategy,
+        pulls: int,
+        trials: int,
+        trials_used: int,
+        successes: int,
+        targets: dict,
+        truncated: bool = False,
+    ) -> dict:
+        """根据模拟结果构建概率估算结果字典
 
-        # 尝试使用并行计算
-        try:
-            import concurrent.futures
-            # 使用ThreadPoolExecutor，避免多进程无法访问局部函数的问题
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                trial_seeds = [int(child_seeds[i].generate_state(1, dtype=np.uint32)[0]) for i in range(effective_trials)]
-                results = list(executor.map(simulate_trial, trial_seeds))
-                successes = sum(results)
-        except ImportError:
-            # 回退到串行执行
-            for i in range(effective_trials):
-                trial_seed = int(child_seeds[i].generate_state(1, dtype=np.uint32)[0])
-                if simulate_trial(trial_seed):
-                    successes += 1
+        Args:
+            strategy: 抽取策略
+            pulls: 总抽数
+            trials: 请求的试验次数
+            trials_used: 实际完成的试验次数
+            successes: 成功次数
+            targets: 目标数量字典
+            truncated: 是否因超过截止时间而提前结束
 
+        Returns:
+            dict: 包含概率估算结果的字典
+        """
         # 频率估计：successes / n
-        freq_p = successes / effective_trials if effective_trials else 0.0
+        freq_p = successes / trials_used if trials_used else 0.0
         # 使用 Jeffreys 先验 Beta(0.5, 0.5) 的贝叶斯估计，避免小样本下直接为 0 或 1
         # posterior mean = (s + 0.5) / (n + 1)
-        bayes_p = (successes + 0.5) / (effective_trials + 1) if effective_trials else 0.0
+        bayes_p = (successes + 0.5) / (trials_used + 1) if trials_used else 0.0
 
-        ci_lo, ci_hi = cls._wilson_ci95(successes, effective_trials)
+        ci_lo, ci_hi = cls._wilson_ci95(successes, trials_used)
         return {
             "strategy": strategy,
             "resources": pulls,
             "pulls": pulls,
             "trials_requested": trials,
-            "trials_used": effective_trials,
+            "trials_used": trials_used,
             "successes": successes,
             # 对外使用平滑后的贝叶斯估计，降低小样本导致的 0 概率问题
             "probability": float(bayes_p),
             "frequency_estimate": float(freq_p),
             "ci95_wilson": [ci_lo, ci_hi],
-            "targets": {
-                "five_star_up_character_1": five_star_up_character_1,
-                "five_star_up_character_2": five_star_up_character_2,
-                "five_star_up_weapon_1": five_star_up_weapon_1,
-                "five_star_up_weapon_2": five_star_up_weapon_2
-            },
+            "targets": targets,
             "best": {
                 "probability": float(bayes_p),
                 "ci95_wilson": [ci_lo, ci_hi],
-                "trials_used": effective_trials
-            }
+                "trials_used": trials_used
+            },
+            "truncated": truncated
         }
 
     def estimate_goal_probability(
@@ -617,6 +940,341 @@ class GoalProbabilityCalculator:
             weapon_fate_point=start.weapon_fate_point,
         )
 
+    # ===== 批量估算（共享阶段成本） =====
+
+    @classmethod
+    @lru_cache(maxsize=128)
+    def _phase_cost_table_cached(
+        cls,
+        *,
+        phase: Literal["character", "weapon"],
+        need_1: int,
+        need_2: int,
+        trials: int,
+        seed: int | None,
+        character_pity: int,
+        character_guarantee_up: bool,
+        weapon_pity: int,
+        weapon_guarantee_up: bool,
+        weapon_fate_point: int,
+        budget: int,
+    ) -> np.ndarray:
+        """计算每次试验某一阶段的累计成本表（模拟到 budget 抽为止，可缓存版本）
+
+        试验种子与 estimate_goal_probability_cached 相同，因此第 i 次试验在总抽数 pulls 下成功
+        当且仅当 角色阶段成本 + 武器阶段成本 <= pulls，与逐次模拟的结果完全一致。
+        每次试验最多模拟 budget 抽：在 budget 内未获得的目标记为 budget + 1，
+        因此成本表对任何 pulls <= budget 都是精确的（缓存按 budget 区分）。
+
+        Args:
+            phase: 阶段（character 或 weapon）
+            need_1: UP角色-1 / UP武器-1 的目标数量
+            need_2: UP角色-2 / UP武器-2 的目标数量
+            trials: 试验次数
+            seed: 随机种子
+            budget: 模拟的抽数上限（组合时使用的最大总抽数）
+            其余参数: 起始状态
+
+        Returns:
+            np.ndarray: 形状为 (trials, need_1 + need_2) 的只读 int32 数组，
+            第 i 行为第 i 次试验中每获得一个目标时累计消耗的抽数（见 _character_phase_costs / _weapon_phase_costs），
+            未在 budget 内获得的目标为 budget + 1
+
+        Raises:
+            DeadlineExceeded: 超过截止时间，`partial` 为已完成试验的成本表
+        """
+        trial_seeds = cls._trial_seeds(seed, trials)
+        table = np.full((trials, need_1 + need_2), budget + 1, dtype=np.int32)
+
+        def phase_costs(trial_seed):
+            seed_char, seed_weap = cls._phase_seeds(trial_seed)
+            if phase == "character":
+                return cls._character_phase_costs(
+                    seed_char=seed_char,
+                    need_char1=need_1,
+                    need_char2=need_2,
+                    character_pity=character_pity,
+                    character_guarantee_up=character_guarantee_up,
+                    budget=budget,
+                )
+            return cls._weapon_phase_costs(
+                seed_weap=seed_weap,
+                need_weap1=need_1,
+                need_weap2=need_2,
+                weapon_pity=weapon_pity,
+                weapon_guarantee_up=weapon_guarantee_up,
+                weapon_fate_point=weapon_fate_point,
+                budget=budget,
+            )
+
+        # 尝试使用并行计算
+        executor = _trial_executor()
+
+        try:
+            for batch_start in range(0, trials, TRIAL_BATCH_SIZE):
+                _check_cancelled()
+                batch_seeds = trial_seeds[batch_start:batch_start + TRIAL_BATCH_SIZE]
+                rows = executor.map(phase_costs, batch_seeds) if executor is not None else map(phase_costs, batch_seeds)
+                for offset, costs in enumerate(rows):
+                    table[batch_start + offset, :len(costs)] = costs
+                trials_done = batch_start + len(batch_seeds)
+                _count_trials(phase, len(batch_seeds))
+                _report_progress(stage=phase, needs=[need_1, need_2], trials_done=trials_done, trials_total=trials)
+                if trials_done < trials and _deadline_passed():
+                    partial = table[:trials_done]
+                    partial.flags.writeable = False
+                    raise DeadlineExceeded(partial)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        # 结果会被缓存共享，禁止修改
+        table.flags.writeable = False
+        return table
+
+    @staticmethod
+    def _phase_plan(phase: str, need_1: int, need_2: int) -> tuple[tuple, int]:
+        """将某阶段的目标映射为 (成本表分组, 所需列)
+
+        - 角色只需要UP角色-1：所有场景共用一张表（取最大目标数），目标数为 k 时读第 k 列
+        - 角色需要UP角色-2：UP角色-1 目标数相同的场景共用一张表，UP角色-2 取最大目标数
+        - 武器只需要其中一把：共用一张表（取最大目标数）
+        - 武器两把都需要：定轨取决于两者的剩余需求，目标组合相同时才能共用
+        列号为 need_1 + need_2 - 1；目标为空时返回 (None, -1)，成本为 0。
+        """
+        if need_1 + need_2 == 0:
+            return None, -1
+        if phase == "character":
+            group = (phase, "1") if need_2 == 0 else (phase, "2", need_1)
+        elif need_2 == 0:
+            group = (phase, "1")
+        elif need_1 == 0:
+            group = (phase, "2")
+        else:
+            group = (phase, "12", need_1, need_2)
+        return group, need_1 + need_2 - 1
+
+    def estimate_goal_probability_batch(
+        self,
+        scenarios: list[dict],
+        *,
+        start: StartState = StartState(),
+    ) -> dict:
+        """批量估算多个场景的目标达成概率
+
+        各场景只在抽数、目标、试验次数上不同时，阶段成本可以共享：
+        每个阶段分组只模拟一次（取组内最大目标数、最大试验次数和最大抽数），再按每个场景的抽数组合。
+        结果与逐个调用 estimate_goal_probability 相同。
+
+        Args:
+            scenarios: 场景列表，每项包含 pulls、targets（Targets）、trials、strategy、seed
+            start: 起始状态（所有场景相同）
+
+        Returns:
+            dict: `results` 为按输入顺序排列的结果字典列表，`phase_tables` 为实际模拟的阶段成本表数量
+        """
+        results: list[dict | None] = [None] * len(scenarios)
+        plans: dict[tuple, dict] = {}  # (seed, 阶段分组) -> {"needs": [need_1, need_2], "trials": 最大试验次数, "pulls": 最大抽数}
+        pending = []
+
+        for index, scenario in enumerate(scenarios):
+            pulls = int(scenario["pulls"])
+            trials = int(scenario["trials"])
+            if pulls < 0:
+                raise ValueError("pulls/resources must be >=0")
+            if trials <= 0:
+                raise ValueError("trials must be >0")
+            targets: Targets = scenario["targets"]
+            target_dict = {
+                "five_star_up_character_1": targets.five_star_up_character_1,
+                "five_star_up_character_2": targets.five_star_up_character_2,
+                "five_star_up_weapon_1": targets.five_star_up_weapon_1,
+                "five_star_up_weapon_2": targets.five_star_up_weapon_2
+            }
+            fast_result = self._fast_path_result(
+                pulls=pulls, trials=trials, strategy=scenario["strategy"], targets=target_dict
+            )
+            if fast_result is not None:
+                results[index] = fast_result
+                continue
+
+            seed = scenario.get("seed")
+            columns = []
+            for phase, need_1, need_2 in (
+                ("character", targets.five_star_up_character_1, targets.five_star_up_character_2),
+                ("weapon", targets.five_star_up_weapon_1, targets.five_star_up_weapon_2),
+            ):
+                group, column = self._phase_plan(phase, need_1, need_2)
+                if group is not None:
+                    plan = plans.setdefault((seed, group), {"needs": [need_1, need_2], "trials": trials, "pulls": pulls})
+                    plan["needs"] = [max(plan["needs"][0], need_1), max(plan["needs"][1], need_2)]
+                    plan["trials"] = max(plan["trials"], trials)
+                    plan["pulls"] = max(plan["pulls"], pulls)
+                columns.append((seed, group, column))
+            pending.append((index, pulls, trials, scenario["strategy"], target_dict, columns))
+
+        # 每个阶段分组模拟一次；超过截止时间时使用已完成部分
+        tables: dict[tuple, np.ndarray] = {}
+        for key, plan in plans.items():
+            seed, group = key
+            try:
+                tables[key] = self.__class__._phase_cost_table_cached(
+                    phase=group[0],
+                    need_1=plan["needs"][0],
+                    need_2=plan["needs"][1],
+                    trials=plan["trials"],
+                    seed=seed,
+                    character_pity=start.character_pity,
+                    character_guarantee_up=start.character_guarantee_up,
+                    weapon_pity=start.weapon_pity,
+                    weapon_guarantee_up=start.weapon_guarantee_up,
+                    weapon_fate_point=start.weapon_fate_point,
+                    budget=plan["pulls"],
+                )
+            except DeadlineExceeded as e:
+                tables[key] = e.partial
+
+        for index, pulls, trials, strategy, target_dict, columns in pending:
+            trials_used = trials
+            total_cost = 0
+            for seed, group, column in columns:
+                if group is None:
+                    continue
+                table = tables[(seed, group)]
+                trials_used = min(trials_used, table.shape[0])
+                total_cost = total_cost + table[:trials_used, column]
+            if not isinstance(total_cost, np.ndarray):
+                total_cost = np.zeros(trials_used, dtype=np.int32)
+            successes = int(np.count_nonzero(total_cost[:trials_used] <= pulls))
+            results[index] = self._estimate_result(
+                strategy=strategy,
+                pulls=pulls,
+                trials=trials,
+                trials_used=trials_used,
+                successes=successes,
+                targets=target_dict,
+                truncated=trials_used < trials,
+            )
+
+        return {"results": results, "phase_tables": len(tables)}
+
+    def estimate_probability_grid(
+        self,
+        *,
+        pulls: int,
+        trials: int,
+        strategy: Strategy,
+        seed: int | None,
+        start: StartState = StartState(),
+        constellations: tuple[int, ...] = GRID_CONSTELLATIONS,
+        refinements: tuple[int, ...] = GRID_REFINEMENTS,
+    ) -> dict:
+        """估算固定抽数下 UP角色-1 命之座 × UP武器-1 精炼 每个组合的目标达成概率
+
+        给定试验种子，角色阶段和武器阶段的成本互相独立：角色阶段成本表（最高命座）和
+        武器阶段成本表（最高精炼）各模拟一次（每次试验最多模拟 pulls 抽），所有格子通过
+        角色成本 + 武器成本 <= pulls 组合，总开销约等于一次最高目标的估算。
+        每个格子的结果与单独调用 estimate_goal_probability 相同。
+
+        Args:
+            pulls: 总抽数
+            trials: 试验次数
+            strategy: 抽取策略
+            seed: 随机种子
+            start: 起始状态
+            constellations: 行对应的命之座层数
+            refinements: 列对应的精炼等级（0 表示不抽武器）
+
+        Returns:
+            dict: `probability` / `ci95_wilson` / `successes` / `trials_used` 为按 [命座][精炼] 排列的二维列表
+        """
+        pulls = int(pulls)
+        trials = int(trials)
+        if pulls < 0:
+            raise ValueError("pulls/resources must be >=0")
+        if trials <= 0:
+            raise ValueError("trials must be >0")
+
+        char_needs = [self.constellation_to_copies(c) for c in constellations]
+        weap_needs = [self.refinement_to_copies(r) for r in refinements]
+
+        # 各阶段只模拟一次（取最高目标），超过截止时间时使用已完成部分
+        tables = {}
+        for phase, need in (("character", max(char_needs)), ("weapon", max(weap_needs))):
+            if need == 0:
+                tables[phase] = np.zeros((trials, 0), dtype=np.int32)
+                continue
+            try:
+                tables[phase] = self.__class__._phase_cost_table_cached(
+                    phase=phase,
+                    need_1=need,
+                    need_2=0,
+                    trials=trials,
+                    seed=seed,
+                    character_pity=start.character_pity,
+                    character_guarantee_up=start.character_guarantee_up,
+                    weapon_pity=start.weapon_pity,
+                    weapon_guarantee_up=start.weapon_guarantee_up,
+                    weapon_fate_point=start.weapon_fate_point,
+                    budget=pulls,
+                )
+            except DeadlineExceeded as e:
+                tables[phase] = e.partial
+        trials_used = min(table.shape[0] for table in tables.values())
+
+        # 目标数量为 0 的成本为 0，第 k 个目标的累计成本在第 k-1 列
+        def phase_costs(table: np.ndarray, needs: list[int]) -> np.ndarray:
+            padded = np.zeros((trials_used, table.shape[1] + 1), dtype=np.int32)
+            padded[:, 1:] = table[:trials_used]
+            return padded[:, needs]
+
+        char_costs = phase_costs(tables["character"], char_needs)
+        weap_costs = phase_costs(tables["weapon"], weap_needs)
+        successes = np.count_nonzero(char_costs[:, :, None] + weap_costs[:, None, :] <= pulls, axis=0)
+
+        probability, ci95, cell_successes, cell_trials = [], [], [], []
+        for i, need_char in enumerate(char_needs):
+            row = [], [], [], []
+            for j, need_weap in enumerate(weap_needs):
+                targets = {
+                    "five_star_up_character_1": need_char,
+                    "five_star_up_character_2": 0,
+                    "five_star_up_weapon_1": need_weap,
+                    "five_star_up_weapon_2": 0
+                }
+                result = self._fast_path_result(pulls=pulls, trials=trials, strategy=strategy, targets=targets)
+                if result is None:
+                    result = self._estimate_result(
+                        strategy=strategy,
+                        pulls=pulls,
+                        trials=trials,
+                        trials_used=trials_used,
+                        successes=int(successes[i, j]),
+                        targets=targets,
+                    )
+                row[0].append(result["probability"])
+                row[1].append(result["ci95_wilson"])
+                row[2].append(result["successes"])
+                row[3].append(result["trials_used"])
+            probability.append(row[0])
+            ci95.append(row[1])
+            cell_successes.append(row[2])
+            cell_trials.append(row[3])
+
+        return {
+            "strategy": strategy,
+            "resources": pulls,
+            "pulls": pulls,
+            "trials_requested": trials,
+            "constellations": list(constellations),
+            "refinements": list(refinements),
+            "probability": probability,
+            "ci95_wilson": ci95,
+            "successes": cell_successes,
+            "trials_used": cell_trials,
+            "truncated": trials_used < trials,
+        }
+
     def _find_first_pulls_meeting_probability(
         self,
         *,
@@ -628,8 +1286,8 @@ class GoalProbabilityCalculator:
         draw_character_module,
         draw_character2_module,
         draw_weapon_module,
-        quick_trials: int = 1000,
-        medium_trials: int = 3000,
+        quick_trials: int = SEARCH_QUICK_TRIALS,
+        medium_trials: int = SEARCH_MEDIUM_TRIALS,
     ) -> tuple[int, dict]:
         """找到第一个满足目标概率的抽数（严格边界验证）
 
@@ -640,7 +1298,9 @@ class GoalProbabilityCalculator:
         - 前期搜索阶段使用适中的模拟次数（快速定位且保证准确）
         - 使用更激进的指数搜索步长，快速定位大致范围
         - 限制二分查找范围，聚焦于已找到的上界附近
-        - 最后使用实例默认的模拟次数（self.trials，默认10000次）进行严格边界验证
+        - 最后使用实例默认的模拟次数（self.trials，默认10000次）进行严格边界验证，最多估算 SEARCH_FINAL_ESTIMATES 次
+        - 若当前计算设置了截止时间（见 `request_deadline`），超时后返回目前找到的
+          满足目标概率的抽数，结果字典中 `truncated` 为 True；严格验证阶段的估算次数用尽时同样处理
 
         Args:
             targets: 抽卡目标
@@ -659,30 +1319,24 @@ class GoalProbabilityCalculator:
         """
         # 计算边界
         total_needed = targets.total_target_copies()
-        max_pulls = (
-            (targets.five_star_up_character_1 * 180) +
-            (targets.five_star_up_character_2 * 180) +
-            (targets.five_star_up_weapon_1 * 160) +
-            (targets.five_star_up_weapon_2 * 160)
-        )
+        max_pulls = targets.max_required_pulls()
 
         # 快速路径
         if total_needed == 0:
             return 0, {"probability": 1.0}
 
-        # 第一阶段：快速定位上界
-        # 使用指数搜索 + 更激进的步长策略
-        low = total_needed
-        high = max_pulls
-        found_upper_bound = False
-        test_pulls = low
-        step = 20  # 初始步长
+        # 当前已知满足目标概率的抽数及其估算结果，超过截止时间时作为最佳估计返回
+        best: dict = {"pulls": None, "result": None}
 
-        while test_pulls <= high and not found_upper_bound:
+        def estimate_at(pulls: int, trials: int) -> dict:
+            """估算指定抽数的概率，并记录满足目标概率的结果"""
+            _check_cancelled()
+            if _deadline_passed():
+                raise DeadlineExceeded()
             result = self.estimate_goal_probability(
-                pulls=test_pulls,
+                pulls=pulls,
                 targets=targets,
-                trials=quick_trials,
+                trials=trials,
                 strategy=strategy,
                 seed=seed,
                 start=start,
@@ -690,109 +1344,126 @@ class GoalProbabilityCalculator:
                 draw_character2_module=draw_character2_module,
                 draw_weapon_module=draw_weapon_module,
             )
-            
             if result["probability"] >= target_probability:
-                high = test_pulls
-                found_upper_bound = True
-            else:
-                # 更激进的指数增长步长
-                step = max(step, int(step * 1.5))
-                test_pulls = min(test_pulls + step, high)
-                low = test_pulls
-
-        if not found_upper_bound:
-            # 如果没找到上界，返回max_pulls
-            final_result = self.estimate_goal_probability(
-                pulls=max_pulls,
-                targets=targets,
-                trials=self.trials,
-                strategy=strategy,
-                seed=seed,
-                start=start,
-                draw_character_module=draw_character_module,
-                draw_character2_module=draw_character2_module,
-                draw_weapon_module=draw_weapon_module,
-            )
-            return max_pulls, final_result
+                best["pulls"] = pulls
+                best["result"] = result
+            return result
+
+        def best_so_far() -> tuple[int, dict]:
+            """目前找到的满足目标概率的抽数；尚未找到时返回必定达成的抽数上限"""
+            if best["pulls"] is None:
+                best["pulls"] = max_pulls
+                best["result"] = self.estimate_goal_probability(
+                    pulls=max_pulls,
+                    targets=targets,
+                    trials=self.trials,
+                    strategy=strategy,
+                    seed=seed,
+                    start=start,
+                    draw_character_module=draw_character_module,
+                    draw_character2_module=draw_character2_module,
+                    draw_weapon_module=draw_weapon_module,
+                )
+            return best["pulls"], dict(best["result"], truncated=True)
 
-        # 第二阶段：精细二分查找（使用中等精度）
-        # 限制搜索范围，避免在过大范围内进行无效的二分查找
-        required_pulls = high
-        low_bound = max(total_needed, high // 2)  # 从下界的一半开始，更聚焦
+        try:
+            # 第一阶段：快速定位上界
+            # 使用指数搜索 + 更激进的步长策略
+            low = total_needed
+            high = max_pulls
+            found_upper_bound = False
+            test_pulls = low
+            step = 20  # 初始步长
+
+            while test_pulls <= high and not found_upper_bound:
+                _report_progress(stage="quick", bracket=[low, high], test_pulls=test_pulls)
+                result = estimate_at(test_pulls, quick_trials)
+            
+                if result["probability"] >= target_probability:
+                    high = test_pulls
+                    found_upper_bound = True
+                else:
+                    # 更激进的指数增长步长
+                    step = max(step, int(step * 1.5))
+                    test_pulls = min(test_pulls + step, high)
+                    low = test_pulls
+
+            if not found_upper_bound:
+                # 如果没找到上界，返回max_pulls
+                _report_progress(stage="final", bracket=[max_pulls, max_pulls], test_pulls=max_pulls)
+                final_result = estimate_at(max_pulls, self.trials)
+                return max_pulls, final_result
+
+            # 第二阶段：精细二分查找（使用中等精度）
+            # 限制搜索范围，避免在过大范围内进行无效的二分查找
+            required_pulls = high
+            low_bound = max(total_needed, high // 2)  # 从下界的一半开始，更聚焦
         
-        while low_bound <= high:
-            mid = (low_bound + high) // 2
+            while low_bound <= high:
+                mid = (low_bound + high) // 2
+                _report_progress(stage="medium", bracket=[low_bound, high], test_pulls=mid)
             
-            result = self.estimate_goal_probability(
-                pulls=mid,
-                targets=targets,
-                trials=medium_trials,
-                strategy=strategy,
-                seed=seed,
-                start=start,
-                draw_character_module=draw_character_module,
-                draw_character2_module=draw_character2_module,
-                draw_weapon_module=draw_weapon_module,
-            )
+                result = estimate_at(mid, medium_trials)
             
-            if result["probability"] >= target_probability:
-                required_pulls = mid
-                high = mid - 1
-            else:
-                low_bound = mid + 1
-
-        # 第三阶段：严格边界验证（使用实例默认的模拟次数）
-        # 确保 required_pulls 是第一个满足条件的抽数
+                if result["probability"] >= target_probability:
+                    required_pulls = mid
+                    high = mid - 1
+                else:
+                    low_bound = mid + 1
+
+            # 第三阶段：严格边界验证（使用实例默认的模拟次数）
+            # 确保 required_pulls 是第一个满足条件的抽数；最多估算 SEARCH_FINAL_ESTIMATES 次，
+            # 用尽时返回目前的最佳结果（与超过截止时间相同），使工作量不超过准入控制的计价
         
-        # 先验证当前抽数
-        final_result = self.estimate_goal_probability(
-            pulls=required_pulls,
-            targets=targets,
-            trials=self.trials,
-            strategy=strategy,
-            seed=seed,
-            start=start,
-            draw_character_module=draw_character_module,
-            draw_character2_module=draw_character2_module,
-            draw_weapon_module=draw_weapon_module,
-        )
+            # 先验证当前抽数
+            _report_progress(stage="final", bracket=[total_needed, required_pulls], test_pulls=required_pulls)
+            final_result = estimate_at(required_pulls, self.trials)
+            final_estimates = 1
         
-        # 如果当前抽数不满足，向后搜索
-        while final_result["probability"] < target_probability and required_pulls < max_pulls:
-            required_pulls += 1
-            final_result = self.estimate_goal_probability(
-                pulls=required_pulls,
-                targets=targets,
-                trials=self.trials,
-                strategy=strategy,
-                seed=seed,
-                start=start,
-                draw_character_module=draw_character_module,
-                draw_character2_module=draw_character2_module,
-                draw_weapon_module=draw_weapon_module,
-            )
+            # 如果当前抽数不满足，向后搜索
+            while final_result["probability"] < target_probability and required_pulls < max_pulls:
+                if final_estimates >= SEARCH_FINAL_ESTIMATES:
+                    return best_so_far()
+                required_pulls += 1
+                _report_progress(stage="final", bracket=[required_pulls, max_pulls], test_pulls=required_pulls)
+                final_result = estimate_at(required_pulls, self.trials)
+                final_estimates += 1
         
-        # 向前搜索，找到第一个满足条件的抽数
-        while required_pulls > total_needed:
-            prev_result = self.estimate_goal_probability(
-                pulls=required_pulls - 1,
-                targets=targets,
-                trials=self.trials,
-                strategy=strategy,
-                seed=seed,
-                start=start,
-                draw_character_module=draw_character_module,
-                draw_character2_module=draw_character2_module,
-                draw_weapon_module=draw_weapon_module,
-            )
-            if prev_result["probability"] < target_probability:
-                # 找到了！required_pulls-1不满足，required_pulls满足
-                break
-            # 继续向前搜索
-            required_pulls -= 1
-            final_result = prev_result
+            # 向前搜索，找到第一个满足条件的抽数
+            while required_pulls > total_needed:
+                if final_estimates >= SEARCH_FINAL_ESTIMATES:
+                    return best_so_far()
+                _report_progress(stage="final", bracket=[total_needed, required_pulls], test_pulls=required_pulls - 1)
+                prev_result = estimate_at(required_pulls - 1, self.trials)
+                final_estimates += 1
+                if prev_result["probability"] < target_probability:
+                    # 找到了！required_pulls-1不满足，required_pulls满足
+                    break
+                # 继续向前搜索
+                required_pulls -= 1
+                final_result = prev_result
+
+            return required_pulls, final_result
+        except DeadlineExceeded:
+            # 超过截止时间：返回目前找到的满足目标概率的抽数
+            return best_so_far()
 
-        return required_pulls, final_result
+    @staticmethod
+    def search_estimates(targets: Targets) -> tuple[int, int]:
+        """所需抽数搜索前两个阶段的估算次数上限：(快速定位上界, 二分查找)
+
+        与 `_find_first_pulls_meeting_probability` 的步长规则一致：快速阶段从目标总数出发、步长按 1.5 倍增长直到抽数上限；
+        二分查找在 [上界 // 2, 上界] 内进行，上界不超过抽数上限。
+        """
+        test_pulls = targets.total_target_copies()
+        max_pulls = targets.max_required_pulls()
+        quick, step = 1, 20
+        while test_pulls < max_pulls:
+            step = max(step, int(step * 1.5))
+            test_pulls = min(test_pulls + step, max_pulls)
+            quick += 1
+        medium = (max_pulls - max_pulls // 2 + 1).bit_length()
+        return quick, medium
 
     def calculate_required_pulls_for_95_percent_probability(
         self,
@@ -819,13 +1490,12 @@ class GoalProbabilityCalculator:
         Returns:
             dict: 包含所需抽数和相关信息的字典
         """
-        # 导入必要的模块
         if draw_character_module is None:
-            import backend.wish.CharacterWish as draw_character_module
+            draw_character_module = CharacterWish
         if draw_character2_module is None:
-            import backend.wish.CharacterWish2 as draw_character2_module
+            draw_character2_module = CharacterWish2
         if draw_weapon_module is None:
-            import backend.wish.WeaponWish as draw_weapon_module
+            draw_weapon_module = WeaponWish
         if start is None:
             start = StartState()
 
@@ -850,6 +1520,8 @@ class GoalProbabilityCalculator:
                 "five_star_up_weapon_2": targets.five_star_up_weapon_2
             },
             "final_probability": final_result["probability"],
+            "final_ci95_wilson": final_result.get("ci95_wilson", [1.0, 1.0]),
+            "truncated": final_result.get("truncated", False),
         }
     
     def calculate_required_pulls_for_50_percent_probability(
@@ -877,13 +1549,12 @@ class GoalProbabilityCalculator:
         Returns:
             dict: 包含所需抽数和相关信息的字典
         """
-        # 导入必要的模块
         if draw_character_module is None:
-            import backend.wish.CharacterWish as draw_character_module
+            draw_character_module = CharacterWish
         if draw_character2_module is None:
-            import backend.wish.CharacterWish2 as draw_character2_module
+            draw_character2_module = CharacterWish2
         if draw_weapon_module is None:
-            import backend.wish.WeaponWish as draw_weapon_module
+            draw_weapon_module = WeaponWish
         if start is None:
             start = StartState()
 
@@ -908,29 +1579,22 @@ class GoalProbabilityCalculator:
                 "five_star_up_weapon_2": targets.five_star_up_weapon_2
             },
             "final_probability": final_result["probability"],
+            "final_ci95_wilson": final_result.get("ci95_wilson", [1.0, 1.0]),
+            "truncated": final_result.get("truncated", False),
         }
 
-    def process_api_request(self, request_data: dict) -> dict:
-        """处理API请求
+    def parse_targets(self, request_data: dict) -> Targets:
+        """从API请求数据中解析抽卡目标
 
         Args:
             request_data: API请求数据
 
         Returns:
-            dict: 包含计算结果的字典
-        """
-        # 解析请求参数
-        resources = request_data.get('resources', 0)  # 纠缠之缘数量
-        primogems = request_data.get('primogems', 0)  # 原石数量
-        crystals = request_data.get('crystals', 0)  # 创世结晶数量
-        
-        # 计算总抽数：纠缠之缘 + (原石 + 创世结晶) / 160
-        pulls = resources + (primogems + crystals) // 160
-        
-        trials = request_data.get('trials', self.trials)
-        strategy = request_data.get('strategy', 'character_then_weapon')
-        seed = request_data.get('seed', None)
+            Targets: 抽卡目标
 
+        Raises:
+            ValueError: 当命之座层数或精炼层数超出有效范围时
+        """
         # 获取命之座层数和精炼等级
         char1_constellation = request_data.get('target_character_constellation_1', 0)
         char2_constellation = request_data.get('target_character_constellation_2', 0)
@@ -944,97 +1608,215 @@ class GoalProbabilityCalculator:
         include_weap2 = request_data.get('include_weapon_2', False)
 
         # 构建目标对象
-        targets = Targets(
+        return Targets(
             five_star_up_character_1=self.constellation_to_copies(char1_constellation) if include_char1 else 0,
             five_star_up_character_2=self.constellation_to_copies(char2_constellation) if include_char2 else 0,
             five_star_up_weapon_1=self.refinement_to_copies(weap1_refinement) if include_weap1 else 0,
             five_star_up_weapon_2=self.refinement_to_copies(weap2_refinement) if include_weap2 else 0
         )
 
-        # 导入模块
-        import backend.wish.CharacterWish as draw_character_module
-        import backend.wish.CharacterWish2 as draw_character2_module
-        import backend.wish.WeaponWish as draw_weapon_module
+    @staticmethod
+    def request_pulls(request_data: dict) -> int:
+        """计算请求中的总抽数：纠缠之缘 + (原石 + 创世结晶) / 160"""
+        resources = request_data.get('resources', 0)  # 纠缠之缘数量
+        primogems = request_data.get('primogems', 0)  # 原石数量
+        crystals = request_data.get('crystals', 0)  # 创世结晶数量
+        return resources + (primogems + crystals) // 160
+
+    def normalize_request(self, request_data: dict, probability: float | None = None) -> dict:
+        """将API请求归一化为只包含影响计算结果的参数
 
-        # 计算概率
-        result = self.estimate_goal_probability(
-            pulls=pulls,
-            targets=targets,
-            trials=trials,
-            strategy=strategy,
-            seed=seed,
-            start=StartState(),
-            draw_character_module=draw_character_module,
-            draw_character2_module=draw_character2_module,
-            draw_weapon_module=draw_weapon_module
-        )
+        写法不同但计算相同的请求（例如原石与纠缠之缘换算后抽数相同）归一化后相同。
+        不包括 `deadline_ms`：截止时间只决定是否返回部分结果，而部分结果不缓存，完整结果与截止时间无关。
 
-        return result
+        Args:
+            request_data: API请求数据
+            probability: 所需抽数请求的目标概率；为 None 时表示目标概率请求
 
-    def process_required_pulls_request(self, request_data: dict, probability: float) -> dict:
-        """处理所需抽数请求
+        Returns:
+            dict: 归一化后的请求参数
+        """
+        targets = self.parse_targets(request_data)
+        normalized = {
+            "targets": [
+                targets.five_star_up_character_1,
+                targets.five_star_up_character_2,
+                targets.five_star_up_weapon_1,
+                targets.five_star_up_weapon_2,
+            ],
+            "pulls": int(self.request_pulls(request_data)),
+        }
+        if probability is None:
+            seed = request_data.get('seed', None)
+            normalized["kind"] = "goal_probability"
+            normalized["trials"] = int(request_data.get('trials', self.trials))
+            normalized["strategy"] = request_data.get('strategy', 'character_then_weapon')
+            normalized["seed"] = None if seed is None else int(seed)
+        else:
+            normalized["kind"] = "required_pulls"
+            normalized["probability"] = float(probability)
+            normalized["trials"] = int(self.trials)
+        return normalized
+
+    def request_fingerprint(self, request_data: dict, probability: float | None = None) -> str:
+        """计算请求指纹（归一化请求参数的 SHA-256）"""
+        normalized = self.normalize_request(request_data, probability)
+        encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def process_api_request(self, request_data: dict) -> dict:
+        """处理API请求
 
         Args:
             request_data: API请求数据
-            probability: 目标概率（0.5或0.95）
 
         Returns:
-            dict: 包含所需抽数的字典
+            dict: 包含计算结果的字典
         """
-        # 获取命之座层数和精炼等级
-        char1_constellation = request_data.get('target_character_constellation_1', 0)
-        char2_constellation = request_data.get('target_character_constellation_2', 0)
-        weap1_refinement = request_data.get('target_weapon_refinement_1', 0)
-        weap2_refinement = request_data.get('target_weapon_refinement_2', 0)
+        # 计算总抽数：纠缠之缘 + (原石 + 创世结晶) / 160
+        pulls = self.request_pulls(request_data)
         
-        # 是否包含该目标
-        include_char1 = request_data.get('include_character_1', True)
-        include_char2 = request_data.get('include_character_2', False)
-        include_weap1 = request_data.get('include_weapon_1', True)
-        include_weap2 = request_data.get('include_weapon_2', False)
+        trials = request_data.get('trials', self.trials)
+        strategy = request_data.get('strategy', 'character_then_weapon')
+        seed = request_data.get('seed', None)
 
         # 构建目标对象
-        targets = Targets(
-            five_star_up_character_1=self.constellation_to_copies(char1_constellation) if include_char1 else 0,
-            five_star_up_character_2=self.constellation_to_copies(char2_constellation) if include_char2 else 0,
-            five_star_up_weapon_1=self.refinement_to_copies(weap1_refinement) if include_weap1 else 0,
-            five_star_up_weapon_2=self.refinement_to_copies(weap2_refinement) if include_weap2 else 0
-        )
+        targets = self.parse_targets(request_data)
 
-        # 导入模块
-        import backend.wish.CharacterWish as draw_character_module
-        import backend.wish.CharacterWish2 as draw_character2_module
-        import backend.wish.WeaponWish as draw_weapon_module
+        draw_character_module, draw_character2_module, draw_weapon_module = CharacterWish, CharacterWish2, WeaponWish
 
-        # 根据概率选择计算方法
-        if probability == 0.95:
-            result = self.calculate_required_pulls_for_95_percent_probability(
-                targets=targets,
-                strategy="character_then_weapon",
-                seed=None,
-                start=StartState(),
-                draw_character_module=draw_character_module,
-                draw_character2_module=draw_character2_module,
-                draw_weapon_module=draw_weapon_module
-            )
-        elif probability == 0.5:
-            result = self.calculate_required_pulls_for_50_percent_probability(
-                targets=targets,
-                strategy="character_then_weapon",
-                seed=None,
+        # 计算概率（可选截止时间，超时返回已完成部分的估计）
+        try:
+            with request_deadline(request_data.get('deadline_ms', None)):
+                result = self.estimate_goal_probability(
+                    pulls=pulls,
+                    targets=targets,
+                    trials=trials,
+                    strategy=strategy,
+                    seed=seed,
+                    start=StartState(),
+                    draw_character_module=draw_character_module,
+                    draw_character2_module=draw_character2_module,
+                    draw_weapon_module=draw_weapon_module
+                )
+        except DeadlineExceeded as e:
+            result = e.partial
+
+        return result
+
+    def batch_fingerprint(self, request_data: dict) -> str:
+        """计算批量请求指纹（各场景归一化参数的 SHA-256，不包括截止时间）"""
+        normalized = {
+            "kind": "goal_probability_batch",
+            "scenarios": [self.normalize_request(scenario) for scenario in request_data.get('scenarios', [])],
+        }
+        encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def grid_fingerprint(self, request_data: dict) -> str:
+        """计算概率网格请求指纹（只包含影响结果的参数，不包括截止时间）"""
+        seed = request_data.get('seed', None)
+        normalized = {
+            "kind": "goal_probability_grid",
+            "pulls": int(self.request_pulls(request_data)),
+            "trials": int(request_data.get('trials', self.trials)),
+            "strategy": request_data.get('strategy', 'character_then_weapon'),
+            "seed": None if seed is None else int(seed),
+        }
+        encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def process_grid_request(self, request_data: dict) -> dict:
+        """处理概率网格请求（UP角色-1 C0-C6 × UP武器-1 R0-R5，目标参数被忽略）
+
+        Args:
+            request_data: API请求数据（resources / primogems / crystals、trials、strategy、seed、deadline_ms）
+
+        Returns:
+            dict: 概率网格结果
+        """
+        with request_deadline(request_data.get('deadline_ms', None)):
+            return self.estimate_probability_grid(
+                pulls=self.request_pulls(request_data),
+                trials=request_data.get('trials', self.trials),
+                strategy=request_data.get('strategy', 'character_then_weapon'),
+                seed=request_data.get('seed', None),
                 start=StartState(),
-                draw_character_module=draw_character_module,
-                draw_character2_module=draw_character2_module,
-                draw_weapon_module=draw_weapon_module
             )
-        else:
-            raise ValueError(f"Invalid probability: {probability}. Must be 0.5 or 0.95")
+
+    def process_batch_request(self, request_data: dict) -> dict:
+        """处理批量目标概率请求
+
+        Args:
+            request_data: API请求数据，`scenarios` 为场景列表，每项参数同目标概率请求；
+                可选 `deadline_ms` 作用于整个批量请求
+
+        Returns:
+            dict: `results` 为按顺序排列的各场景结果，`phase_tables` 为实际模拟的阶段成本表数量，
+            任一场景被截断时 `truncated` 为 True
+        """
+        scenarios = request_data.get('scenarios')
+        if not isinstance(scenarios, list) or not scenarios:
+            raise ValueError("scenarios must be a non-empty list")
+
+        parsed = []
+        for scenario in scenarios:
+            parsed.append({
+                "pulls": self.request_pulls(scenario),
+                "targets": self.parse_targets(scenario),
+                "trials": scenario.get('trials', self.trials),
+                "strategy": scenario.get('strategy', 'character_then_weapon'),
+                "seed": scenario.get('seed', None),
+            })
+
+        with request_deadline(request_data.get('deadline_ms', None)):
+            batch = self.estimate_goal_probability_batch(parsed, start=StartState())
+
+        batch["truncated"] = any(result.get("truncated", False) for result in batch["results"])
+        return batch
+
+    def process_required_pulls_request(self, request_data: dict, probability: float) -> dict:
+        """处理所需抽数请求
+
+        Args:
+            request_data: API请求数据
+            probability: 目标概率（0.5或0.95）
+
+        Returns:
+            dict: 包含所需抽数的字典
+        """
+        # 构建目标对象
+        targets = self.parse_targets(request_data)
+
+        draw_character_module, draw_character2_module, draw_weapon_module = CharacterWish, CharacterWish2, WeaponWish
+
+        # 根据概率选择计算方法（可选截止时间，超时返回目前的最佳估计）
+        with request_deadline(request_data.get('deadline_ms', None)):
+            if probability == 0.95:
+                result = self.calculate_required_pulls_for_95_percent_probability(
+                    targets=targets,
+                    strategy="character_then_weapon",
+                    seed=None,
+                    start=StartState(),
+                    draw_character_module=draw_character_module,
+                    draw_character2_module=draw_character2_module,
+                    draw_weapon_module=draw_weapon_module
+                )
+            elif probability == 0.5:
+                result = self.calculate_required_pulls_for_50_percent_probability(
+                    targets=targets,
+                    strategy="character_then_weapon",
+                    seed=None,
+                    start=StartState(),
+                    draw_character_module=draw_character_module,
+                    draw_character2_module=draw_character2_module,
+                    draw_weapon_module=draw_weapon_module
+                )
+            else:
+                raise ValueError(f"Invalid probability: {probability}. Must be 0.5 or 0.95")
 
         # 计算剩余抽数和金额
-        resources = request_data.get('resources', 0)
-        primogems = request_data.get('primogems', 0)
-        crystals = request_data.get('crystals', 0)
-        total_pulls = resources + (primogems + crystals) // 160
+        total_pulls = self.request_pulls(request_data)
         remaining_pulls = max(0, result['required_pulls'] - total_pulls)
         
         # 计算金额范围（12.84-14.55元/抽）
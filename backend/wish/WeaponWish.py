@@ -32,6 +32,7 @@
 import numpy as np
 import sys
 import os
+from array import array
 
 # 添加项目根目录到系统路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -39,6 +40,7 @@ backend_dir = os.path.dirname(current_dir)
 project_root = os.path.dirname(backend_dir)
 sys.path.insert(0, project_root)
 
+from backend.wish import instrumentation
 
 
 # 5星物品概率设置
@@ -82,6 +84,7 @@ class WeaponWishSimulator:
     - `selected_fate_weapon`: 当前选择的定轨武器（None表示不定轨）
     - `base_rate`, `pity_threshold`, `pity_increase`：概率参数
     - `rng`: numpy 随机数生成器
+    - `counters`: 分支计数器（默认关闭，为 None）
 
     方法:
     - `current_five_star_rate(pity=None)`: 返回给定（或当前）pity 的5星命中概率
@@ -103,7 +106,8 @@ class WeaponWishSimulator:
                  four_star_base_rate: float = FOUR_STAR_BASE_RATE, four_star_pity_threshold: int = FOUR_STAR_PITY_THRESHOLD,
                  four_star_pity_increase: float = FOUR_STAR_PITY_INCREASE, four_star_up_rate: float = FOUR_STAR_UP_RATE,
                  fate_point_max: int = FATE_POINT_MAX,
-                 five_star_up_weapons: list = FIVE_STAR_UP_WEAPONS, four_star_up_weapons: list = FOUR_STAR_UP_WEAPONS):
+                 five_star_up_weapons: list = FIVE_STAR_UP_WEAPONS, four_star_up_weapons: list = FOUR_STAR_UP_WEAPONS,
+                 counter_scope: str = instrumentation.SCOPE_WISH):
         self.total_pulls = 0  # 累计总抽数
         self.pity = int(pity)  # 当前已连续未抽中 5★ 武器的抽数
         self.four_star_pity = 0  # 当前已连续未抽中 4★ 物品的抽数
@@ -129,6 +133,8 @@ class WeaponWishSimulator:
         self.rng = np.random.default_rng(seed)  # 随机数生成器
         self.five_star_up_weapons = five_star_up_weapons  # 5星UP武器列表
         self.four_star_up_weapons = four_star_up_weapons  # 4星UP武器列表
+        # 分支计数器（见 instrumentation 模块，未开启 WISH_SIM_COUNTERS 时为 None）
+        self.counters = instrumentation.counters('weapon', counter_scope)
 
     def set_fate_weapon(self, weapon_name: str) -> None:
         """设置定轨武器（从不定轨变为定某一把）。
@@ -185,6 +191,28 @@ class WeaponWishSimulator:
         extra_steps = p - (self.four_star_pity_threshold - 1)
         return min(1.0, self.four_star_base_rate + extra_steps * self.four_star_pity_increase)
 
+    def _count_draw(self, branch: str | None, probability: float, is_fate: bool) -> None:
+        """记录一次抽卡触发的分支（仅在开启计数器时调用）
+
+        `branch` 为命中 4★ / 5★ 时的判定分支（4★ 带 `four_star_` 前缀），未命中时为 None；
+        `probability` 为命中时使用的概率，据此区分软保底和硬保底；`is_fate` 为是否获得定轨武器。
+        """
+        counters = self.counters
+        counters.add('draws')
+        if branch is None:
+            return
+        four_star = branch.startswith('four_star_')
+        prefix = 'four_star_' if four_star else ''
+        counters.add('four_star' if four_star else 'five_star')
+        if probability >= 1.0:
+            counters.add(prefix + 'hard_pity')
+        elif probability > (self.four_star_base_rate if four_star else self.base_rate):
+            counters.add(prefix + 'soft_pity')
+        counters.add(branch)
+        # 已定轨且获得 UP 武器（非命定值保底）时，记录是否为定轨武器
+        if self.selected_fate_weapon is not None and branch in ('guarantee_consumed', 'won_fifty_fifty'):
+            counters.add('fate_hit' if is_fate else 'fate_missed')
+
     def draw_once(self) -> tuple[bool, bool, int, int, float, bool, bool, bool, str, bool, int, str | None]:
         """进行一次抽卡：使用当前 `pity` 计算命中率并进行随机判定。
 
@@ -205,6 +233,7 @@ class WeaponWishSimulator:
         is_four_star_up = False
         is_fate = False
         weapon_name = '3星武器'
+        branch = None  # 本次命中的判定分支（计数器使用）
         
         if is_5star:
             # 命中5星
@@ -215,6 +244,7 @@ class WeaponWishSimulator:
                 if self.fate_point >= self.fate_point_max:
                     # 命定值满值，必定获得定轨武器
                     is_fate = True
+                    branch = 'fate_point_completed'
                     is_up = True
                     weapon_name = self.selected_fate_weapon
                     self.five_star_up_counts[weapon_name] += 1
@@ -225,6 +255,7 @@ class WeaponWishSimulator:
                     if self.guarantee_up:
                         # 大保底：上次获得常驻武器，本次必定 UP，随机获取一把UP武器
                         is_up = True
+                        branch = 'guarantee_consumed'
                         self.guarantee_up = False
                         # 随机选择一个5星UP武器
                         weapon_name = self.rng.choice(self.five_star_up_weapons)
@@ -239,6 +270,7 @@ class WeaponWishSimulator:
                     else:
                         # 命定值未满，小保底：UP 概率为 self.five_star_up_rate
                         is_up = self.rng.random() < self.five_star_up_rate
+                        branch = 'won_fifty_fifty' if is_up else 'lost_fifty_fifty'
                         if is_up:
                             # 命中UP，随机选择一个UP武器
                             weapon_name = self.rng.choice(self.five_star_up_weapons)
@@ -263,6 +295,7 @@ class WeaponWishSimulator:
                 if self.guarantee_up:
                     # 大保底：上次获得常驻武器，本次必定 UP
                     is_up = True
+                    branch = 'guarantee_consumed'
                     self.guarantee_up = False
                     # 随机选择一个5星UP武器
                     weapon_name = self.rng.choice(self.five_star_up_weapons)
@@ -270,6 +303,7 @@ class WeaponWishSimulator:
                 else:
                     # 小保底：UP 概率为 self.five_star_up_rate，其余概率为常驻
                     is_up = self.rng.random() < self.five_star_up_rate
+                    branch = 'won_fifty_fifty' if is_up else 'lost_fifty_fifty'
                     if is_up:
                         # 随机选择一个5星UP武器
                         weapon_name = self.rng.choice(self.five_star_up_weapons)
@@ -297,11 +331,13 @@ class WeaponWishSimulator:
                 if self.guarantee_four_star_up:
                     # 4星大保底：必定为UP物品
                     is_four_star_up = True
+                    branch = 'four_star_guarantee_consumed'
                     self.four_star_up_count += 1
                     self.guarantee_four_star_up = False
                 else:
                     # UP概率为 self.four_star_up_rate
                     is_four_star_up = self.rng.random() < self.four_star_up_rate
+                    branch = 'four_star_won_fifty_fifty' if is_four_star_up else 'four_star_lost_fifty_fifty'
                     if is_four_star_up:
                         self.four_star_up_count += 1
                     else:
@@ -326,6 +362,10 @@ class WeaponWishSimulator:
             # 未命中5星，增加5星pity
             self.pity += 1
 
+        # 分支计数（WISH_SIM_COUNTERS 开启时）
+        if self.counters is not None:
+            self._count_draw(branch, four_star_prob if is_4star else five_star_prob, is_fate)
+
         # 增加累计抽数（在本次抽卡完成后计入）
         self.total_pulls += 1
         
@@ -439,12 +479,18 @@ class WeaponWishSimulator:
                  fate_point_max=fate_point_max, seed=seed)
         return sim.pull_ten()
 
-    def simulate_pulls(self, total_pulls: int, strategy: str = None) -> dict:
+    def simulate_pulls(self, total_pulls: int, strategy: str = None, progress_callback=None,
+                       progress_interval: int = 10000, detail: bool = False, five_star_columns: bool = False) -> dict:
         """模拟指定次数的武器池抽卡
         
         参数:
         - `total_pulls`: 要模拟的抽卡次数
         - `strategy`: 定轨策略，可选值：None（不定轨）、'5星UP武器-1'（一直定UP武器1）、'5星UP武器-2'（一直定UP武器2）
+        - `progress_callback`: 可选，每 `progress_interval` 抽以当前累计结果字典调用一次；回调抛出的异常会终止模拟
+        - `progress_interval`: 汇报进度的间隔抽数
+        - `detail`: 为 True 时额外返回 pity 历史（int16）和命中位置（int32）等明细 NumPy 数组
+        - `five_star_columns`: 为 True 时5星记录按列返回 NumPy 数组（供二进制响应直接发送缓冲区），
+          否则 `five_star_costs` 为逐条的 `{cost, is_up, is_fate, weapon_name}` 字典列表（JSON 响应的格式）
         
         返回:
         - 包含抽卡结果的字典，包括:
@@ -462,7 +508,9 @@ class WeaponWishSimulator:
         - four_star_positions: 4星命中位置列表
         - four_star_up_positions: 4星UP命中位置列表
         - stats: 数学统计信息，包括期望抽数、中位数抽数、标准差、最小抽数、最大抽数
-        - five_star_costs: 每次5星所花费的抽数
+        - five_star_costs: 每次5星的记录：所花费的抽数、是否UP、是否为定轨武器、武器名称
+          （`five_star_columns` 为 True 时为抽数的 int32 数组，另有一一对应的 five_star_up / five_star_fate 标记数组
+          和 five_star_weapons 下标数组，均为 int8；下标对应 five_star_weapon_names，0 为常驻武器）
         """
         total_pulls = int(total_pulls)
         if total_pulls <= 0:
@@ -488,6 +536,12 @@ class WeaponWishSimulator:
                     'max_pulls': 0
                 },
                 'five_star_costs': [],
+                **({
+                    'five_star_up': [],
+                    'five_star_fate': [],
+                    'five_star_weapons': [],
+                    'five_star_weapon_names': ['5星常驻武器', *self.five_star_up_weapons],
+                } if five_star_columns else {}),
                 'strategy': strategy
             }
 
@@ -511,17 +565,22 @@ class WeaponWishSimulator:
         total_four_star_hits = 0  # 4星命中总次数
         
         # 记录抽卡过程
-        pity_history = []  # 每次抽卡后的5星保底计数
-        four_star_pity_history = []  # 每次抽卡后的4星保底计数
-        hit_positions = []  # 5星命中位置列表
-        up_positions = []  # UP武器命中位置列表
-        avg_positions = []  # 常驻武器命中位置列表
-        fate_weapon_positions = []  # 定轨武器命中位置列表
-
-        four_star_positions = []  # 4星物品命中位置列表
-        four_star_up_positions = []  # 4星UP物品命中位置列表
-        # 记录每次5星所花费的抽数
-        five_star_costs = []  # 每次5星的抽数花费记录
+        pity_history = array('h')  # 每次抽卡后的5星保底计数
+        four_star_pity_history = array('h')  # 每次抽卡后的4星保底计数
+        hit_positions = array('i')  # 5星命中位置列表
+        up_positions = array('i')  # UP武器命中位置列表
+        avg_positions = array('i')  # 常驻武器命中位置列表
+        fate_weapon_positions = array('i')  # 定轨武器命中位置列表
+
+        four_star_positions = array('i')  # 4星物品命中位置列表
+        four_star_up_positions = array('i')  # 4星UP物品命中位置列表
+        # 记录每次5星所花费的抽数（按列保存，结束时再按需组合为逐条字典）
+        five_star_costs = array('i')  # 每次5星的抽数花费
+        five_star_up = array('b')  # 每次5星是否为UP（1/0）
+        five_star_fate = array('b')  # 每次5星是否为定轨武器（1/0）
+        five_star_weapons = array('b')  # 每次5星的武器：five_star_weapon_names 中的下标
+        five_star_weapon_names = ['5星常驻武器', *self.five_star_up_weapons]
+        weapon_index = {name: index for index, name in enumerate(five_star_weapon_names)}
         last_hit_position = 0  # 上次5星命中的位置
 
         rs = self.rng  # 随机数生成器
@@ -637,12 +696,10 @@ class WeaponWishSimulator:
                             current_guarantee = True  # 下次必UP
                 
                 # 记录本次5星的信息
-                five_star_costs.append({
-                    'cost': cost,
-                    'is_up': is_up,
-                    'is_fate': is_fate,
-                    'weapon_name': weapon_name
-                })
+                five_star_costs.append(cost)
+                five_star_up.append(is_up)
+                five_star_fate.append(is_fate)
+                five_star_weapons.append(weapon_index[weapon_name])
                 
                 # 重置pity
                 current_pity = 0
@@ -694,6 +751,18 @@ class WeaponWishSimulator:
             pity_history.append(current_pity)
             four_star_pity_history.append(current_four_star_pity)
 
+            # 定期汇报当前累计结果
+            if progress_callback is not None and pull_num % progress_interval == 0:
+                progress_callback({
+                    'pulls_done': pull_num,
+                    'total_pulls': total_pulls,
+                    'five_star_up_counts': dict(current_five_star_up_counts),
+                    'avg_count': current_avg_count,
+                    'four_star_up_count': current_four_star_up_count,
+                    'four_star_avg_count': current_four_star_avg_count,
+                    'total_hits': total_hits
+                })
+
         # 计算数学统计信息
         stats = {
             'five_star_up_avg_count': 0,
@@ -757,13 +826,39 @@ class WeaponWishSimulator:
                     'max_count': int(np.max(fate_intervals))
                 }
 
-        return {
+        result = {
             'five_star_up_counts': current_five_star_up_counts,
             'avg_count': current_avg_count,
             'four_star_up_count': current_four_star_up_count,
             'four_star_avg_count': current_four_star_avg_count,
             'total_hits': total_hits,
-            'five_star_costs': five_star_costs,
             'stats': stats,
             'strategy': strategy
         }
+        if five_star_columns:
+            # 与明细数组一样直接引用 array 缓冲区，二进制编码时作为原始缓冲区发送
+            result.update({
+                'five_star_costs': np.asarray(five_star_costs),
+                'five_star_up': np.asarray(five_star_up),
+                'five_star_fate': np.asarray(five_star_fate),
+                'five_star_weapons': np.asarray(five_star_weapons),
+                'five_star_weapon_names': five_star_weapon_names,
+            })
+        else:
+            result['five_star_costs'] = [
+                {'cost': cost, 'is_up': bool(is_up), 'is_fate': bool(is_fate), 'weapon_name': five_star_weapon_names[weapon]}
+                for cost, is_up, is_fate, weapon in zip(five_star_costs, five_star_up, five_star_fate, five_star_weapons)
+            ]
+        if detail:
+            # 明细数组直接引用 array 缓冲区，不逐元素转换
+            result.update({
+                'pity_history': np.asarray(pity_history),
+                'four_star_pity_history': np.asarray(four_star_pity_history),
+                'hit_positions': np.asarray(hit_positions),
+                'up_positions': np.asarray(up_positions),
+                'avg_positions': np.asarray(avg_positions),
+                'fate_weapon_positions': np.asarray(fate_weapon_positions),
+                'four_star_positions': np.asarray(four_star_positions),
+                'four_star_up_positions': np.asarray(four_star_up_positions),
+            })
+        return result
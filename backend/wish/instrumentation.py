@@ -0,0 +1,84 @@
+"""模拟器计数器 - 统计 `draw_once` 中各分支的触发次数（默认关闭）
+
+简要说明：
+- 通过环境变量 WISH_SIM_COUNTERS 开启：
+  - `1`：只统计接口单抽 / 十连等交互式抽卡（范围 `wish`）
+  - `all`：同时统计目标概率估算中蒙特卡洛模拟的抽卡（范围 `goal`，次数远多于交互式抽卡，开销也随之增加）
+- 模拟器在构造时取得所属范围的计数器，关闭时为 None：`draw_once` 每次只多一次 `is None` 判断
+- 计数按 (模拟器, 范围, 事件) 在进程内汇总，多实例部署时由指标系统跨进程合并
+
+事件（`four_star_` 前缀为对应的 4★ 事件）：
+- `draws`：抽卡次数；`five_star` / `four_star`：命中次数
+- `soft_pity` / `hard_pity`：命中时概率已提升（软保底）/ 为 100%（硬保底）
+- `guarantee_consumed`：大保底生效（上次歪了，本次必定 UP）
+- `won_fifty_fifty` / `lost_fifty_fifty`：小保底判定为 UP / 常驻
+- 角色池：`capture_minguang`（随机触发捕获明光）、`capture_minguang_forced`（计数器满，必定触发）
+- 武器池：`fate_point_completed`（命定值满，必定获得定轨武器）、`fate_hit`（自然获得定轨武器）、
+  `fate_missed`（已定轨但获得另一把 UP 武器）
+
+主要用法：
+- `counters(simulator, scope)`：模拟器取得计数器（关闭时返回 None）
+- `snapshot()`：`{(模拟器, 范围, 事件): 次数}`
+- `reset()`：清零（测试用）
+"""
+
+import os
+import threading
+
+SCOPE_WISH = 'wish'  # 交互式抽卡（单抽、十连）
+SCOPE_GOAL = 'goal'  # 目标概率估算的蒙特卡洛模拟
+
+_MODE = os.environ.get('WISH_SIM_COUNTERS', '0').strip().lower()
+ENABLED_SCOPES = {
+    '1': frozenset({SCOPE_WISH}),
+    'all': frozenset({SCOPE_WISH, SCOPE_GOAL}),
+}.get(_MODE, frozenset())
+
+_lock = threading.Lock()
+_registry: dict[tuple[str, str], 'SimulatorCounters'] = {}
+
+
+class SimulatorCounters:
+    """一个 (模拟器, 范围) 的事件计数"""
+
+    def __init__(self, simulator: str, scope: str):
+        self.simulator = simulator
+        self.scope = scope
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, event: str) -> None:
+        with self._lock:
+            self._counts[event] = self._counts.get(event, 0) + 1
+
+    def items(self) -> list[tuple[str, int]]:
+        with self._lock:
+            return list(self._counts.items())
+
+
+def counters(simulator: str, scope: str = SCOPE_WISH) -> SimulatorCounters | None:
+    """模拟器的计数器；该范围未开启统计时返回 None"""
+    if scope not in ENABLED_SCOPES:
+        return None
+    key = (simulator, scope)
+    with _lock:
+        instance = _registry.get(key)
+        if instance is None:
+            instance = _registry[key] = SimulatorCounters(simulator, scope)
+        return instance
+
+
+def snapshot() -> dict[tuple[str, str, str], int]:
+    """本进程的全部计数：`{(模拟器, 范围, 事件): 次数}`"""
+    with _lock:
+        instances = list(_registry.values())
+    return {
+        (instance.simulator, instance.scope, event): count
+        for instance in instances
+        for event, count in instance.items()
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _registry.clear()